@@ -0,0 +1,39 @@
+-- Threshold alert rules and the alerts they raise, used with ALERT_RULES=clickhouse and
+-- ALERT_SINK=clickhouse (see README). Rules are evaluated after each ingested webhook
+-- batch for the repositories in it.
+--
+-- alert_rules: one row per rule, replaced by inserting a row with the same rule_id.
+-- Disable a rule by inserting it again with enabled = 0.
+-- alerts: one row per state change of a rule, 'firing' or 'resolved'.
+
+CREATE TABLE alert_rules
+(
+    rule_id String,
+    repo_name LowCardinality(String),
+    -- A per-item metric, e.g. 'pr_review_time' or 'issue_resolution_time'
+    metric LowCardinality(String),
+    operator Enum8('>' = 1, '>=' = 2, '<' = 3, '<=' = 4),
+    -- Seconds for times, percent for rates
+    threshold Float64,
+    -- Trailing window such as '90d', required: rules without one are skipped
+    window String,
+    min_count UInt32 DEFAULT 1,
+    enabled UInt8 DEFAULT 1,
+    updated_at DateTime DEFAULT now()
+) ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY rule_id;
+
+CREATE TABLE alerts
+(
+    fired_at DateTime,
+    rule_id String,
+    repo_name LowCardinality(String),
+    metric LowCardinality(String),
+    window String,
+    state Enum8('firing' = 1, 'resolved' = 2),
+    value Float64,
+    count UInt64,
+    operator LowCardinality(String),
+    threshold Float64
+) ENGINE = MergeTree
+ORDER BY (repo_name, fired_at);
@@ -1,9 +1,24 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from app.api.routes import stats, issues, prs
+from app.api.routes import (
+    backlog, contributors, health, live, profiles, repos, stats, issues, prs, webhooks
+)
+from app.core.catalog import require_known_repo
 from app.core.config import settings
+from app.core.db import require_derived_tables
 
 api_router = APIRouter()
-api_router.include_router(stats.router)
-api_router.include_router(issues.router)
-api_router.include_router(prs.router)
\ No newline at end of file
+api_router.include_router(health.router)
+api_router.include_router(repos.router)
+# Unknown repositories get a 404 before any query runs
+api_router.include_router(stats.router, dependencies=[Depends(require_known_repo)])
+api_router.include_router(issues.router, dependencies=[Depends(require_known_repo)])
+api_router.include_router(prs.router, dependencies=[Depends(require_known_repo)])
+api_router.include_router(contributors.router, dependencies=[Depends(require_known_repo)])
+# Backlog snapshots are built in ClickHouse only
+api_router.include_router(
+    backlog.router, dependencies=[Depends(require_known_repo), Depends(require_derived_tables)]
+)
+api_router.include_router(live.router, dependencies=[Depends(require_known_repo)])
+api_router.include_router(webhooks.router)
+api_router.include_router(profiles.router)
@@ -0,0 +1,229 @@
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import text
+from sqlmodel import Session
+from typing import Literal, Optional
+
+from app.core.db import get_db
+from app.api.schemas import BacklogAgingResponse, BacklogResponse, ErrorResponse
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+# (label, minimum age in days, maximum age in days exclusive)
+AGE_BUCKETS = (
+    ("0-7d", 0, 7),
+    ("7-30d", 7, 30),
+    ("30-90d", 30, 90),
+    ("90-365d", 90, 365),
+    ("365d+", 365, None),
+)
+
+BUILT_THROUGH = text("SELECT max(day) FROM backlog_builds")
+
+
+def _built_through(db: Session) -> date:
+    row = db.execute(BUILT_THROUGH).fetchone()
+    if not row or not row[0] or row[0] <= date(1970, 1, 1):
+        raise HTTPException(
+            status_code=404,
+            detail="Backlog snapshots have not been built (see backlog_snapshots.sql)"
+        )
+    return row[0]
+
+
+def _parse_date(value: str, name: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value}")
+
+
+def _opened_by_day(counts) -> dict:
+    # The native driver returns Map keys as dates, the embedded backend as ISO strings
+    return {
+        date.fromisoformat(key) if isinstance(key, str) else key: int(count)
+        for key, count in (counts or {}).items()
+    }
+
+
+def _in_bucket(day: date, opened_on: date, min_days: int, max_days: Optional[int]) -> bool:
+    age = (day - opened_on).days
+    return min_days <= age and (max_days is None or age < max_days)
+
+
+def _median_age_days(opened_by_day: dict, as_of: date):
+    remaining = sum(opened_by_day.values()) / 2.0
+    # Newest first, so the median is reached walking towards older items
+    for opened_on in sorted(opened_by_day, reverse=True):
+        remaining -= opened_by_day[opened_on]
+        if remaining <= 0:
+            return (as_of - opened_on).days
+    return None
+
+
+@router.get(
+    "/backlog",
+    response_model=BacklogResponse,
+    responses={
+        400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}
+    }
+)
+def get_backlog(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    start_date: str = Query(None, description="Start date in format 'YYYY-MM-DD' (defaults to a year ago)"),
+    end_date: str = Query(None, description="End date in format 'YYYY-MM-DD' (defaults to today)"),
+    interval: Literal["day", "week", "month"] = Query(
+        "week", description="Report the backlog at the end of each day, week or month"
+    ),
+    db: Session = Depends(get_db)
+):
+    """
+    Number of open issues and PRs over time, as of the end of each interval.
+
+    Read from the daily snapshots of backlog_snapshots (see backlog_snapshots.sql):
+    each point is the latest snapshot on or before its date, so any range costs one
+    read of the repository's snapshots. Dates after the last built day are left out.
+    """
+    today = datetime.utcnow().date()
+    end = _parse_date(end_date, "end_date") if end_date else today
+    start = _parse_date(start_date, "start_date") if start_date else end - timedelta(days=365)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+
+    try:
+        built_through = _built_through(db)
+        end = min(end, built_through)
+
+        query = text("""
+        SELECT day, open_issue_count, open_pr_count
+        FROM backlog_snapshots
+        WHERE repo_name = :repo_name
+          AND day <= :end_date
+          AND day >= (
+              SELECT max(day) FROM backlog_snapshots
+              WHERE repo_name = :repo_name AND day <= :start_date
+          )
+        ORDER BY day, built_at DESC
+        LIMIT 1 BY day
+        """)
+        snapshots = db.execute(query, {
+            "repo_name": repo_name,
+            "start_date": start,
+            "end_date": end
+        }).fetchall()
+
+        points = []
+        index = -1
+        day = start
+        while day <= end:
+            while index + 1 < len(snapshots) and snapshots[index + 1][0] <= day:
+                index += 1
+            period_end = (
+                interval == "day"
+                or (interval == "week" and (day - start).days % 7 == 6)
+                or (interval == "month" and (day + timedelta(days=1)).day == 1)
+                or day == end
+            )
+            if period_end:
+                snapshot = snapshots[index] if index >= 0 else None
+                points.append({
+                    "date": day.strftime("%Y-%m-%d"),
+                    "open_issues": int(snapshot[1]) if snapshot else 0,
+                    "open_prs": int(snapshot[2]) if snapshot else 0
+                })
+            day += timedelta(days=1)
+
+        return {
+            "repository": repo_name,
+            "period": {
+                "start": start.strftime("%Y-%m-%d"),
+                "end": end.strftime("%Y-%m-%d")
+            },
+            "interval": interval,
+            "built_through": built_through.strftime("%Y-%m-%d"),
+            "points": points
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving backlog: {str(e)}"
+        )
+
+
+@router.get(
+    "/backlog/aging",
+    response_model=BacklogAgingResponse,
+    responses={
+        400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}
+    }
+)
+def get_backlog_aging(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    as_of: str = Query(None, description="Date in format 'YYYY-MM-DD' (defaults to the last built day)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Age distribution of the issues and PRs open at the end of a day.
+
+    Snapshots count open items by the day they were opened, so the ages on any date
+    come from the latest snapshot on or before it.
+    """
+    requested = _parse_date(as_of, "as_of") if as_of else None
+
+    try:
+        built_through = _built_through(db)
+        day = min(requested, built_through) if requested else built_through
+
+        query = text("""
+        SELECT open_issues, open_prs
+        FROM backlog_snapshots
+        WHERE repo_name = :repo_name
+          AND day <= :as_of
+        ORDER BY day DESC, built_at DESC
+        LIMIT 1
+        """)
+        row = db.execute(query, {"repo_name": repo_name, "as_of": day}).fetchone()
+        if not row:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No backlog data found for repository: {repo_name}"
+            )
+
+        issues = _opened_by_day(row[0])
+        prs = _opened_by_day(row[1])
+        buckets = []
+        for label, min_days, max_days in AGE_BUCKETS:
+            buckets.append({
+                "bucket": label,
+                "min_days": min_days,
+                "max_days": max_days,
+                "issues": sum(
+                    count for opened, count in issues.items()
+                    if _in_bucket(day, opened, min_days, max_days)
+                ),
+                "prs": sum(
+                    count for opened, count in prs.items()
+                    if _in_bucket(day, opened, min_days, max_days)
+                )
+            })
+
+        return {
+            "repository": repo_name,
+            "as_of": day.strftime("%Y-%m-%d"),
+            "open_issues": sum(issues.values()),
+            "open_prs": sum(prs.values()),
+            "median_issue_age_days": _median_age_days(issues, day),
+            "median_pr_age_days": _median_age_days(prs, day),
+            "buckets": buckets
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving backlog aging: {str(e)}"
+        )
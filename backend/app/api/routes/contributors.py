@@ -0,0 +1,334 @@
+from datetime import date
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import text
+from sqlmodel import Session
+from typing import Literal
+
+from app.core.db import get_db, require_derived_tables
+from app.core.tiering import events_table_for_months
+from app.api.schemas import (
+    BusFactorResponse,
+    ContributorRetentionResponse,
+    ErrorResponse,
+    TopContributorsResponse,
+)
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+# (login column, weight, event condition) per contribution kind. Commits are counted
+# from merged PRs, the only place github_events records commit counts.
+MERGED_PR_CONDITION = "event_type = 'PullRequestEvent' AND action = 'closed' AND merged = 1"
+CONTRIBUTION_KINDS = {
+    "commits": ("creator_user_login", "commits", MERGED_PR_CONDITION),
+    "prs": ("creator_user_login", "1", MERGED_PR_CONDITION),
+    "reviews": (
+        "actor_login", "1",
+        "event_type = 'PullRequestReviewEvent' AND actor_login != creator_user_login"
+    ),
+}
+
+# topK keeps this many candidates per requested contributor before exact counting
+CANDIDATE_FACTOR = 5
+
+
+def _bot_condition(login_column: str, exclude_bots: bool) -> str:
+    return f"AND NOT endsWith({login_column}, '[bot]')" if exclude_bots else ""
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _retention_cohorts(rows, months: int, periods: list, current_month: date) -> list:
+    """
+    Assemble the cohorts of the `months` months before current_month from
+    (cohort_month, new_contributors, period, retained) rows.
+
+    Months without new contributors have no row, so every cohort of the window is
+    reported; retention for periods ending in current_month or later is not known yet.
+    """
+    cohort_sizes = {}
+    retained = {}
+    for cohort_month, new_contributors, period, count in rows:
+        cohort_sizes[cohort_month] = int(new_contributors)
+        retained[(cohort_month, period)] = int(count)
+
+    cohorts = []
+    for offset in range(months, 0, -1):
+        cohort_month = _add_months(current_month, -offset)
+        size = cohort_sizes.get(cohort_month, 0)
+        retention = []
+        for period in periods:
+            complete = _add_months(cohort_month, period) < current_month
+            count = retained.get((cohort_month, period), 0) if complete else None
+            retention.append({
+                "months_later": period,
+                "retained": count,
+                "retention_percent": (
+                    round(100.0 * count / size, 2) if count is not None and size else None
+                )
+            })
+        cohorts.append({
+            "cohort_month": cohort_month.strftime("%Y-%m"),
+            "new_contributors": size,
+            "retention": retention
+        })
+    return cohorts
+
+
+@router.get(
+    "/contributors/top",
+    response_model=TopContributorsResponse,
+    responses={500: {"model": ErrorResponse}}
+)
+def get_top_contributors(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    kind: Literal["commits", "prs", "reviews"] = Query("prs", description="Rank by commits in merged PRs, merged PRs or PR reviews"),
+    top_n: int = Query(10, description="Number of contributors to return", ge=1, le=100),
+    months: int = Query(12, description="Time window in months (default: 12)", ge=1, le=120),
+    exclude_bots: bool = Query(True, description="Ignore logins ending in '[bot]'"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the most active contributors of a repository.
+
+    Candidates come from a topKWeighted sketch, so memory stays bounded however many
+    distinct actors a repository has; only those candidates are then counted exactly.
+    `distinct_contributors` is an uniqCombined estimate.
+    """
+    login_column, weight, condition = CONTRIBUTION_KINDS[kind]
+    try:
+        query = text("""
+        WITH contributions AS (
+            SELECT
+                {login_column} AS login,
+                {weight} AS weight
+            FROM {events}
+            WHERE repo_canonical = :repo_name
+              AND {condition}
+              AND created_at >= subtractMonths(now(), :months)
+              {bot_condition}
+        ),
+        (
+            SELECT (topKWeighted(:candidates)(login, weight), sum(weight), uniqCombined(login))
+            FROM contributions
+        ) AS summary
+        SELECT
+            login,
+            sum(weight) AS total,
+            summary.2 AS all_contributions,
+            summary.3 AS distinct_contributors
+        FROM contributions
+        WHERE has(summary.1, login)
+        GROUP BY login
+        ORDER BY total DESC, login
+        LIMIT :top_n
+        """.format(
+            events=events_table_for_months(months),
+            login_column=login_column,
+            weight=weight,
+            condition=condition,
+            bot_condition=_bot_condition(login_column, exclude_bots),
+        ))
+
+        rows = db.execute(query, {
+            "repo_name": repo_name,
+            "months": months,
+            "candidates": top_n * CANDIDATE_FACTOR,
+            "top_n": top_n
+        }).fetchall()
+
+        total = int(rows[0][2]) if rows else 0
+        return {
+            "repository": repo_name,
+            "kind": kind,
+            "time_window_months": months,
+            "total": total,
+            "distinct_contributors": int(rows[0][3]) if rows else 0,
+            "contributors": [
+                {
+                    "login": row[0],
+                    "count": int(row[1]),
+                    "share_percent": round(100.0 * row[1] / total, 2) if total else 0.0
+                }
+                for row in rows
+            ]
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving top contributors: {str(e)}"
+        )
+
+
+@router.get(
+    "/contributors/bus-factor",
+    response_model=BusFactorResponse,
+    responses={500: {"model": ErrorResponse}}
+)
+def get_bus_factor(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    threshold: float = Query(0.5, description="Share of merged PRs to cover (default: 0.5)", gt=0, lt=1),
+    months: int = Query(12, description="Time window in months (default: 12)", ge=1, le=120),
+    exclude_bots: bool = Query(True, description="Ignore logins ending in '[bot]'"),
+    db: Session = Depends(get_db)
+):
+    """
+    Estimate the bus factor: the fewest PR authors who together account for
+    `threshold` of the merged PRs in the time window.
+
+    Merged PRs are counted per author, sorted, and the running total (arrayCumSum)
+    gives the number of authors needed, all in one query.
+    """
+    try:
+        query = text("""
+        SELECT
+            sum(merged_prs) AS total,
+            count() AS contributors,
+            arrayReverseSort(x -> x.1, groupArray((merged_prs, login))) AS ranked,
+            arrayFirstIndex(c -> c >= total * :threshold, arrayCumSum(arrayMap(x -> x.1, ranked))) AS bus_factor,
+            arraySlice(ranked, 1, bus_factor) AS core
+        FROM
+        (
+            SELECT
+                creator_user_login AS login,
+                uniqExact(number) AS merged_prs
+            FROM {events}
+            WHERE repo_canonical = :repo_name
+              AND {condition}
+              AND created_at >= subtractMonths(now(), :months)
+              {bot_condition}
+            GROUP BY login
+        )
+        """.format(
+            events=events_table_for_months(months),
+            condition=MERGED_PR_CONDITION,
+            bot_condition=_bot_condition("creator_user_login", exclude_bots),
+        ))
+
+        row = db.execute(query, {
+            "repo_name": repo_name,
+            "months": months,
+            "threshold": threshold
+        }).fetchone()
+
+        total = int(row[0]) if row else 0
+        return {
+            "repository": repo_name,
+            "time_window_months": months,
+            "threshold_percent": round(threshold * 100, 2),
+            "bus_factor": int(row[3]) if total else 0,
+            "merged_prs": total,
+            "contributors": int(row[1]) if row else 0,
+            "core_contributors": [
+                {
+                    "login": login,
+                    "count": int(count),
+                    "share_percent": round(100.0 * count / total, 2)
+                }
+                for count, login in (row[4] if total else [])
+            ]
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving bus factor: {str(e)}"
+        )
+
+
+@router.get(
+    "/contributors/retention",
+    response_model=ContributorRetentionResponse,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}},
+    dependencies=[Depends(require_derived_tables)]
+)
+def get_contributor_retention(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    months: int = Query(12, description="Number of monthly cohorts, ending with last month (default: 12)", ge=1, le=60),
+    periods: str = Query("1,3,6", description="Comma-separated months after joining to report retention for"),
+    exclude_bots: bool = Query(True, description="Ignore logins ending in '[bot]'"),
+    db: Session = Depends(get_db)
+):
+    """
+    Contributor retention by monthly cohort: of the contributors whose first push or pull
+    request event fell in a month, how many contributed again 1, 3 and 6 months later.
+
+    Reads the monthly contributor bitmaps of repo_contributor_months (see
+    repo_contributor_months.sql): a cohort is the month's bitmap minus the union of all
+    earlier ones, and retention its intersection with a later month's bitmap. Retention
+    for months that are not over yet is null. Logins are hashed with cityHash64, so
+    counts can be off by a collision in about 10^19.
+    """
+    try:
+        requested_periods = sorted({int(period) for period in periods.split(",") if period.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid periods: {periods}")
+    if not requested_periods or not all(1 <= period <= 60 for period in requested_periods):
+        raise HTTPException(status_code=400, detail="periods must be between 1 and 60 months")
+
+    try:
+        query = text("""
+        WITH
+        monthly AS (
+            SELECT month, groupBitmapMergeState(contributors) AS contributors
+            FROM repo_contributor_months
+            WHERE repo_name = :repo_name
+              {bot_condition}
+            GROUP BY month
+        ),
+        cohorts AS (
+            -- Contributors active in a month minus everyone active in any earlier month
+            SELECT
+                month AS cohort_month,
+                bitmapAndnot(
+                    contributors,
+                    groupBitmapMergeState(contributors) OVER (
+                        ORDER BY month ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                    )
+                ) AS cohort
+            FROM monthly
+        ),
+        cohort_periods AS (
+            SELECT
+                cohort_month,
+                cohort,
+                arrayJoin(:periods) AS period,
+                addMonths(cohort_month, period) AS target_month
+            FROM cohorts
+            WHERE cohort_month >= subtractMonths(toStartOfMonth(now()), :months)
+              AND cohort_month < toStartOfMonth(now())
+        )
+        SELECT
+            c.cohort_month,
+            bitmapCardinality(c.cohort) AS new_contributors,
+            c.period,
+            bitmapAndCardinality(c.cohort, m.contributors) AS retained
+        FROM cohort_periods c
+        LEFT JOIN monthly m ON m.month = c.target_month
+        ORDER BY c.cohort_month, c.period
+        """.format(
+            bot_condition="AND bot = 0" if exclude_bots else "",
+        ))
+
+        rows = db.execute(query, {
+            "repo_name": repo_name,
+            "months": months,
+            "periods": requested_periods
+        }).fetchall()
+
+        cohorts = _retention_cohorts(rows, months, requested_periods, date.today().replace(day=1))
+
+        return {
+            "repository": repo_name,
+            "periods": requested_periods,
+            "cohorts": cohorts
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving contributor retention: {str(e)}"
+        )
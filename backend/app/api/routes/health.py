@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+def get_liveness():
+    """The worker process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def get_readiness(request: Request):
+    """
+    Whether the worker has finished warming up its database connections.
+
+    Returns 503 until warm-up succeeds, along with startup-phase timings in seconds.
+    """
+    startup = request.app.state.startup
+    return JSONResponse(status_code=200 if startup.ready else 503, content=startup.as_dict())
@@ -2,10 +2,22 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy import text
 from sqlmodel import Session
 from datetime import datetime, timedelta
+from typing import Literal
 
+from app.core.actors import RESPONDER_DESCRIPTION, require_responder_support
+from app.core.backlog import current_open_issues
 from app.core.db import get_db
-from app.api.schemas import IssuesOpenClosedMonthlyResponse, ErrorResponse, IssueFirstResponseTimeResponse, IssueAvgResolutionTimeResponse
+from app.core.metrics import compute_metrics
+from app.api.schemas import (
+    IssuesOpenClosedMonthlyResponse, ErrorResponse, IssueFirstResponseTimeResponse,
+    IssueAvgResolutionTimeResponse, LabelResolutionTimesResponse
+)
+from app.core.sampling import (
+    ACCURACY_DESCRIPTION, approximation_info, mean_interval, resolve_sample_ratio, scale_count
+)
+from app.core.tiering import events_table
 from app.core.utils import format_time_delta
+from app.core.windows import WINDOWS_DESCRIPTION, parse_windows, windows_scan_start
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
@@ -13,46 +25,40 @@ router = APIRouter(prefix="/stats", tags=["stats"])
 @router.get(
     "/issues/open-closed",
     response_model=IssuesOpenClosedMonthlyResponse,
-    responses={500: {"model": ErrorResponse}}
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
 )
 def get_open_closed_issues(
     repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    windows: str = Query(None, description=WINDOWS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
     Get monthly issue statistics for the past 6 months from ClickHouse.
-    Returns counts of opened and closed issues formatted with month names.
+    Returns counts of opened and closed issues formatted with month names, and with
+    `windows` the counts per window, compared with the preceding period.
+    `currently_open` is read from the latest backlog snapshot (see app/core/backlog.py).
     """
+    try:
+        parsed_windows = parse_windows(windows) if windows else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # Calculate date range - last 6 months from now
         end_date = datetime.now()
         start_date = end_date - timedelta(days=180)  # ~6 months
+        scan_start = start_date
+        if parsed_windows:
+            scan_start = min(start_date, windows_scan_start(parsed_windows, end_date))
         
-        # ClickHouse SQL query
-        query = text(
-            """
-            SELECT
-                toStartOfMonth(created_at) AS month,
-                countIf(action = 'opened') AS opened,
-                countIf(action = 'closed') AS closed
-            FROM github_events
-            WHERE event_type = 'IssuesEvent'
-              AND action IN ('opened', 'closed')
-              AND created_at >= :start_date
-              AND created_at <= :end_date
-              AND repo_name = :repo_name
-            GROUP BY month
-            ORDER BY month
-            """
+        # Both counts, and their windows, come from one scan grouped by month
+        counts = compute_metrics(
+            db, repo_name, ["issues_opened", "issues_closed"],
+            start_date=scan_start, end_date=end_date,
+            windows=parsed_windows, window_end=end_date
         )
-        
-        # Execute query with ClickHouse-compatible date formatting
-        result = db.execute(query, {
-            "repo_name": repo_name,
-            "start_date": start_date,
-            "end_date": end_date
-        })
-        db_results = result.fetchall()
+        opened = counts["issues_opened"].months
+        closed = counts["issues_closed"].months
         
         # Process results
         monthly_stats = []
@@ -63,16 +69,13 @@ def get_open_closed_issues(
             # ClickHouse returns dates as datetime.date objects
             current_month_date = current_month.date()
             
-            # Find matching data from DB
-            db_data = next((row for row in db_results if row[0] == current_month_date), None)
-            
             # Format month as YYYY-MM to match MonthlyIssueStat
             month_str = current_month.strftime("%Y-%m")
             
             monthly_stats.append({
                 "month": month_str,
-                "opened": db_data[1] if db_data else 0,
-                "closed": db_data[2] if db_data else 0
+                "opened": opened.get(current_month_date, (0,))[0],
+                "closed": closed.get(current_month_date, (0,))[0]
             })
             
             # Move to next month
@@ -86,7 +89,10 @@ def get_open_closed_issues(
         
         return {
             "repository": repo_name,
-            "data": last_6_months
+            "data": last_6_months,
+            "opened_windows": counts["issues_opened"].windows,
+            "closed_windows": counts["issues_closed"].windows,
+            "currently_open": current_open_issues(db, repo_name)
         }
         
     except Exception as e:
@@ -100,84 +106,66 @@ def get_open_closed_issues(
 @router.get(
     "/issues/first-response-time",
     response_model=IssueFirstResponseTimeResponse,
-    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}}
 )
 def get_first_response_time(
     repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
     start_date: str = Query("2010-01-01", description="Start date in format 'YYYY-MM-DD'"),
     exclude_opener_comments: bool = Query(True, description="Exclude comments by the issue opener"),
+    responder: Literal["any", "human", "maintainer"] = Query("any", description=RESPONDER_DESCRIPTION),
+    windows: str = Query(None, description=WINDOWS_DESCRIPTION),
+    accuracy: Literal["exact", "approx", "auto"] = Query("auto", description=ACCURACY_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
     Calculate average time between issue opening and first response comment.
+    `responder` restricts which commenters count as a response (e.g. maintainers only).
     
     Returns:
     - repository: Repository name
     - average_response_time_seconds: Average in seconds
     - average_response_time_readable: Human-readable average (e.g., "2 hours 30 minutes")
+    - windows: Per-window averages by issue opening time, when `windows` is given
+      (the overall average then covers the scanned range)
+    - approximation: Sample ratio and confidence interval when the result is sampled
     """
+    require_responder_support(responder)
     try:
-        query = text("""
-        WITH issue_openings AS (
-            SELECT 
-                repo_name,
-                number,
-                created_at as opened_at,
-                actor_login as opener_login
-            FROM github_events
-            WHERE event_type = 'IssuesEvent'
-              AND action = 'opened'
-              AND repo_name = :repo_name
-              AND created_at >= :start_date
-        ),
-        first_comments AS (
-            SELECT
-                io.repo_name,
-                io.number,
-                io.opened_at,
-                MIN(ge.created_at) as first_comment_at
-            FROM issue_openings io
-            JOIN github_events ge ON io.repo_name = ge.repo_name AND io.number = ge.number
-            WHERE ge.event_type = 'IssueCommentEvent'
-              AND ge.action = 'created'
-              AND ge.created_at > io.opened_at
-              {exclude_opener_condition}
-            GROUP BY io.repo_name, io.number, io.opened_at
-        ),
-        response_times AS (
-            SELECT
-                repo_name,
-                dateDiff('second', opened_at, first_comment_at) as response_time_seconds
-            FROM first_comments
-        )
-        SELECT
-            repo_name,
-            avg(response_time_seconds) as avg_seconds
-        FROM response_times
-        GROUP BY repo_name
-        """.format(
-            exclude_opener_condition="AND ge.actor_login != io.opener_login" if exclude_opener_comments else ""
-        ))
+        parsed_windows = parse_windows(windows) if windows else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        result = db.execute(query, {
-            "repo_name": repo_name,
-            "start_date": start_date
-        })
-        row = result.fetchone()
+    try:
+        sample_ratio = resolve_sample_ratio(db, repo_name, accuracy)
+        window_end = datetime.utcnow()
+        if parsed_windows:
+            start_date = windows_scan_start(parsed_windows, window_end)
 
-        if not row or row[1] is None:
+        result = compute_metrics(
+            db, repo_name, ["issue_first_response_time"], start_date=start_date,
+            windows=parsed_windows, window_end=window_end, sample_ratio=sample_ratio,
+            responder=responder, exclude_opener_comments=exclude_opener_comments
+        )["issue_first_response_time"]
+        avg_seconds, responded_issues, stddev_seconds = result.values
+
+        if not responded_issues:
             raise HTTPException(
                 status_code=404,
                 detail=f"No response data found for issues in repository: {repo_name}"
             )
 
-        avg_seconds = float(row[1])
+        avg_seconds = float(avg_seconds)
         avg_timedelta = timedelta(seconds=avg_seconds)
         
         return {
             "repository": repo_name,
             "average_response_time_seconds": avg_seconds,
-            "average_response_time_readable": format_time_delta(avg_timedelta)
+            "average_response_time_readable": format_time_delta(avg_timedelta),
+            "windows": result.windows,
+            "approximation": approximation_info(
+                sample_ratio, mean_interval(avg_seconds, stddev_seconds, responded_issues),
+                responded_issues
+            ) if sample_ratio else None
         }
 
     except HTTPException:
@@ -198,6 +186,8 @@ def get_issue_avg_resolution_time(
     repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
     start_date: str = Query("2010-01-01", description="Start date in format 'YYYY-MM-DD'"),
     end_date: str = Query(None, description="End date in format 'YYYY-MM-DD' (defaults to now)"),
+    windows: str = Query(None, description=WINDOWS_DESCRIPTION),
+    accuracy: Literal["exact", "approx", "auto"] = Query("auto", description=ACCURACY_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -209,83 +199,159 @@ def get_issue_avg_resolution_time(
     - average_resolution_time_seconds: Average in seconds
     - average_resolution_time_readable: Human-readable average (e.g., "2 days 3 hours")
     - total_issues_resolved: Total number of issues resolved in the time window
+    - windows: Per-window averages by closing time, ending at `end_date`, when `windows`
+      is given (start_date is then ignored and the period covers the scanned range)
+    - approximation: Sample ratio and confidence interval when the result is sampled;
+      total_issues_resolved is then extrapolated from the sample
     """
     try:
+        parsed_windows = parse_windows(windows) if windows else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        sample_ratio = resolve_sample_ratio(db, repo_name, accuracy)
         end_date = end_date or datetime.utcnow().strftime("%Y-%m-%d")
+        window_end = datetime.strptime(end_date, "%Y-%m-%d")
+        if parsed_windows:
+            start_date = windows_scan_start(parsed_windows, window_end).strftime("%Y-%m-%d")
+
+        result = compute_metrics(
+            db, repo_name, ["issue_resolution_time"], start_date=start_date, end_date=end_date,
+            windows=parsed_windows, window_end=window_end, sample_ratio=sample_ratio
+        )["issue_resolution_time"]
+        avg_seconds, resolved_issues, stddev_seconds = result.values
+
+        if not resolved_issues:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No issue resolution data found for repository: {repo_name}"
+            )
+
+        avg_seconds = float(avg_seconds)
+        avg_timedelta = timedelta(seconds=avg_seconds)
         
+        return {
+            "repository": repo_name,
+            "period": {
+                "start": start_date,
+                "end": end_date
+            },
+            "average_resolution_time_seconds": avg_seconds,
+            "average_resolution_time_readable": format_time_delta(avg_timedelta),
+            "total_issues_resolved": scale_count(resolved_issues, sample_ratio),
+            "windows": result.windows,
+            "approximation": approximation_info(
+                sample_ratio, mean_interval(avg_seconds, stddev_seconds, resolved_issues),
+                resolved_issues
+            ) if sample_ratio else None
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error calculating issue resolution time: {str(e)}"
+        )
+
+@router.get(
+    "/issues/resolution-by-label",
+    response_model=LabelResolutionTimesResponse,
+    responses={500: {"model": ErrorResponse}}
+)
+def get_resolution_time_by_label(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    start_date: str = Query("2010-01-01", description="Start date in format 'YYYY-MM-DD'"),
+    end_date: str = Query(None, description="End date in format 'YYYY-MM-DD' (defaults to now)"),
+    labels: str = Query(None, description="Comma-separated labels to report, case-insensitive (defaults to all)"),
+    top_n: int = Query(None, description="Only report the N labels with the most resolved issues", ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Calculate issue resolution time statistics for every label in one scan.
+
+    An issue counts towards each label it carried on its opened or closed event, with
+    labels compared in lowercase. Issues without labels are not reported.
+
+    Returns, per label: number of resolved issues, average, median and 90th percentile
+    of the time between opening and closing.
+    """
+    requested_labels = [
+        label.strip().lower() for label in (labels or "").split(",") if label.strip()
+    ]
+
+    try:
+        end_date = end_date or datetime.utcnow().strftime("%Y-%m-%d")
+
         query = text("""
-        WITH issue_events AS (
-            -- Get all open and close events for issues
-            SELECT 
-                repo_name,
+        WITH issue_timings AS (
+            -- First open, last close and the union of labels of each issue
+            SELECT
                 number,
-                action,
-                created_at,
-                labels
-            FROM github_events
+                minIf(created_at, action = 'opened') as opened_at,
+                maxIf(created_at, action = 'closed') as closed_at,
+                arrayDistinct(arrayMap(label -> lower(label), groupUniqArrayArray(labels))) as issue_labels
+            FROM {events}
             WHERE event_type = 'IssuesEvent'
-              AND repo_name = :repo_name
+              AND repo_canonical = :repo_name
               AND action IN ('opened', 'closed')
               AND created_at BETWEEN :start_date AND :end_date
+            GROUP BY number
+            HAVING countIf(action = 'opened') > 0 AND countIf(action = 'closed') > 0
         ),
-        issue_timings AS (
-            -- Find first open and last close for each issue
-            SELECT
-                repo_name,
-                number,
-                minIf(created_at, action = 'opened') as opened_at,
-                maxIf(created_at, action = 'closed') as closed_at
-            FROM issue_events
-            GROUP BY repo_name, number
-            HAVING opened_at IS NOT NULL AND closed_at IS NOT NULL
-        ),
-        resolution_times AS (
-            -- Calculate resolution time for each issue
+        label_resolutions AS (
+            -- One row per (issue, label)
             SELECT
-                repo_name,
+                arrayJoin({issue_labels}) as label,
                 dateDiff('second', opened_at, closed_at) as resolution_time_seconds
             FROM issue_timings
             WHERE resolution_time_seconds > 0  -- Ensure closed after opened
         )
         SELECT
-            repo_name,
+            label,
+            count() as issues_resolved,
             avg(resolution_time_seconds) as avg_seconds,
-            count() as total_issues
-        FROM resolution_times
-        GROUP BY repo_name
-        """)
+            quantiles(0.5, 0.9)(resolution_time_seconds) as percentiles
+        FROM label_resolutions
+        GROUP BY label
+        ORDER BY issues_resolved DESC, label
+        {limit}
+        """.format(
+            events=events_table(start_date),
+            issue_labels="arrayFilter(label -> has(:labels, label), issue_labels)" if requested_labels else "issue_labels",
+            limit="LIMIT :top_n" if top_n else "",
+        ))
 
         result = db.execute(query, {
             "repo_name": repo_name,
             "start_date": start_date,
-            "end_date": end_date
+            "end_date": end_date,
+            "labels": requested_labels,
+            "top_n": top_n
         })
-        row = result.fetchone()
-
-        if not row or row[1] is None:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No issue resolution data found for repository: {repo_name}"
-            )
 
-        avg_seconds = float(row[1])
-        avg_timedelta = timedelta(seconds=avg_seconds)
-        
         return {
             "repository": repo_name,
             "period": {
                 "start": start_date,
                 "end": end_date
             },
-            "average_resolution_time_seconds": avg_seconds,
-            "average_resolution_time_readable": format_time_delta(avg_timedelta),
-            "total_issues_resolved": row[2]
+            "labels": [
+                {
+                    "label": row[0],
+                    "issues_resolved": row[1],
+                    "average_resolution_time_seconds": float(row[2]),
+                    "average_resolution_time_readable": format_time_delta(timedelta(seconds=float(row[2]))),
+                    "median_resolution_time_seconds": float(row[3][0]),
+                    "p90_resolution_time_seconds": float(row[3][1])
+                }
+                for row in result.fetchall()
+            ]
         }
 
-    except HTTPException:
-        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error calculating issue resolution time: {str(e)}"
-        )
\ No newline at end of file
+            detail=f"Error calculating resolution time by label: {str(e)}"
+        )
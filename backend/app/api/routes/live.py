@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.routes import issues, prs, stats
+
+router = APIRouter(prefix="/live", tags=["live"])
+
+# Seconds between SSE comments keeping idle connections open through proxies
+KEEPALIVE_SECONDS = 15
+
+# The dashboard's metrics, computed with the same defaults as its REST requests
+DASHBOARD_METRICS = {
+    "release_frequency": lambda db, repo_name: stats.get_release_frequency(
+        repo_name=repo_name, start_month=None, end_month=None, db=db
+    ),
+    "issues_open_closed": lambda db, repo_name: issues.get_open_closed_issues(
+        repo_name=repo_name, db=db
+    ),
+    "issue_first_response_time": lambda db, repo_name: issues.get_first_response_time(
+        repo_name=repo_name, start_date="2010-01-01", exclude_opener_comments=True,
+        responder="any", windows=None, accuracy="auto", db=db
+    ),
+    "issue_avg_resolution_time": lambda db, repo_name: issues.get_issue_avg_resolution_time(
+        repo_name=repo_name, start_date="2010-01-01", end_date=None, windows=None,
+        accuracy="auto", db=db
+    ),
+    "pr_review_time": lambda db, repo_name: prs.get_pr_review_time(
+        repo_name=repo_name, responder="any", windows=None, accuracy="auto", db=db
+    ),
+    "pr_success_rate": lambda db, repo_name: prs.get_pr_success_rate(
+        repo_name=repo_name, windows=None, accuracy="auto", db=db
+    ),
+    "new_contributors": lambda db, repo_name: stats.get_new_contributors(
+        repo_name=repo_name, months=6, db=db
+    ),
+}
+
+
+@router.get("/metrics")
+async def stream_metrics(
+    request: Request,
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'")
+):
+    """
+    Stream the dashboard metrics of a repository as server-sent events.
+
+    The first event is a `snapshot` holding every metric, keyed by name, as the
+    corresponding REST endpoint returns it. Each `update` event then holds only the
+    metrics that changed, recomputed once per batch of ingested events (or every
+    LIVE_REFRESH_SECONDS) and shared by all subscribers of the repository.
+    """
+    hub = getattr(request.app.state, "metric_hub", None)
+    if hub is None:
+        raise HTTPException(status_code=503, detail="Live metrics are not enabled")
+
+    async def events():
+        # Subscribe inside the generator so the finally clause runs on every disconnect
+        subscription = hub.subscribe(repo_name)
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            hub.unsubscribe(repo_name, subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
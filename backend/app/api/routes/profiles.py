@@ -0,0 +1,43 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Path, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.api.schemas import ErrorResponse, ProfileReport
+from app.core.config import settings
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+@router.get(
+    "/{profile_id}",
+    response_model=ProfileReport,
+    responses={401: {"model": ErrorResponse}, 404: {"model": ErrorResponse}}
+)
+async def get_profile(
+    request: Request,
+    profile_id: str = Path(
+        ..., pattern="^[0-9a-f]{32}$", description="X-Gitlytix-Profile-Id of the profiled response"
+    ),
+    x_gitlytix_profile: Optional[str] = Header(None, description="PROFILING_TOKEN")
+):
+    """
+    Report of a profiled request: sampled Python stacks and, for each SQL statement, its
+    query_id, rows and bytes read, duration and ProfileEvents from system.query_log.
+
+    Profile a request by sending PROFILING_TOKEN in the X-Gitlytix-Profile header. Query
+    statistics are added once ClickHouse has flushed its query log, usually within seconds;
+    until then query_log is 'pending'.
+    """
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    if x_gitlytix_profile is None or not hmac.compare_digest(
+        x_gitlytix_profile.encode("utf-8"), settings.PROFILING_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(status_code=401, detail="Invalid profiling token")
+
+    report = await run_in_threadpool(request.app.state.profile_store.load, profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return report
@@ -1,11 +1,39 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy import text
 from sqlmodel import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Literal
 
+from app.core.actors import (
+    RESPONDER_DESCRIPTION, require_responder_support, responder_condition
+)
 from app.core.db import get_db
-from app.api.schemas import ErrorResponse, PrSuccessRateResponse, PrAvgClosingTimeResponse, PrReviewTimeResponse
+from app.core.metrics import compute_metrics, summarize
+from app.api.schemas import (
+    ErrorResponse, PrLeadTimeResponse, PrSuccessRateResponse, PrAvgClosingTimeResponse,
+    PrReviewTimeResponse
+)
+from app.core.sampling import (
+    ACCURACY_DESCRIPTION, approximation_info, mean_interval, percent_interval,
+    resolve_sample_ratio, scale_count
+)
+from app.core.tiering import events_table
 from app.core.utils import format_time_delta, format_time_difference
+from app.core.windows import WINDOWS_DESCRIPTION, parse_windows, windows_scan_start
+
+# Stages of /prs/lead-time in order, with the condition an event must meet to reach them
+REVIEW_CONDITION = (
+    "event_type IN ('PullRequestReviewCommentEvent', 'PullRequestReviewEvent') "
+    "AND actor_login != creator_user_login {responder_condition}"
+)
+LEAD_TIME_STAGES = (
+    ("opened", "event_type = 'PullRequestEvent' AND action = 'opened'"),
+    ("first_review", REVIEW_CONDITION),
+    ("approval", REVIEW_CONDITION + " AND review_state = 'approved'"),
+    ("merge", "event_type = 'PullRequestEvent' AND action = 'closed' AND merged = 1"),
+)
+# windowFunnel only follows a PR this long after it was opened
+LEAD_TIME_FUNNEL_SECONDS = 10 * 365 * 24 * 3600
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
@@ -13,10 +41,12 @@ router = APIRouter(prefix="/stats", tags=["stats"])
 @router.get(
     "/prs/success-rate",
     response_model=PrSuccessRateResponse,
-    responses={500: {"model": ErrorResponse}}
+    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
 )
 def get_pr_success_rate(
     repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    windows: str = Query(None, description=WINDOWS_DESCRIPTION),
+    accuracy: Literal["exact", "approx", "auto"] = Query("auto", description=ACCURACY_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -24,44 +54,37 @@ def get_pr_success_rate(
     
     This endpoint identifies all PRs that reached a 'closed' state and determines
     what percentage of them were actually merged (as opposed to just closed without merging).
+    With `windows`, success rates are also reported per window by the time of each
+    PR's final event. Sampled results report PR counts extrapolated from the sample.
     """
     try:
-        query = text(
-            """
-            WITH pr_final_states AS (
-                SELECT
-                    number,
-                    argMax(action, created_at) as final_action,
-                    argMax(merged, created_at) as final_merged_status,
-                    max(created_at) as last_updated
-                FROM github_events
-                WHERE event_type = 'PullRequestEvent'
-                  AND repo_name = :repo_name
-                GROUP BY number
-            )
-            SELECT
-                COUNT() as total_closed_prs,
-                COUNTIf(final_merged_status = 1) as merged_prs,
-                ROUND(COUNTIf(final_merged_status = 1) * 100.0 / COUNT(), 2) as success_rate_percent
-            FROM pr_final_states
-            WHERE final_action = 'closed'
-            """
-        )
+        parsed_windows = parse_windows(windows) if windows else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        result = db.execute(query, {"repo_name": repo_name})
-        row = result.fetchone()
+    try:
+        sample_ratio = resolve_sample_ratio(db, repo_name, accuracy)
+        result = compute_metrics(
+            db, repo_name, ["pr_success_rate"], windows=parsed_windows, sample_ratio=sample_ratio
+        )["pr_success_rate"]
+        merged_prs, closed_prs = result.values
+        success_rate, _ = summarize("pr_success_rate", result.values)
 
-        if not row or row[0] is None:
+        if not closed_prs:
             raise HTTPException(
                 status_code=404,
-                detail=f"No PR data found for repository: {repo_name}"
+                detail=f"No closed PRs found for repository: {repo_name}"
             )
 
         return {
             "repository": repo_name,
-            "total_closed_prs": row[0],
-            "merged_prs": row[1],
-            "success_rate_percent": row[2]
+            "total_closed_prs": scale_count(closed_prs, sample_ratio),
+            "merged_prs": scale_count(merged_prs, sample_ratio),
+            "success_rate_percent": success_rate,
+            "windows": result.windows,
+            "approximation": approximation_info(
+                sample_ratio, percent_interval(success_rate, closed_prs), closed_prs
+            ) if sample_ratio else None
         }
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -80,6 +103,8 @@ def get_pr_success_rate(
 def get_pr_avg_closing_time(
     repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
     start_date: str = Query("2010-01-01", description="Start date in format 'YYYY-MM-DD'"),
+    windows: str = Query(None, description=WINDOWS_DESCRIPTION),
+    accuracy: Literal["exact", "approx", "auto"] = Query("auto", description=ACCURACY_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -89,74 +114,44 @@ def get_pr_avg_closing_time(
     - repository: Repository name
     - average_closing_time_seconds: Average in seconds
     - average_closing_time_readable: Human-readable average (e.g., "2 days 3 hours")
+    - windows: Per-window averages by closing time, when `windows` is given
+      (the overall average then covers the scanned range)
+    - approximation: Sample ratio and confidence interval when the result is sampled
     """
     try:
-        query = text("""
-        WITH pr_openings AS (
-            SELECT 
-                repo_name,
-                number,
-                created_at as opened_at
-            FROM github_events
-            WHERE event_type = 'PullRequestEvent'
-              AND action = 'opened'
-              AND repo_name = :repo_name
-              AND created_at >= :start_date
-        ),
-        pr_closings AS (
-            SELECT
-                repo_name,
-                number,
-                maxIf(created_at, action = 'closed') as closed_at
-            FROM github_events
-            WHERE event_type = 'PullRequestEvent'
-              AND action = 'closed'
-              AND repo_name = :repo_name
-              AND created_at >= :start_date
-            GROUP BY repo_name, number
-        ),
-        valid_prs AS (
-            SELECT
-                o.repo_name,
-                o.number,
-                o.opened_at,
-                c.closed_at
-            FROM pr_openings o
-            JOIN pr_closings c ON o.repo_name = c.repo_name AND o.number = c.number
-            WHERE c.closed_at > o.opened_at
-        ),
-        closing_times AS (
-            SELECT
-                repo_name,
-                dateDiff('second', opened_at, closed_at) as closing_time_seconds
-            FROM valid_prs
-        )
-        SELECT
-            repo_name,
-            avg(closing_time_seconds) as avg_seconds
-        FROM closing_times
-        GROUP BY repo_name
-        """)
+        parsed_windows = parse_windows(windows) if windows else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        result = db.execute(query, {
-            "repo_name": repo_name,
-            "start_date": start_date
-        })
-        row = result.fetchone()
+    try:
+        sample_ratio = resolve_sample_ratio(db, repo_name, accuracy)
+        window_end = datetime.utcnow()
+        if parsed_windows:
+            start_date = windows_scan_start(parsed_windows, window_end)
 
-        if not row or row[1] is None:
+        result = compute_metrics(
+            db, repo_name, ["pr_closing_time"], start_date=start_date,
+            windows=parsed_windows, window_end=window_end, sample_ratio=sample_ratio
+        )["pr_closing_time"]
+        avg_seconds, closed_prs, stddev_seconds = result.values
+
+        if not closed_prs:
             raise HTTPException(
                 status_code=404,
                 detail=f"No PR closing data found for repository: {repo_name}"
             )
 
-        avg_seconds = float(row[1])
+        avg_seconds = float(avg_seconds)
         avg_timedelta = timedelta(seconds=avg_seconds)
         
         return {
             "repository": repo_name,
             "average_closing_time_seconds": avg_seconds,
-            "average_closing_time_readable": format_time_delta(avg_timedelta)
+            "average_closing_time_readable": format_time_delta(avg_timedelta),
+            "windows": result.windows,
+            "approximation": approximation_info(
+                sample_ratio, mean_interval(avg_seconds, stddev_seconds, closed_prs), closed_prs
+            ) if sample_ratio else None
         }
 
     except HTTPException:
@@ -171,79 +166,69 @@ def get_pr_avg_closing_time(
 @router.get(
     "/prs/review-time",
     response_model=PrReviewTimeResponse,
-    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}}
 )
 def get_pr_review_time(
     repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    responder: Literal["any", "human", "maintainer"] = Query("any", description=RESPONDER_DESCRIPTION),
+    windows: str = Query(None, description=WINDOWS_DESCRIPTION),
+    accuracy: Literal["exact", "approx", "auto"] = Query("auto", description=ACCURACY_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
     Calculate the average time until the first review for Pull Requests.
     
-    This excludes reviews made by the PR author themselves.
+    This excludes reviews made by the PR author themselves, and with `responder`
+    also reviews by bots or non-maintainers.
+    With `windows`, averages are also reported per window by PR opening time, and only
+    PRs opened within the scanned range are considered. Sampled results report
+    reviewed_pr_count extrapolated from the sample.
     """
+    require_responder_support(responder)
     try:
-        query = text(
-            """
-            WITH pr_opened_times AS (
-                SELECT
-                    number,
-                    argMin(created_at, created_at) as opened_at,
-                    argMin(actor_login, created_at) as pr_author
-                FROM github_events
-                WHERE event_type = 'PullRequestEvent' 
-                  AND action = 'opened' 
-                  AND repo_name = :repo_name
-                GROUP BY number
-            ),
-            review_event_times AS (
-                SELECT 
-                    number, 
-                    created_at AS review_at, 
-                    actor_login
-                FROM github_events
-                WHERE repo_name = :repo_name 
-                  AND event_type IN ('PullRequestReviewCommentEvent', 'PullRequestReviewEvent')
-            ),
-            first_review_times AS (
-                SELECT
-                    rev.number,
-                    min(rev.review_at) as first_review_at
-                FROM review_event_times rev
-                JOIN pr_opened_times po ON rev.number = po.number
-                WHERE rev.actor_login != po.pr_author AND rev.review_at >= po.opened_at
-                GROUP BY rev.number
-            )
-            SELECT
-                avg(dateDiff('second', po.opened_at, fr.first_review_at)) as avg_time_to_first_review_seconds,
-                count() as reviewed_pr_count
-            FROM pr_opened_times po
-            JOIN first_review_times fr ON po.number = fr.number
-            """
-        )
-        
-        result = db.execute(query, {"repo_name": repo_name})
-        row = result.fetchone()
+        parsed_windows = parse_windows(windows) if windows else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        sample_ratio = resolve_sample_ratio(db, repo_name, accuracy)
+        window_end = datetime.utcnow()
+        result = compute_metrics(
+            db, repo_name, ["pr_review_time"],
+            start_date=windows_scan_start(parsed_windows, window_end) if parsed_windows else None,
+            windows=parsed_windows, window_end=window_end, sample_ratio=sample_ratio,
+            responder=responder
+        )["pr_review_time"]
+        row = result.values
         
         avg_seconds = None
         readable_time = None
         reviewed_count = 0
+        window_stats = None
+        approximation = None
         
         if row and row[1] is not None and row[1] > 0:
-            reviewed_count = row[1]
+            reviewed_count = scale_count(row[1], sample_ratio)
             avg_seconds = row[0]
             if avg_seconds is not None:
                 avg_seconds = float(avg_seconds) 
                 readable_time = format_time_difference(avg_seconds)
+                if sample_ratio:
+                    approximation = approximation_info(
+                        sample_ratio, mean_interval(avg_seconds, row[2], row[1]), row[1]
+                    )
             else:
                  avg_seconds = None
                  readable_time = None
+            window_stats = result.windows
             
         return PrReviewTimeResponse(
             repository=repo_name,
             reviewed_pr_count=reviewed_count,
             average_review_time_seconds=avg_seconds,
-            average_review_time_readable=readable_time
+            average_review_time_readable=readable_time,
+            windows=window_stats,
+            approximation=approximation
         )
 
     except Exception as e:
@@ -251,4 +236,132 @@ def get_pr_review_time(
             status_code=500,
             detail=f"Error calculating PR review time: {str(e)}"
         )
-    
\ No newline at end of file
+    
+
+def _lead_time_quantiles(count, quantiles):
+    if not count:
+        return {"median_seconds": None, "p75_seconds": None, "p90_seconds": None, "median_readable": None}
+    median, p75, p90 = (float(value) for value in quantiles)
+    return {
+        "median_seconds": median,
+        "p75_seconds": p75,
+        "p90_seconds": p90,
+        "median_readable": format_time_delta(timedelta(seconds=median))
+    }
+
+
+@router.get(
+    "/prs/lead-time",
+    response_model=PrLeadTimeResponse,
+    responses={500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}}
+)
+def get_pr_lead_time(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    start_date: str = Query("2010-01-01", description="Only PRs opened on or after this date, 'YYYY-MM-DD'"),
+    end_date: str = Query(None, description="Only PRs opened on or before this date, 'YYYY-MM-DD' (defaults to today)"),
+    responder: Literal["any", "human", "maintainer"] = Query("any", description=RESPONDER_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """
+    Break PR lead time into stages: opened -> first review by someone other than the
+    author -> approval -> merge.
+
+    A PR reaches a stage only after reaching the previous ones in order (windowFunnel),
+    so every stage's count and times describe the same PRs. Stage times run from the
+    previous stage; a first review that approves reaches both stages at once. Outcomes
+    give the whole lead time from opening to merge, or to the final close of PRs closed
+    without merging, whether reviewed or not. Computed in one pass grouped by PR.
+    """
+    require_responder_support(responder)
+    try:
+        end_date = end_date or datetime.utcnow().strftime("%Y-%m-%d")
+        stage_conditions = [
+            condition.format(responder_condition=responder_condition(responder, "repo_canonical", "actor_login"))
+            for _, condition in LEAD_TIME_STAGES
+        ]
+
+        query = text("""
+        WITH pr_timelines AS (
+            SELECT
+                number,
+                windowFunnel({funnel_seconds})(created_at, {opened}, {first_review}, {approval}, {merge}) AS stage,
+                minIfOrNull(created_at, {opened}) AS opened_at,
+                groupArrayIf(created_at, {first_review}) AS review_times,
+                groupArrayIf(created_at, {approval}) AS approval_times,
+                minIfOrNull(created_at, {merge}) AS merged_at,
+                maxIfOrNull(created_at, event_type = 'PullRequestEvent' AND action = 'closed') AS closed_at,
+                maxIfOrNull(created_at, event_type = 'PullRequestEvent' AND action = 'reopened') AS reopened_at
+            FROM {events}
+            WHERE repo_canonical = :repo_name
+              AND event_type IN ('PullRequestEvent', 'PullRequestReviewEvent', 'PullRequestReviewCommentEvent')
+              AND created_at >= :start_date
+            GROUP BY number
+            HAVING opened_at >= :start_date AND opened_at < addDays(toDate(:end_date), 1)
+        ),
+        pr_stages AS (
+            SELECT
+                stage,
+                opened_at,
+                arrayMin(arrayFilter(t -> t >= opened_at, review_times)) AS first_review_at,
+                arrayMin(arrayFilter(t -> t >= first_review_at, approval_times)) AS approved_at,
+                merged_at,
+                closed_at,
+                merged_at IS NULL AND closed_at >= opened_at
+                    AND (reopened_at IS NULL OR reopened_at < closed_at) AS closed_unmerged
+            FROM pr_timelines
+        )
+        SELECT
+            count() AS opened_prs,
+            countIf(stage >= 2) AS reviewed_prs,
+            countIf(stage >= 3) AS approved_prs,
+            countIf(stage >= 4) AS merged_after_approval_prs,
+            quantilesIf(0.5, 0.75, 0.9)(dateDiff('second', opened_at, first_review_at), stage >= 2),
+            quantilesIf(0.5, 0.75, 0.9)(dateDiff('second', first_review_at, approved_at), stage >= 3),
+            quantilesIf(0.5, 0.75, 0.9)(dateDiff('second', approved_at, merged_at), stage >= 4),
+            countIf(merged_at >= opened_at) AS merged_prs,
+            quantilesIf(0.5, 0.75, 0.9)(dateDiff('second', opened_at, merged_at), merged_at >= opened_at),
+            countIf(closed_unmerged) AS closed_prs,
+            quantilesIf(0.5, 0.75, 0.9)(dateDiff('second', opened_at, closed_at), closed_unmerged)
+        FROM pr_stages
+        """.format(
+            events=events_table(start_date),
+            funnel_seconds=LEAD_TIME_FUNNEL_SECONDS,
+            **dict(zip([name for name, _ in LEAD_TIME_STAGES], stage_conditions))
+        ))
+        row = db.execute(query, {
+            "repo_name": repo_name,
+            "start_date": start_date,
+            "end_date": end_date
+        }).fetchone()
+
+        counts = [int(value) for value in row[:4]] if row else [0, 0, 0, 0]
+        stages = [{"stage": "opened", "reached_prs": counts[0], "from_stage": None,
+                   **_lead_time_quantiles(0, None)}]
+        for index, (name, _) in enumerate(LEAD_TIME_STAGES[1:], start=1):
+            stages.append({
+                "stage": name,
+                "reached_prs": counts[index],
+                "from_stage": LEAD_TIME_STAGES[index - 1][0],
+                **_lead_time_quantiles(counts[index], row[3 + index] if row else None)
+            })
+
+        return {
+            "repository": repo_name,
+            "period": {
+                "start": start_date,
+                "end": end_date
+            },
+            "stages": stages,
+            "outcomes": [
+                {"outcome": "merged", "prs": int(row[7]) if row else 0,
+                 **_lead_time_quantiles(row[7] if row else 0, row[8] if row else None)},
+                {"outcome": "closed", "prs": int(row[9]) if row else 0,
+                 **_lead_time_quantiles(row[9] if row else 0, row[10] if row else None)},
+            ]
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error calculating PR lead time: {str(e)}"
+        )
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.schemas import ErrorResponse, RepoSearchResponse
+from app.core.catalog import get_repo_catalog, search_repo_index
+from app.core.db import require_derived_tables
+
+router = APIRouter(prefix="/repos", tags=["repos"])
+
+
+@router.get(
+    "/search",
+    response_model=RepoSearchResponse,
+    responses={500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}},
+    dependencies=[Depends(require_derived_tables)]
+)
+def search_repos(
+    q: str = Query(..., min_length=1, max_length=100, description="Start of the repository name, with or without the owner"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of repositories to return")
+):
+    """
+    Autocomplete repository names.
+
+    Matches repositories whose 'owner/repo' name or bare repo name starts with q,
+    case-insensitively, ranked by number of events. Served from the in-memory catalog
+    once it has loaded, and from repo_catalog's n-gram index before that.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q must not be blank")
+
+    try:
+        catalog = get_repo_catalog()
+        if catalog is not None:
+            entries = catalog.search(q, limit)
+        else:
+            entries = search_repo_index(q, limit)
+
+        return {
+            "query": q,
+            "results": [entry._asdict() for entry in entries],
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching repositories: {str(e)}"
+        )
@@ -2,13 +2,59 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy import text
 from sqlmodel import Session
 from datetime import datetime, timedelta
+from typing import Literal
 
-from app.core.db import get_db
-from app.api.schemas import ErrorResponse, DataQualityResponse, BugResolutionTimeResponse
+from app.core.catalog import get_repo_catalog
+from app.core.db import get_backend, get_db, require_derived_tables
+from app.core.actors import RESPONDER_DESCRIPTION, require_responder_support
+from app.core.metrics import METRICS, compute_metrics, summarize
+from app.api.schemas import (
+    ErrorResponse, DataQualityResponse, BugResolutionTimeResponse, FreshnessSummaryResponse,
+    MetricsResponse
+)
+from app.core.sampling import resolve_sample_ratio, scale_count
 from app.core.utils import format_time_delta, format_time_difference
+from app.core.windows import parse_windows, windows_scan_start
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
+# Age of the latest event after which a repository's data is Stale, then Outdated
+STALE_AFTER_SECONDS = 86400
+OUTDATED_AFTER_SECONDS = 86400 * 7
+
+# Per-repository watermarks computed from github_events, for when repo_catalog is unavailable
+WATERMARKS_FROM_EVENTS = """(
+    SELECT
+        repo_canonical AS repo_name,
+        count() as event_count,
+        max(created_at) as last_event_at,
+        max(file_time) as last_ingested_at
+    FROM github_events
+    GROUP BY repo_name
+)"""
+
+
+def _watermarks_source() -> str:
+    """repo_catalog, which its materialized view keeps current on every insert, once the
+    worker has loaded it (and so knows it exists), else the aggregate over github_events."""
+    return "repo_catalog" if get_repo_catalog() is not None else WATERMARKS_FROM_EVENTS
+
+
+def _metric_value(name: str, columns, sample_ratio) -> dict:
+    value, count = summarize(name, columns)
+    count = scale_count(count, sample_ratio)
+    if METRICS[name].aggregate == "count":
+        value = count
+    return {"value": float(value) if count else None, "count": count}
+
+
+def data_freshness_status(seconds_since_latest) -> str:
+    if seconds_since_latest > OUTDATED_AFTER_SECONDS:
+        return "Outdated"
+    if seconds_since_latest > STALE_AFTER_SECONDS:
+        return "Stale"
+    return "Fresh"
+
 @router.get("/")
 def read_stats():
     return {"message": "Hello, World!"}
@@ -16,7 +62,8 @@ def read_stats():
 @router.get(
     "/data-quality",
     response_model=DataQualityResponse,
-    responses={500: {"model": ErrorResponse}}
+    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}},
+    dependencies=[Depends(require_derived_tables)]
 )
 def get_data_quality(
     repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
@@ -29,22 +76,26 @@ def get_data_quality(
     including when the most recent event was recorded and how long ago that was.
     
     This helps users understand how up-to-date the metrics for a repository are.
+    Reads the repository's watermark from repo_catalog, a single primary-key lookup,
+    unless the catalog is unavailable.
     """
     try:
         query = text(
             """
             SELECT 
-                MAX(created_at) as latest_event_time,
-                NOW() - MAX(created_at) as time_since_latest_event
-            FROM github_events
+                max(last_event_at) as latest_event_time,
+                NOW() - max(last_event_at) as time_since_latest_event,
+                max(last_ingested_at) as last_ingested_at,
+                sum(event_count) as event_count
+            FROM {source}
             WHERE repo_name = :repo_name
-            """
+            """.format(source=_watermarks_source())
         )
         
         result = db.execute(query, {"repo_name": repo_name})
         row = result.fetchone()
         
-        if not row or row[0] is None:
+        if not row or row[0] is None or not row[3]:
             raise HTTPException(
                 status_code=404,
                 detail=f"No data found for repository: {repo_name}"
@@ -55,19 +106,14 @@ def get_data_quality(
         
         # Convert seconds to a readable format
         time_since_latest = format_time_difference(seconds_since_latest)
-        
-        # Determine data freshness status
-        data_freshness_status = "Fresh"
-        if seconds_since_latest > 86400 * 7:  # More than 7 days
-            data_freshness_status = "Outdated"
-        elif seconds_since_latest > 86400:  # More than 1 day
-            data_freshness_status = "Stale"
             
         return {
             "repository": repo_name,
             "latest_event_time": latest_event_time,
             "time_since_latest_event": time_since_latest,
-            "data_freshness_status": data_freshness_status
+            "data_freshness_status": data_freshness_status(seconds_since_latest),
+            "last_ingested_at": row[2],
+            "event_count": row[3]
         }
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -77,6 +123,107 @@ def get_data_quality(
             detail=f"Error retrieving data quality information: {str(e)}"
         )
 
+
+@router.get(
+    "/freshness",
+    response_model=FreshnessSummaryResponse,
+    responses={500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}},
+    dependencies=[Depends(require_derived_tables)]
+)
+def get_freshness(
+    status: Literal["Stale", "Outdated"] = Query("Stale", description="List repositories at least this stale"),
+    min_events: int = Query(100, description="Ignore repositories with fewer events", ge=1),
+    limit: int = Query(100, description="Maximum number of repositories to list", ge=1, le=1000)
+):
+    """
+    Get data freshness across the whole dataset.
+
+    Counts repositories per freshness status and lists the most active ones whose
+    latest event is older than `status` allows, which usually points at a gap in
+    ingestion. Reads the per-repository watermarks in repo_catalog on every shard.
+    """
+    try:
+        source = _watermarks_source()
+        summary_query = text("""
+        SELECT
+            count() as repositories,
+            countIf(age <= :stale_after) as fresh,
+            countIf(age > :stale_after AND age <= :outdated_after) as stale,
+            countIf(age > :outdated_after) as outdated,
+            max(latest_event) as latest_event_time,
+            max(latest_ingest) as last_ingested_at
+        FROM
+        (
+            SELECT
+                repo_name,
+                sum(event_count) as events,
+                max(last_event_at) as latest_event,
+                max(last_ingested_at) as latest_ingest,
+                NOW() - latest_event as age
+            FROM {source}
+            GROUP BY repo_name
+            HAVING events >= :min_events
+        )
+        """.format(source=source))
+        stale_query = text("""
+        SELECT
+            repo_name,
+            max(last_event_at) as latest_event,
+            max(last_ingested_at) as latest_ingest,
+            sum(event_count) as events,
+            NOW() - latest_event as age
+        FROM {source}
+        GROUP BY repo_name
+        HAVING events >= :min_events AND age > :threshold
+        ORDER BY events DESC, repo_name
+        LIMIT :limit
+        """.format(source=source))
+        params = {
+            "stale_after": STALE_AFTER_SECONDS,
+            "outdated_after": OUTDATED_AFTER_SECONDS,
+            "threshold": STALE_AFTER_SECONDS if status == "Stale" else OUTDATED_AFTER_SECONDS,
+            "min_events": min_events,
+            "limit": limit
+        }
+
+        # Repositories live on a single shard, so per-shard results add up
+        counts = [0, 0, 0, 0]
+        latest_event_time = last_ingested_at = None
+        repositories = []
+        for session in get_backend().each_shard():
+            row = session.execute(summary_query, params).fetchone()
+            if row and row[0]:
+                counts = [total + int(value) for total, value in zip(counts, row[:4])]
+                latest_event_time = max(filter(None, [latest_event_time, row[4]]))
+                last_ingested_at = max(filter(None, [last_ingested_at, row[5]]))
+            repositories.extend(session.execute(stale_query, params).fetchall())
+
+        repositories.sort(key=lambda row: (-row[3], row[0]))
+        return {
+            "total_repositories": counts[0],
+            "fresh": counts[1],
+            "stale": counts[2],
+            "outdated": counts[3],
+            "latest_event_time": latest_event_time,
+            "last_ingested_at": last_ingested_at,
+            "repositories": [
+                {
+                    "repository": row[0],
+                    "latest_event_time": row[1],
+                    "last_ingested_at": row[2],
+                    "event_count": row[3],
+                    "data_freshness_status": data_freshness_status(row[4])
+                }
+                for row in repositories[:limit]
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving data freshness: {str(e)}"
+        )
+
+
 @router.get(
     "/bugs/avg-resolution-time",
     response_model=BugResolutionTimeResponse,
@@ -103,54 +250,17 @@ def get_bug_avg_resolution_time(
     try:
         end_date = end_date or datetime.utcnow().strftime("%Y-%m-%d")
         
-        query = text("""
-        WITH bug_issues AS (
-            -- Get the first opened and last closed event for each issue
-            SELECT 
-                repo_name,
-                number,
-                minIf(created_at, action = 'opened') as opened_at,
-                maxIf(created_at, action = 'closed') as closed_at,
-                -- Check if any event for this issue had a 'bug' label
-                max(hasAny(labels, ['bug'])) as is_bug
-            FROM github_events
-            WHERE event_type = 'IssuesEvent'
-              AND repo_name = :repo_name
-              AND action IN ('opened', 'closed')
-              AND created_at BETWEEN :start_date AND :end_date
-            GROUP BY repo_name, number
-            HAVING is_bug = 1 AND closed_at IS NOT NULL AND opened_at IS NOT NULL
-        ),
-        resolution_times AS (
-            SELECT
-                repo_name,
-                dateDiff('second', opened_at, closed_at) as resolution_time_seconds
-            FROM bug_issues
-            WHERE resolution_time_seconds > 0  -- Ensure closed after opened
-              AND resolution_time_seconds < 31536000  -- Filter out resolutions > 1 year
-        )
-        SELECT
-            repo_name,
-            avg(resolution_time_seconds) as avg_seconds,
-            count() as total_bugs
-        FROM resolution_times
-        GROUP BY repo_name
-        """)
+        avg_seconds, total_bugs, _ = compute_metrics(
+            db, repo_name, ["bug_resolution_time"], start_date=start_date, end_date=end_date
+        )["bug_resolution_time"].values
 
-        result = db.execute(query, {
-            "repo_name": repo_name,
-            "start_date": start_date,
-            "end_date": end_date
-        })
-        row = result.fetchone()
-
-        if not row or row[1] is None:
+        if not total_bugs:
             raise HTTPException(
                 status_code=404,
                 detail=f"No bug resolution data found for repository: {repo_name}"
             )
 
-        avg_seconds = float(row[1])
+        avg_seconds = float(avg_seconds)
         avg_timedelta = timedelta(seconds=avg_seconds)
         
         return {
@@ -161,7 +271,7 @@ def get_bug_avg_resolution_time(
             },
             "average_resolution_time_seconds": avg_seconds,
             "average_resolution_time_readable": format_time_delta(avg_timedelta),
-            "total_bugs_resolved": row[2]
+            "total_bugs_resolved": total_bugs
         }
 
     except HTTPException:
@@ -212,35 +322,14 @@ def get_release_frequency(
         start_date = f"{start_month}-01"
         end_date = f"{end_month}-01"
         
-        query = text("""
-        WITH release_events AS (
-            SELECT 
-                toStartOfMonth(created_at) as month,
-                count() as releases
-            FROM github_events
-            WHERE event_type = 'ReleaseEvent'
-              AND repo_name = :repo_name
-              AND created_at BETWEEN :start_date AND :end_date
-            GROUP BY month
-            ORDER BY month
-        )
-        SELECT 
-            formatDateTime(month, '%Y-%m') as month_str,
-            releases
-        FROM release_events
-        """)
+        releases = compute_metrics(
+            db, repo_name, ["releases"], start_date=start_date, end_date=end_date
+        )["releases"].months
 
-        result = db.execute(query, {
-            "repo_name": repo_name,
-            "start_date": start_date,
-            "end_date": end_date
-        })
-        
         data = [
-            {"month": row[0], "releases": row[1]}
-            for row in result.fetchall()
+            {"month": month.strftime("%Y-%m"), "releases": counts[0]}
+            for month, counts in sorted(releases.items())
         ]
-        print('******************', data)
         return data
 
     except Exception as e:
@@ -274,7 +363,7 @@ def get_new_contributors(
                 actor_login as username,
                 min(created_at) as first_contribution_date
             FROM github_events
-            WHERE repo_name = :repo_name
+            WHERE repo_canonical = :repo_name
               AND event_type IN ('PushEvent', 'PullRequestEvent')
             GROUP BY actor_login
             HAVING first_contribution_date >= subtractMonths(now(), :months)
@@ -312,4 +401,93 @@ def get_new_contributors(
         raise HTTPException(
             status_code=500,
             detail=f"Error retrieving new contributors data: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/metrics",
+    response_model=MetricsResponse,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 501: {"model": ErrorResponse}}
+)
+def get_metrics(
+    repo_name: str = Query(..., description="Repository name in format 'owner/repo'"),
+    metrics: str = Query(..., description="Comma-separated metric names, e.g. 'issue_resolution_time,pr_review_time'"),
+    start_date: str = Query("2010-01-01", description="Start date in format 'YYYY-MM-DD'"),
+    end_date: str = Query(None, description="End date in format 'YYYY-MM-DD', inclusive (defaults to now)"),
+    windows: str = Query(None, description="Comma-separated horizons, e.g. '30d,90d,365d', ending at end_date"),
+    accuracy: Literal["exact", "approx", "auto"] = Query("exact", description="'exact', 'approx' (sampled) or 'auto'"),
+    responder: Literal["any", "human", "maintainer"] = Query("any", description=RESPONDER_DESCRIPTION),
+    exclude_opener_comments: bool = Query(True, description="Exclude comments by the issue opener"),
+    db: Session = Depends(get_db)
+):
+    """
+    Compute any set of the metrics declared in app/core/metrics.py over the same range.
+
+    Requested metrics are fused into one query per key (per issue/PR, or per month), so
+    several metrics cost about as much as one. Values are means (in seconds for times),
+    percentages or counts depending on the metric's aggregate; monthly metrics report
+    per-month values instead. With `windows`, start_date is ignored.
+    """
+    names = list(dict.fromkeys(name.strip() for name in metrics.split(",") if name.strip()))
+    unknown = [name for name in names if name not in METRICS]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown metrics: {', '.join(unknown) or 'none requested'}; "
+                   f"available: {', '.join(METRICS)}"
+        )
+    require_responder_support(responder)
+    try:
+        parsed_windows = parse_windows(windows) if windows else None
+        scan_end = (
+            datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1, seconds=-1)
+            if end_date else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        sample_ratio = resolve_sample_ratio(db, repo_name, accuracy)
+        window_end = scan_end or datetime.utcnow()
+        if parsed_windows:
+            start_date = windows_scan_start(parsed_windows, window_end).strftime("%Y-%m-%d")
+
+        results = compute_metrics(
+            db, repo_name, names, start_date=start_date, end_date=scan_end,
+            windows=parsed_windows, window_end=window_end, sample_ratio=sample_ratio,
+            responder=responder, exclude_opener_comments=exclude_opener_comments
+        )
+
+        values = {}
+        for name, result in results.items():
+            value = {
+                "aggregate": METRICS[name].aggregate,
+                "windows": result.windows,
+                "months": None
+            }
+            if result.months is None:
+                value.update(_metric_value(name, result.values, sample_ratio))
+            else:
+                value["months"] = [
+                    {"month": month.strftime("%Y-%m"), **_metric_value(name, columns, sample_ratio)}
+                    for month, columns in sorted(result.months.items())
+                ]
+                value.update(value=None, count=sum(month["count"] for month in value["months"]))
+            values[name] = value
+
+        return {
+            "repository": repo_name,
+            "period": {
+                "start": start_date,
+                "end": end_date or window_end.strftime("%Y-%m-%d")
+            },
+            "metrics": values,
+            "queries": len({METRICS[name].key for name in names}),
+            "sample_ratio": sample_ratio
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error computing metrics: {str(e)}"
+        )
@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.api.schemas import ErrorResponse, WebhookResponse
+from app.core.aliases import move_history, record_rename, rename_from_webhook
+from app.core.config import settings
+from app.core.ingest import BufferFullError
+from app.core.webhooks import map_webhook_event, verify_signature
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+
+@router.post(
+    "/github",
+    status_code=202,
+    response_model=WebhookResponse,
+    responses={400: {"model": ErrorResponse}, 401: {"model": ErrorResponse}, 503: {"model": ErrorResponse}}
+)
+async def receive_github_webhook(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    x_github_event: str = Header(..., description="GitHub event name"),
+    x_hub_signature_256: Optional[str] = Header(None, description="HMAC-SHA256 signature of the body"),
+    x_github_delivery: Optional[str] = Header(None, description="Unique delivery ID")
+):
+    """
+    Receive a GitHub webhook delivery and queue it for insertion into github_events.
+
+    The signature is checked against GITHUB_WEBHOOK_SECRET. Events are inserted in
+    batches within INGEST_FLUSH_INTERVAL seconds; redelivered events are ignored.
+    Returns 503 with Retry-After while too many events are waiting to be inserted.
+
+    `repository` deliveries announcing a rename or transfer record the former name as an
+    alias of the new one, and the events recorded under it are moved in the background.
+    """
+    buffer = getattr(request.app.state, "event_buffer", None)
+    if not settings.GITHUB_WEBHOOK_SECRET or buffer is None:
+        raise HTTPException(status_code=503, detail="Webhook ingestion is not enabled")
+
+    body = await request.body()
+    if not verify_signature(settings.GITHUB_WEBHOOK_SECRET, body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Webhook body is not a JSON object")
+
+    rename = rename_from_webhook(x_github_event, payload)
+    if rename is not None:
+        try:
+            former_names = await run_in_threadpool(record_rename, *rename)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Recording the rename failed: {str(e)}")
+        background_tasks.add_task(move_history, former_names)
+        return {"event": x_github_event, "accepted": 0}
+
+    event = map_webhook_event(x_github_event, payload, datetime.utcnow().replace(microsecond=0))
+    if event is None:
+        return {"event": x_github_event, "accepted": 0}
+
+    try:
+        queued = buffer.add([event], x_github_delivery)
+    except BufferFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Ingestion is backed up: {str(e)}",
+            headers={"Retry-After": "10"}
+        )
+
+    return {"event": x_github_event, "accepted": 1 if queued else 0}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 
@@ -8,6 +8,28 @@ class PeriodInfo(BaseModel):
     end: str
 
 
+class WindowComparison(BaseModel):
+    window: str = Field(description="Window label as requested, e.g. '30d'")
+    days: int = Field(description="Window length in days")
+    value: Optional[float] = Field(None, description="Metric value over the window")
+    previous_value: Optional[float] = Field(
+        None,
+        description="Metric value over the preceding window of the same length"
+    )
+    delta: Optional[float] = Field(None, description="value - previous_value")
+    delta_percent: Optional[float] = Field(None, description="Change relative to the previous window, in percent")
+    count: int = Field(description="Number of items the window value is computed from")
+    previous_count: int = Field(description="Number of items the previous value is computed from")
+
+
+class ApproximationInfo(BaseModel):
+    sample_ratio: float = Field(description="Fraction of issues/PRs sampled")
+    sampled_items: int = Field(description="Number of sampled issues/PRs the estimate is based on")
+    confidence_level: float = Field(description="Confidence level of the interval")
+    confidence_interval_low: float = Field(description="Lower bound of the primary metric")
+    confidence_interval_high: float = Field(description="Upper bound of the primary metric")
+
+
 class IssuesCounts(BaseModel):
     opened: int = Field(description="Number of issue open events")
     closed: int = Field(description="Number of issue close events")
@@ -32,6 +54,38 @@ class IssuesOpenClosedResponse(BaseModel):
     )
 
 
+class BacklogPoint(BaseModel):
+    date: str = Field(description="End of the interval, YYYY-MM-DD")
+    open_issues: int
+    open_prs: int
+
+
+class BacklogResponse(BaseModel):
+    repository: str
+    period: PeriodInfo
+    interval: str = Field(description="'day', 'week' or 'month'")
+    built_through: str = Field(description="Last day the snapshots have been built for")
+    points: List[BacklogPoint]
+
+
+class BacklogAgeBucket(BaseModel):
+    bucket: str = Field(description="Age range label, e.g. '7-30d'")
+    min_days: int
+    max_days: Optional[int] = Field(None, description="Exclusive upper bound; null for the oldest bucket")
+    issues: int
+    prs: int
+
+
+class BacklogAgingResponse(BaseModel):
+    repository: str
+    as_of: str = Field(description="Day the ages are computed for, YYYY-MM-DD")
+    open_issues: int
+    open_prs: int
+    median_issue_age_days: Optional[int] = None
+    median_pr_age_days: Optional[int] = None
+    buckets: List[BacklogAgeBucket]
+
+
 class DataQualityResponse(BaseModel):
     repository: str
     latest_event_time: datetime = Field(description="Timestamp of the most recent event in the database")
@@ -44,12 +98,18 @@ class DataQualityResponse(BaseModel):
         example="Fresh",
         enum=["Fresh", "Stale", "Outdated"]
     )
+    last_ingested_at: Optional[datetime] = Field(
+        None, description="When events of the repository were last inserted"
+    )
+    event_count: Optional[int] = Field(None, description="Number of events stored for the repository")
 
 
 class IssueFirstResponseTimeResponse(BaseModel):
     repository: str
     average_response_time_seconds: float
     average_response_time_readable: str
+    windows: Optional[List[WindowComparison]] = Field(None, description="Per-window values when `windows` is requested")
+    approximation: Optional[ApproximationInfo] = Field(None, description="Sampling details when the result is approximate")
 
 
 class PrSuccessRateResponse(BaseModel):
@@ -57,11 +117,15 @@ class PrSuccessRateResponse(BaseModel):
     total_closed_prs: int = Field(description="Total number of PRs that were closed")
     merged_prs: int = Field(description="Number of closed PRs that were merged")
     success_rate_percent: float = Field(description="Percentage of closed PRs that were merged")
+    windows: Optional[List[WindowComparison]] = Field(None, description="Per-window success rates when `windows` is requested")
+    approximation: Optional[ApproximationInfo] = Field(None, description="Sampling details when the result is approximate")
 
 class PrAvgClosingTimeResponse(BaseModel):
     repository: str
     average_closing_time_seconds: float
     average_closing_time_readable: str
+    windows: Optional[List[WindowComparison]] = Field(None, description="Per-window values when `windows` is requested")
+    approximation: Optional[ApproximationInfo] = Field(None, description="Sampling details when the result is approximate")
 
 class BugResolutionTimeResponse(BaseModel):
     repository: str
@@ -70,11 +134,60 @@ class BugResolutionTimeResponse(BaseModel):
     average_resolution_time_readable: str
     total_bugs_resolved: int
 
+class MetricMonth(BaseModel):
+    month: str = Field(description="YYYY-MM")
+    value: Optional[float] = None
+    count: int
+
+
+class MetricValue(BaseModel):
+    aggregate: str = Field(description="'mean' (of seconds for times), 'ratio' (in percent) or 'count'")
+    value: Optional[float] = Field(None, description="Metric value; null for monthly metrics or without data")
+    count: int = Field(description="Number of issues, PRs or events the value is computed from")
+    windows: Optional[List[WindowComparison]] = Field(None, description="Per-window values when `windows` is requested")
+    months: Optional[List[MetricMonth]] = Field(None, description="Per-month values of monthly metrics")
+
+
+class MetricsResponse(BaseModel):
+    repository: str
+    period: PeriodInfo
+    metrics: Dict[str, MetricValue]
+    queries: int = Field(description="Queries the metrics were computed with")
+    sample_ratio: Optional[float] = Field(None, description="Fraction of issues/PRs sampled, when approximate")
+
+class PrLeadTimeStage(BaseModel):
+    stage: str = Field(description="'opened', 'first_review', 'approval' or 'merge'")
+    reached_prs: int = Field(description="PRs that reached this stage after all previous ones, in order")
+    from_stage: Optional[str] = Field(None, description="Stage the times are measured from")
+    median_seconds: Optional[float] = None
+    p75_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+    median_readable: Optional[str] = None
+
+
+class PrLeadTimeOutcome(BaseModel):
+    outcome: str = Field(description="'merged', or 'closed' without merging")
+    prs: int
+    median_seconds: Optional[float] = Field(None, description="Median time from opening to the outcome")
+    p75_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+    median_readable: Optional[str] = None
+
+
+class PrLeadTimeResponse(BaseModel):
+    repository: str
+    period: PeriodInfo = Field(description="Range the PRs were opened in")
+    stages: List[PrLeadTimeStage] = Field(description="Funnel stages in order")
+    outcomes: List[PrLeadTimeOutcome] = Field(description="Lead time of all merged or closed PRs, reviewed or not")
+
+
 class PrReviewTimeResponse(BaseModel):
     repository: str
     reviewed_pr_count: int = Field(description="Number of PRs that received a review (excluding author)")
     average_review_time_seconds: Optional[float] = Field(None, description="Average time in seconds until the first review by someone other than the author")
     average_review_time_readable: Optional[str] = Field(None, description="Average time in human-readable format")
+    windows: Optional[List[WindowComparison]] = Field(None, description="Per-window values when `windows` is requested")
+    approximation: Optional[ApproximationInfo] = Field(None, description="Sampling details when the result is approximate")
     
     model_config = {
         "json_schema_extra": {
@@ -110,6 +223,8 @@ class IssueAvgResolutionTimeResponse(BaseModel):
     total_issues_resolved: int = Field(
         description="Total number of issues that were resolved (opened and closed)"
     )
+    windows: Optional[List[WindowComparison]] = Field(None, description="Per-window values when `windows` is requested")
+    approximation: Optional[ApproximationInfo] = Field(None, description="Sampling details when the result is approximate")
     
     model_config = {
         "json_schema_extra": {
@@ -150,4 +265,139 @@ class MonthlyIssueStat(BaseModel):
 
 class IssuesOpenClosedMonthlyResponse(BaseModel):
     repository: str
-    data: List[MonthlyIssueStat] = Field(description="List of monthly issue statistics for the last 6 months") 
\ No newline at end of file
+    data: List[MonthlyIssueStat] = Field(description="List of monthly issue statistics for the last 6 months") 
+    opened_windows: Optional[List[WindowComparison]] = Field(None, description="Issues opened per window when `windows` is requested")
+    closed_windows: Optional[List[WindowComparison]] = Field(None, description="Issues closed per window when `windows` is requested")
+    currently_open: Optional[int] = Field(None, description="Issues open as of the last built backlog snapshot, null when there is none")
+
+class RepoSearchResult(BaseModel):
+    repo_name: str = Field(description="Repository name in format 'owner/repo'")
+    event_count: int = Field(description="Number of events recorded for the repository")
+    last_event_at: Optional[datetime] = Field(None, description="Timestamp of the repository's most recent event")
+
+
+class RepoSearchResponse(BaseModel):
+    query: str
+    results: List[RepoSearchResult] = Field(description="Matching repositories, most active first")
+
+
+class WebhookResponse(BaseModel):
+    event: str = Field(description="GitHub event name from the X-GitHub-Event header")
+    accepted: int = Field(description="Number of github_events rows queued for insertion")
+
+
+class ContributorShare(BaseModel):
+    login: str = Field(description="GitHub login")
+    count: int = Field(description="Number of contributions of the requested kind")
+    share_percent: float = Field(description="Share of all contributions of that kind, in percent")
+
+
+class TopContributorsResponse(BaseModel):
+    repository: str
+    kind: str = Field(description="Contribution kind: 'commits', 'prs' or 'reviews'")
+    time_window_months: int
+    total: int = Field(description="Contributions of that kind by all contributors")
+    distinct_contributors: int = Field(description="Approximate number of distinct contributors (uniqCombined)")
+    contributors: List[ContributorShare] = Field(description="Top contributors, with exact counts")
+
+
+class BusFactorResponse(BaseModel):
+    repository: str
+    time_window_months: int
+    threshold_percent: float = Field(description="Share of merged PRs the core contributors account for")
+    bus_factor: int = Field(description="Fewest contributors accounting for threshold_percent of merged PRs")
+    merged_prs: int = Field(description="Merged PRs in the time window")
+    contributors: int = Field(description="Distinct authors of merged PRs")
+    core_contributors: List[ContributorShare] = Field(description="The bus_factor most prolific PR authors")
+
+
+class RetentionPoint(BaseModel):
+    months_later: int
+    retained: Optional[int] = Field(None, description="Cohort members who contributed that month; null until the month is over")
+    retention_percent: Optional[float] = Field(None, description="retained as a share of the cohort, in percent")
+
+
+class ContributorCohort(BaseModel):
+    cohort_month: str = Field(description="Month of the cohort's first contribution, YYYY-MM")
+    new_contributors: int = Field(description="Contributors whose first push or PR event fell in the month")
+    retention: List[RetentionPoint]
+
+
+class ContributorRetentionResponse(BaseModel):
+    repository: str
+    periods: List[int] = Field(description="Months after the cohort month retention is reported for")
+    cohorts: List[ContributorCohort] = Field(description="Monthly cohorts, oldest first")
+
+
+class LabelResolutionTime(BaseModel):
+    label: str = Field(description="Label name, lowercased")
+    issues_resolved: int = Field(description="Number of resolved issues carrying the label")
+    average_resolution_time_seconds: float
+    average_resolution_time_readable: str
+    median_resolution_time_seconds: float
+    p90_resolution_time_seconds: float = Field(description="90th percentile of the resolution time in seconds")
+
+
+class LabelResolutionTimesResponse(BaseModel):
+    repository: str
+    period: PeriodInfo
+    labels: List[LabelResolutionTime] = Field(description="Labels by number of resolved issues, descending")
+
+
+class RepoFreshness(BaseModel):
+    repository: str
+    latest_event_time: datetime
+    last_ingested_at: Optional[datetime] = None
+    event_count: int
+    data_freshness_status: str
+
+
+class FreshnessSummaryResponse(BaseModel):
+    total_repositories: int = Field(description="Repositories with at least min_events events")
+    fresh: int
+    stale: int
+    outdated: int
+    latest_event_time: Optional[datetime] = Field(None, description="Most recent event across the dataset")
+    last_ingested_at: Optional[datetime] = Field(None, description="Most recent insert across the dataset")
+    repositories: List[RepoFreshness] = Field(description="Stale or outdated repositories, most active first")
+
+
+class ProfileStack(BaseModel):
+    frames: List[str] = Field(description="Call stack from the outermost frame to the innermost")
+    samples: int = Field(description="Number of samples that caught this stack")
+
+
+class ProfiledQuery(BaseModel):
+    statement: str
+    parameters: Dict[str, Any]
+    log_comment: str = Field(description="log_comment setting identifying the query in system.query_log")
+    replica: Optional[str] = Field(None, description="ClickHouse replica that ran the query")
+    elapsed_ms: float = Field(description="Time spent in execute() as seen by the API, including the network")
+    query_id: Optional[str] = None
+    query_duration_ms: Optional[int] = Field(None, description="Query duration according to ClickHouse")
+    read_rows: Optional[int] = None
+    read_bytes: Optional[int] = None
+    result_rows: Optional[int] = None
+    result_bytes: Optional[int] = None
+    memory_usage: Optional[int] = None
+    profile_events: Optional[Dict[str, int]] = Field(None, description="ProfileEvents counters of the query")
+    exception: Optional[str] = None
+
+
+class ProfileReport(BaseModel):
+    profile_id: str
+    method: str
+    path: str
+    status_code: Optional[int] = None
+    started_at: datetime
+    elapsed_ms: float = Field(description="Time from receiving the request to the end of the response")
+    query_ms: float = Field(description="Time spent executing SQL statements")
+    outside_queries_ms: float = Field(description="Everything else: routing, validation, Python code, serialization")
+    sample_interval_ms: float
+    samples: int = Field(description="Stack samples taken of the threads serving the request")
+    stacks: List[ProfileStack] = Field(description="Sampled stacks, most frequent first")
+    query_log: str = Field(
+        description="'pending' until system.query_log has been read, then 'complete', 'incomplete' "
+                    "(some entries were not found in time) or 'unavailable' (backend without one)"
+    )
+    queries: List[ProfiledQuery] = Field(description="SQL statements in execution order")
@@ -0,0 +1,35 @@
+from app.core.db import require_derived_tables
+
+RESPONDERS = ("any", "human", "maintainer")
+
+RESPONDER_DESCRIPTION = (
+    "Whose activity counts as a response: 'any' actor, 'human' (no '[bot]' logins) "
+    "or 'maintainer' (per the repo_actor_roles dictionary, see repo_actors.sql)"
+)
+
+
+def actor_role(repo_column: str, login_column: str) -> str:
+    """SQL expression classifying an actor as 'maintainer', 'bot' or 'contributor'.
+
+    The dictionary only holds maintainers, so the lookup falls back to the login suffix.
+    """
+    return (
+        f"dictGetOrDefault('repo_actor_roles', 'role', ({repo_column}, {login_column}), "
+        f"if(endsWith({login_column}, '[bot]'), 'bot', 'contributor'))"
+    )
+
+
+def responder_condition(responder: str, repo_column: str, login_column: str) -> str:
+    """AND-clause restricting responders, or '' for responder='any'."""
+    if responder == "maintainer":
+        return f"AND {actor_role(repo_column, login_column)} = 'maintainer'"
+    if responder == "human":
+        # Same rule the dictionary applies to bots, without the lookup
+        return f"AND NOT endsWith({login_column}, '[bot]')"
+    return ""
+
+
+def require_responder_support(responder: str) -> None:
+    """Answer 501 for responder='maintainer' on backends without repo_actor_roles."""
+    if responder == "maintainer":
+        require_derived_tables()
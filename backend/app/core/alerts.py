@@ -0,0 +1,287 @@
+"""
+Threshold alerts on metrics (see app.core.metrics), evaluated after each ingested batch.
+
+A rule compares one per-item metric of one repository, over a trailing window such as
+'90d', to a threshold. Rules come from the alert_rules table (alerts.sql)
+or a JSON file holding a list of rules, e.g.
+
+    [{"rule_id": "slow-reviews", "repo_name": "acme/widgets", "metric": "pr_review_time",
+      "operator": ">", "threshold": 172800, "window": "30d", "min_count": 5}]
+
+Times are in seconds and rates in percent, as in the metrics' responses. Only the
+repositories in a batch are evaluated, and only against rules whose metric reads one of
+the batch's event types, so the cost follows ingestion rather than the number of rules.
+All rules of a repository are computed together, in one query per metric key over its
+widest window, so an evaluation never reads the repository's whole history. A window
+covers the items whose events fall within it: a '30d' resolution time is that of issues
+opened and closed in the last 30 days. Alerts are emitted when a rule starts ('firing')
+or stops ('resolved') breaching its threshold.
+"""
+import asyncio
+import json
+import logging
+import operator
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.core.aliases import canonical_repo_name
+from app.core.db import get_backend
+from app.core.metrics import METRICS, compute_metrics, event_types
+from app.core.windows import parse_windows
+
+logger = logging.getLogger(__name__)
+
+OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# alerts columns, in the order of the dicts emitted by AlertEvaluator
+ALERT_COLUMNS = (
+    "fired_at", "rule_id", "repo_name", "metric", "window", "state", "value", "count",
+    "operator", "threshold",
+)
+
+LOAD_RULES = text("""
+    SELECT rule_id, repo_name, metric, toString(operator), threshold, window, min_count
+    FROM alert_rules FINAL
+    WHERE enabled
+""")
+
+LAST_STATES = text("""
+    SELECT rule_id, toString(argMax(state, fired_at))
+    FROM alerts
+    GROUP BY rule_id
+""")
+
+
+class AlertRule(NamedTuple):
+    rule_id: str
+    repo_name: str
+    # A metric of METRICS measured per issue or PR
+    metric: str
+    operator: str
+    threshold: float
+    # Trailing window such as '90d'
+    window: str
+    # Fewer items than this leave the rule's state unchanged
+    min_count: int = 1
+
+
+def parse_rule(fields: Dict[str, Any]) -> AlertRule:
+    """Build a rule from its JSON or table fields; raises ValueError when invalid."""
+    metric = fields.get("metric")
+    if metric not in METRICS or METRICS[metric].key != "number":
+        raise ValueError(f"Unknown or monthly metric: {metric}")
+    if fields.get("operator") not in OPERATORS:
+        raise ValueError(f"Operator must be one of {', '.join(OPERATORS)}")
+    window = (fields.get("window") or "").strip().lower()
+    if not window:
+        # Evaluated after every batch, a rule over all events would rescan the history
+        raise ValueError("window is required, e.g. '30d'")
+    parsed_windows = parse_windows(window)
+    if len(parsed_windows) > 1:
+        raise ValueError(f"window must be a single window, e.g. '30d', not '{window}'")
+    window = parsed_windows[0][0]
+    repo_name = fields.get("repo_name")
+    if not repo_name:
+        raise ValueError("repo_name is required")
+    threshold = float(fields["threshold"])
+    rule_id = fields.get("rule_id") or (
+        f"{repo_name}:{metric}:{window}:{fields['operator']}{threshold:g}"
+    )
+    return AlertRule(
+        str(rule_id), repo_name, metric, fields["operator"], threshold, window,
+        int(fields.get("min_count") or 1),
+    )
+
+
+def load_alert_rules(source: str) -> List[AlertRule]:
+    """Rules from the alert_rules table ('clickhouse') or a JSON file; invalid rules are
+    logged and skipped."""
+    if source == "clickhouse":
+        fields = []
+        for session in get_backend().each_shard():
+            for row in session.execute(LOAD_RULES).fetchall():
+                fields.append(dict(zip(AlertRule._fields, row)))
+    else:
+        with open(source) as rules_file:
+            fields = json.load(rules_file)
+
+    rules = []
+    for rule in fields:
+        try:
+            rules.append(parse_rule(rule))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Skipping alert rule %r: %s", rule, e)
+    return rules
+
+
+class RuleSet:
+    """Rules indexed by the current name of their repository and by the event types
+    their metric reads."""
+
+    def __init__(self, rules: Iterable[AlertRule] = ()):
+        self._index: Dict[str, Dict[str, List[AlertRule]]] = {}
+        metric_event_types = {name: event_types(name) for name in METRICS}
+        self.size = 0
+        for rule in rules:
+            by_event_type = self._index.setdefault(canonical_repo_name(rule.repo_name), {})
+            for event_type in metric_event_types[rule.metric]:
+                by_event_type.setdefault(event_type, []).append(rule)
+            self.size += 1
+
+    def __contains__(self, repo_name: str) -> bool:
+        return repo_name in self._index
+
+    def matching(self, repo_name: str, event_types: Iterable[str]) -> List[AlertRule]:
+        """Rules of a repository whose metric reads any of the given event types."""
+        by_event_type = self._index.get(repo_name, {})
+        rules: Dict[str, AlertRule] = {}
+        for event_type in event_types:
+            for rule in by_event_type.get(event_type, ()):
+                rules.setdefault(rule.rule_id, rule)
+        return list(rules.values())
+
+
+class ClickHouseAlertSink:
+    """Inserts alerts into the alerts table."""
+
+    async def send(self, alerts: List[Dict[str, Any]]) -> None:
+        rows = [[alert[column] for column in ALERT_COLUMNS] for alert in alerts]
+        await run_in_threadpool(get_backend().insert, "alerts", ALERT_COLUMNS, rows)
+
+    def last_states(self) -> Dict[str, str]:
+        states: Dict[str, str] = {}
+        for session in get_backend().each_shard():
+            states.update(session.execute(LAST_STATES).fetchall())
+        return states
+
+
+class WebhookAlertSink:
+    """POSTs alerts as JSON, {"alerts": [...]}, to a URL."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, alerts: List[Dict[str, Any]]) -> None:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.url, json=jsonable_encoder({"alerts": alerts}))
+            response.raise_for_status()
+
+    def last_states(self) -> Dict[str, str]:
+        return {}
+
+
+class AlertEvaluator:
+    """
+    Evaluates alert rules for the repositories of each ingested batch.
+
+    The flush listener only records which repositories got which event types; `run()`
+    evaluates them in the background, `concurrency` repositories at a time. Batches
+    arriving meanwhile are merged, so a busy repository is evaluated once per round
+    however many batches touched it. A rule's state only changes once its alert was
+    sent, so alerts a failing sink dropped are emitted again on the next evaluation.
+    """
+
+    def __init__(self, sink, concurrency: int = 4):
+        self.sink = sink
+        self.concurrency = concurrency
+        self.rules = RuleSet()
+        self._states: Dict[str, str] = {}
+        self._pending: Dict[str, Set[str]] = {}
+        self._wake = asyncio.Event()
+
+    def seed_states(self, states: Dict[str, str]) -> None:
+        """Resume from the last state of each rule, e.g. after a restart."""
+        for rule_id, state in states.items():
+            self._states.setdefault(rule_id, state)
+
+    async def on_events_ingested(self, events: Iterable[Dict[str, Any]]) -> None:
+        """EventBuffer flush listener: queue the batch's repositories that have rules."""
+        for event in events:
+            if event["repo_canonical"] in self.rules:
+                self._pending.setdefault(event["repo_canonical"], set()).add(event["event_type"])
+        if self._pending:
+            self._wake.set()
+
+    async def run(self) -> None:
+        """Evaluate queued repositories until cancelled."""
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            pending, self._pending = self._pending, {}
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def evaluate(repo_name: str, rules: List[AlertRule]) -> None:
+                async with semaphore:
+                    await self._evaluate(repo_name, rules)
+
+            evaluations = []
+            for repo_name, types in pending.items():
+                rules = self.rules.matching(repo_name, types)
+                if rules:
+                    evaluations.append(evaluate(repo_name, rules))
+            await asyncio.gather(*evaluations)
+
+    def evaluate(self, repo_name: str, rules: List[AlertRule]) -> List[Dict[str, Any]]:
+        """Compute the rules' metrics together and return the alerts of rules whose
+        state changed, without recording the new states."""
+        now = datetime.utcnow()
+        windows = sorted(
+            {parse_windows(rule.window)[0] for rule in rules}, key=lambda window: window[1]
+        )
+        # Only the windows themselves are compared to thresholds, not the periods before
+        # them, so the scan covers the widest window
+        start_date = now - timedelta(days=windows[-1][1])
+        with get_backend().session(repo_name) as db:
+            results = compute_metrics(
+                db, repo_name, [rule.metric for rule in rules], start_date=start_date,
+                windows=windows, window_end=now,
+            )
+
+        alerts = []
+        for rule in rules:
+            value, count = self._measure(rule, results[rule.metric])
+            if value is None or count < rule.min_count:
+                continue
+            state = "firing" if OPERATORS[rule.operator](value, rule.threshold) else "resolved"
+            if state == self._states.get(rule.rule_id, "resolved"):
+                continue
+            alerts.append({
+                "fired_at": now,
+                "rule_id": rule.rule_id,
+                "repo_name": repo_name,
+                "metric": rule.metric,
+                "window": rule.window,
+                "state": state,
+                "value": value,
+                "count": count,
+                "operator": rule.operator,
+                "threshold": rule.threshold,
+            })
+        return alerts
+
+    @staticmethod
+    def _measure(rule: AlertRule, result) -> Tuple[Optional[float], int]:
+        comparison = next(c for c in result.windows if c["window"] == rule.window)
+        return comparison["value"], comparison["count"]
+
+    async def _evaluate(self, repo_name: str, rules: List[AlertRule]) -> None:
+        try:
+            alerts = await run_in_threadpool(self.evaluate, repo_name, rules)
+            if alerts:
+                await self.sink.send(alerts)
+        except Exception as e:
+            logger.warning("Evaluating alert rules for %s failed: %s", repo_name, e)
+            return
+        for alert in alerts:
+            self._states[alert["rule_id"]] = alert["state"]
@@ -0,0 +1,238 @@
+"""
+Repository renames and transfers, mapping every former name to the current one.
+
+github_events keeps the name each event was recorded under in repo_name and the current
+name in repo_canonical, which leads its sorting key after the event type, so a
+repository's whole history stays one primary-key range whatever it was called.
+repo_canonical is filled at insert time from the repo_aliases_dict dictionary (see
+github_events.sql) and by webhook ingestion from the aliases loaded here. The API rewrites
+former names in the repo_name query parameter (RepoAliasMiddleware), so routes, shard
+routing and the known-repository check only ever see canonical names.
+
+Renames are recorded from `repository` webhooks (renamed and transferred), or by hand.
+Events recorded before a rename was known are moved to the new name by `apply`:
+
+    python -m app.core.aliases add old-owner/old-name new-owner/new-name
+    python -m app.core.aliases apply
+"""
+import argparse
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import text
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db import get_backend
+from app.core.tiering import EVENTS_TABLE, RECENT_EVENTS_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Tables filled from github_events by materialized views, keyed by the canonical name in
+# their repo_name column. Moving history re-inserts the events, which the views add under
+# the new name, so only the rows under the former name are deleted here.
+DERIVED_TABLES = (
+    "repo_catalog",
+    "repo_actors",
+    "repo_contributor_months",
+    "backlog_events",
+    "backlog_items",
+    "backlog_snapshots",
+)
+
+LOAD_ALIASES = text("""
+    SELECT alias, argMax(canonical, updated_at)
+    FROM repo_aliases
+    GROUP BY alias
+""")
+
+# Former names github_events still holds events under
+STALE_NAMES = text("""
+    SELECT DISTINCT toString(repo_canonical)
+    FROM github_events
+    WHERE repo_canonical IN :aliases
+""")
+
+# The filter is applied in a subquery, where the replaced column doesn't shadow it
+MOVE_EVENTS = """
+    INSERT INTO {table}
+    SELECT * REPLACE (:canonical AS repo_canonical)
+    FROM (SELECT * FROM github_events WHERE repo_canonical = :alias)
+"""
+
+EXISTING_TABLES = text("""
+    SELECT name FROM system.tables WHERE database = currentDatabase() AND name IN :tables
+""")
+
+DELETE_EVENTS = """
+    ALTER TABLE {table} DELETE WHERE {column} = :alias
+    SETTINGS mutations_sync = 1
+"""
+
+# Former name -> current name, with chains of renames resolved
+_aliases: Dict[str, str] = {}
+
+
+def canonical_repo_name(repo_name: str) -> str:
+    """The current name of a repository, given any name it was known by."""
+    return _aliases.get(repo_name, repo_name)
+
+
+def resolve_aliases(pairs: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """Map every former name to the end of its chain of renames. A name renamed back to
+    is current again, so names mapped to themselves are dropped."""
+    direct = dict(pairs)
+    resolved = {}
+    for alias in direct:
+        name, seen = alias, {alias}
+        while name in direct and direct[name] not in seen:
+            name = direct[name]
+            seen.add(name)
+        if name != alias:
+            resolved[alias] = name
+    return resolved
+
+
+def load_repo_aliases() -> Dict[str, str]:
+    """(Re)load the aliases from repo_aliases on every shard."""
+    global _aliases
+    pairs: List[Tuple[str, str]] = []
+    for session in get_backend().each_shard():
+        pairs.extend((row[0], row[1]) for row in session.execute(LOAD_ALIASES).fetchall())
+    _aliases = resolve_aliases(pairs)
+    logger.info("Loaded %d repository aliases", len(_aliases))
+    return _aliases
+
+
+def rename_from_webhook(event: str, payload: dict) -> Optional[Tuple[str, str]]:
+    """(former name, new name) of a `repository` webhook announcing a rename or transfer."""
+    repository = payload.get("repository") or {}
+    full_name = repository.get("full_name")
+    changes = payload.get("changes") or {}
+    if event != "repository" or not full_name:
+        return None
+
+    owner, _, name = full_name.partition("/")
+    action = payload.get("action")
+    if action == "renamed":
+        name = ((changes.get("repository") or {}).get("name") or {}).get("from") or name
+    elif action == "transferred":
+        previous_owner = (changes.get("owner") or {}).get("from") or {}
+        owner = (
+            (previous_owner.get("user") or previous_owner.get("organization") or {}).get("login")
+            or owner
+        )
+    else:
+        return None
+    former_name = f"{owner}/{name}"
+    return (former_name, full_name) if former_name != full_name else None
+
+
+def record_rename(former_name: str, new_name: str) -> List[str]:
+    """
+    Record a rename in repo_aliases, re-pointing every earlier name of the repository at
+    the new one so the dictionary needs a single lookup. Returns the former names whose
+    events now belong to the new name.
+    """
+    global _aliases
+    former_names = [former_name] + [
+        alias for alias, canonical in _aliases.items()
+        if canonical == former_name and alias != new_name
+    ]
+    rows = [[alias, new_name] for alias in former_names]
+    if new_name in _aliases:
+        # Renamed back to a former name, which is current again
+        rows.append([new_name, new_name])
+    get_backend().insert("repo_aliases", ("alias", "canonical"), rows)
+
+    aliases = dict(_aliases)
+    aliases.pop(new_name, None)
+    aliases.update((alias, new_name) for alias in former_names)
+    _aliases = aliases
+    logger.info("Recorded the rename of %s to %s", former_name, new_name)
+    return former_names
+
+
+def move_history(former_names: Optional[Sequence[str]] = None) -> int:
+    """
+    Move events still recorded under former names (default: every known alias) to the
+    current name, on every shard; returns the number of former names moved.
+
+    Events are re-inserted with the new repo_canonical, through github_events_all when
+    sharded since the new name may belong to another shard, then deleted under the old
+    one. Backlog snapshots of a moved repository need rebuilding from its first event
+    (python -m app.core.backlog --since ...).
+    """
+    aliases = load_repo_aliases()
+    names = [name for name in (former_names or aliases) if name in aliases]
+    if not names:
+        return 0
+    target = "github_events_all" if len(settings.CLICKHOUSE_SHARDS) > 1 else "github_events"
+
+    moved = 0
+    for session in get_backend().each_shard():
+        stale = [row[0] for row in session.execute(STALE_NAMES, {"aliases": names}).fetchall()]
+        if not stale:
+            continue
+        existing = {
+            row[0] for row in session.execute(
+                EXISTING_TABLES, {"tables": list(DERIVED_TABLES) + [RECENT_EVENTS_TABLE]}
+            ).fetchall()
+        }
+        # github_events_recent gets the moved events through its view as well
+        events_tables = [EVENTS_TABLE]
+        if RECENT_EVENTS_TABLE in existing:
+            events_tables.append(RECENT_EVENTS_TABLE)
+        derived = [table for table in DERIVED_TABLES if table in existing]
+        for alias in stale:
+            params = {"alias": alias, "canonical": aliases[alias]}
+            session.execute(text(MOVE_EVENTS.format(table=target)), params)
+            for table in events_tables:
+                session.execute(
+                    text(DELETE_EVENTS.format(table=table, column="repo_canonical")), params
+                )
+            for table in derived:
+                session.execute(text(DELETE_EVENTS.format(table=table, column="repo_name")), params)
+            logger.info("Moved the events of %s to %s", alias, aliases[alias])
+            moved += 1
+    return moved
+
+
+class RepoAliasMiddleware:
+    """Rewrites a former repository name in the repo_name query parameter to the current
+    one before routing, so everything downstream sees canonical names only."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and _aliases and b"repo_name=" in scope["query_string"]:
+            params = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+            if any(key == "repo_name" and value in _aliases for key, value in params):
+                query_string = urlencode([
+                    (key, canonical_repo_name(value) if key == "repo_name" else value)
+                    for key, value in params
+                ])
+                scope = dict(scope, query_string=query_string.encode("latin-1"))
+        await self.app(scope, receive, send)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.aliases", description=__doc__.split("\n\n")[0].strip()
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Record a rename and move the history it affects")
+    add.add_argument("former_name")
+    add.add_argument("new_name")
+    commands.add_parser("apply", help="Move events recorded under any former name")
+    arguments = parser.parse_args()
+
+    if arguments.command == "add":
+        load_repo_aliases()
+        former_names = record_rename(arguments.former_name, arguments.new_name)
+        print(f"Moved {move_history(former_names)} former names")
+    else:
+        print(f"Moved {move_history()} former names")
@@ -0,0 +1,177 @@
+"""
+Builds the daily open-backlog snapshots of backlog_snapshots.sql.
+
+Each day is built from that day's open, close and reopen events and the previous
+state of the issues and PRs they touch, on top of each repository's previous snapshot.
+Days are built in order, on every shard; rebuilding a day replaces its rows, so a run
+resumes with the last day it built, which may have been partial.
+
+    python -m app.core.backlog                      # catch up through today
+    python -m app.core.backlog --since 2024-01-01   # rebuild after late data
+"""
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.db import QuerySession, get_backend
+
+logger = logging.getLogger(__name__)
+
+# State of every issue and PR with events on :day, before and after the day
+TRANSITIONS = """
+    day_items AS (
+        SELECT
+            repo_name,
+            kind,
+            number,
+            countIf(action = 'opened') > 0 AS opened_today,
+            -- The day's last event decides; a reopen in the same second as a close wins
+            argMax(action != 'closed', (created_at, action)) AS open_at_end
+        FROM backlog_events
+        WHERE day = :day
+        GROUP BY repo_name, kind, number
+    ),
+    previous_items AS (
+        SELECT
+            repo_name,
+            kind,
+            number,
+            1 AS known,
+            -- The latest build of the latest day, rebuilt days not being merged yet
+            argMax(opened_on, (as_of, built_at)) AS opened_on,
+            argMax(is_open, (as_of, built_at)) AS was_open
+        FROM backlog_items
+        WHERE as_of < :day
+          AND (repo_name, kind, number) IN (SELECT repo_name, kind, number FROM day_items)
+        GROUP BY repo_name, kind, number
+    ),
+    transitions AS (
+        SELECT
+            d.repo_name AS repo_name,
+            d.kind AS kind,
+            d.number AS number,
+            -- Items opened before the first recorded event count from their first reopen
+            if(p.known = 1, p.opened_on, toDate(:day)) AS opened_on,
+            toUInt8(d.open_at_end) AS is_open,
+            toInt32(d.open_at_end) - toInt32(if(p.known = 1, p.was_open, 0)) AS change
+        FROM day_items d
+        LEFT JOIN previous_items p
+            ON d.repo_name = p.repo_name AND d.kind = p.kind AND d.number = p.number
+    )
+"""
+
+BUILD_SNAPSHOTS = text("""
+    INSERT INTO backlog_snapshots (repo_name, day, open_issues, open_prs)
+    WITH
+    {transitions},
+    changes AS (
+        SELECT
+            repo_name,
+            sumMapIf([opened_on], [change], kind = 'issue') AS issue_changes,
+            sumMapIf([opened_on], [change], kind = 'pr') AS pr_changes
+        FROM transitions
+        WHERE change != 0
+        GROUP BY repo_name
+    ),
+    previous_snapshots AS (
+        SELECT
+            repo_name,
+            argMax(open_issues, (day, built_at)) AS open_issues,
+            argMax(open_prs, (day, built_at)) AS open_prs
+        FROM backlog_snapshots
+        WHERE day < :day
+          AND repo_name IN (SELECT repo_name FROM changes)
+        GROUP BY repo_name
+    )
+    SELECT
+        c.repo_name,
+        toDate(:day),
+        mapFilter((opened_on, open) -> open != 0,
+            mapAdd(s.open_issues, mapFromArrays(c.issue_changes.1, c.issue_changes.2))),
+        mapFilter((opened_on, open) -> open != 0,
+            mapAdd(s.open_prs, mapFromArrays(c.pr_changes.1, c.pr_changes.2)))
+    FROM changes c
+    LEFT JOIN previous_snapshots s ON c.repo_name = s.repo_name
+""".format(transitions=TRANSITIONS))
+
+BUILD_ITEMS = text("""
+    INSERT INTO backlog_items (repo_name, kind, number, as_of, opened_on, is_open)
+    WITH {transitions}
+    SELECT repo_name, kind, number, toDate(:day), opened_on, is_open
+    FROM transitions
+""".format(transitions=TRANSITIONS))
+
+RECORD_BUILD = text("INSERT INTO backlog_builds (day) SELECT toDate(:day)")
+
+RESUME_DAY = text("""
+    SELECT
+        (SELECT max(day) FROM backlog_builds) AS last_built,
+        (SELECT min(day) FROM backlog_events) AS first_event
+""")
+
+
+LATEST_OPEN_ISSUES = text("""
+    SELECT open_issue_count
+    FROM backlog_snapshots
+    WHERE repo_name = :repo_name
+    ORDER BY day DESC, built_at DESC
+    LIMIT 1
+""")
+
+
+def current_open_issues(db: QuerySession, repo_name: str) -> Optional[int]:
+    """Issues open as of the repository's latest snapshot; None without one, or on
+    backends without the snapshot tables."""
+    if not get_backend().supports_derived_tables:
+        return None
+    row = db.execute(LATEST_OPEN_ISSUES, {"repo_name": repo_name}).fetchone()
+    return int(row[0]) if row else None
+
+
+def build_day(db: QuerySession, day: date) -> None:
+    # Snapshots first: they read the items' state from before the day. An INSERT retried
+    # on another replica only writes rows the tables replace
+    db.execute(BUILD_SNAPSHOTS, {"day": day})
+    db.execute(BUILD_ITEMS, {"day": day})
+    db.execute(RECORD_BUILD, {"day": day})
+
+
+def build_backlog_snapshots(since: Optional[date] = None, until: Optional[date] = None) -> int:
+    """Build every day from `since` (default: the last built day, or the first day with
+    events) through `until` (default: today) on each shard; returns the days built."""
+    until = until or datetime.utcnow().date()
+    built = 0
+    for db in get_backend().each_shard():
+        first = since
+        if first is None:
+            last_built, first_event = db.execute(RESUME_DAY).fetchone()
+            first = last_built if last_built and last_built > date(1970, 1, 1) else first_event
+        if not first or first <= date(1970, 1, 1):
+            continue
+
+        day = first
+        while day <= until:
+            build_day(db, day)
+            built += 1
+            if day.day == 1:
+                logger.info("Built backlog snapshots through %s", day)
+            day += timedelta(days=1)
+    return built
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.backlog", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument(
+        "--since", type=date.fromisoformat, help="First day to (re)build, YYYY-MM-DD"
+    )
+    parser.add_argument(
+        "--until", type=date.fromisoformat, help="Last day to build, YYYY-MM-DD"
+    )
+    arguments = parser.parse_args()
+    print(f"Built {build_backlog_snapshots(arguments.since, arguments.until)} days")
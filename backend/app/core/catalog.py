@@ -0,0 +1,179 @@
+import heapq
+import logging
+from bisect import bisect_left
+from itertools import islice
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import get_backend
+
+logger = logging.getLogger(__name__)
+
+# Prefix matches beyond which search walks the ranked entries instead of ranking the
+# matches, and how many entries that walk may visit before ranking the matches anyway
+RANGE_SCAN_THRESHOLD = 20000
+MAX_RANKED_SCAN = 50000
+
+
+class RepoEntry(NamedTuple):
+    repo_name: str
+    event_count: int
+    last_event_at: Optional[datetime]
+
+
+class RepoCatalog:
+    """
+    In-memory prefix index over repo_catalog.
+
+    Entries are ranked by activity, and each one is indexed under its lowercased full
+    name and its name without the owner, so "react" finds "facebook/react". A query
+    binary-searches the sorted keys and picks the best-ranked matches of the key range.
+    """
+
+    def __init__(self, entries: Iterable[RepoEntry]):
+        # Loads arrive ranked (one run per shard), which keeps this sort near-linear
+        self.entries: List[RepoEntry] = sorted(entries, key=lambda e: (-e.event_count, e.repo_name))
+        self.by_name: Dict[str, RepoEntry] = {entry.repo_name: entry for entry in self.entries}
+
+        names = []
+        ranks = []
+        for rank, entry in enumerate(self.entries):
+            name = entry.repo_name.lower()
+            names.append(name)
+            ranks.append(rank)
+            _, slash, short_name = name.partition("/")
+            if slash and short_name:
+                names.append(short_name)
+                ranks.append(rank)
+        order = sorted(range(len(names)), key=names.__getitem__)
+        self._keys = [names[i] for i in order]
+        self._ranks = [ranks[i] for i in order]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, repo_name: str) -> bool:
+        return repo_name in self.by_name
+
+    def search(self, query: str, limit: int) -> List[RepoEntry]:
+        """Most active repositories whose full name or name without owner starts with query."""
+        prefix = query.strip().lower()
+        if not prefix:
+            return []
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff", lo)
+
+        if hi - lo > RANGE_SCAN_THRESHOLD:
+            # Short prefixes match a large share of all repositories, so walking the
+            # entries in rank order finds the top ones sooner than ranking the range
+            matches = []
+            for entry in islice(self.entries, MAX_RANKED_SCAN):
+                name = entry.repo_name.lower()
+                if name.startswith(prefix) or name.partition("/")[2].startswith(prefix):
+                    matches.append(entry)
+                    if len(matches) == limit:
+                        return matches
+
+        # A repository appears at most twice in the range, so 2 * limit ranks hold
+        # at least `limit` distinct ones
+        ranks = heapq.nsmallest(2 * limit, self._ranks[lo:hi])
+        return [self.entries[rank] for rank in dict.fromkeys(ranks)][:limit]
+
+
+_catalog: Optional[RepoCatalog] = None
+
+
+def get_repo_catalog() -> Optional[RepoCatalog]:
+    """The loaded catalog, or None until the first load succeeds."""
+    return _catalog
+
+
+def load_repo_catalog() -> RepoCatalog:
+    """(Re)load the in-memory catalog from repo_catalog on every shard."""
+    global _catalog
+    query = text(
+        """
+        SELECT
+            repo_name,
+            sum(event_count) AS event_count,
+            max(last_event_at) AS last_event_at
+        FROM repo_catalog
+        GROUP BY repo_name
+        HAVING event_count >= :min_events
+        ORDER BY event_count DESC, repo_name
+        """
+    )
+    entries = []
+    for session in get_backend().each_shard():
+        rows = session.execute(query, {"min_events": settings.REPO_CATALOG_MIN_EVENTS}).fetchall()
+        entries.extend(RepoEntry(row[0], int(row[1]), row[2]) for row in rows)
+
+    _catalog = RepoCatalog(entries)
+    logger.info("Loaded %d repositories into the repository catalog", len(_catalog))
+    return _catalog
+
+
+def like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_repo_index(query: str, limit: int) -> List[RepoEntry]:
+    """Same matching as RepoCatalog.search, answered by repo_catalog's n-gram index."""
+    prefix = like_escape(query.strip().lower())
+    statement = text(
+        """
+        SELECT
+            repo_name,
+            sum(event_count) AS event_count,
+            max(last_event_at) AS last_event_at
+        FROM repo_catalog
+        WHERE lower(repo_name) LIKE :name_prefix
+           OR lower(repo_name) LIKE :short_name_prefix
+        GROUP BY repo_name
+        ORDER BY event_count DESC, repo_name
+        LIMIT :limit
+        """
+    )
+    params = {
+        "name_prefix": f"{prefix}%",
+        "short_name_prefix": f"%/{prefix}%",
+        "limit": limit,
+    }
+    entries = []
+    for session in get_backend().each_shard():
+        rows = session.execute(statement, params).fetchall()
+        entries.extend(RepoEntry(row[0], int(row[1]), row[2]) for row in rows)
+    return sorted(entries, key=lambda e: (-e.event_count, e.repo_name))[:limit]
+
+
+def require_known_repo(request: Request) -> None:
+    """
+    Reject requests for repositories missing from the catalog with a 404 before any
+    query against github_events runs.
+
+    Repos not in memory (below REPO_CATALOG_MIN_EVENTS, or first seen after the last load)
+    are looked up by primary key in repo_catalog on the owning shard. Until a non-empty
+    catalog has loaded, or when the lookup fails, requests pass through unchecked.
+    """
+    repo_name = request.query_params.get("repo_name")
+    catalog = _catalog
+    # An empty catalog has not been backfilled yet, so it can't tell unknown repos apart
+    if not repo_name or not catalog or repo_name in catalog:
+        return
+
+    try:
+        with get_backend().session(repo_name) as session:
+            row = session.execute(
+                text("SELECT 1 FROM repo_catalog WHERE repo_name = :repo_name LIMIT 1"),
+                {"repo_name": repo_name}
+            ).fetchone()
+    except Exception as e:
+        logger.warning("Repository catalog lookup failed for %s: %s", repo_name, e)
+        return
+
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Unknown repository: {repo_name}")
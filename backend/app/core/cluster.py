@@ -0,0 +1,280 @@
+import itertools
+import logging
+import socket
+import threading
+import time
+import zlib
+from typing import Any, List, Optional, Sequence, Tuple
+
+from clickhouse_driver import errors as driver_errors
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, create_engine
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_ERRORS = (
+    driver_errors.NetworkError,
+    driver_errors.SocketTimeoutError,
+    driver_errors.UnexpectedPacketFromServerError,
+    ConnectionError,
+    socket.timeout,
+    EOFError,
+)
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """Whether an exception (possibly wrapped by SQLAlchemy and the DB-API layer) is a
+    failure to reach the server, as opposed to an error in the query itself."""
+    seen = set()
+    pending: List[Any] = [exc]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, CONNECTION_ERRORS):
+            return True
+        if isinstance(current, BaseException):
+            pending.extend([getattr(current, "orig", None), current.__cause__, *current.args[:1]])
+    return False
+
+
+class NoHealthyReplicaError(ConnectionError):
+    pass
+
+
+class Replica:
+    def __init__(self, host: str, port: int, uri: str, retry_interval: float, pool_size: int = 5):
+        self.host = host
+        self.port = port
+        self.retry_interval = retry_interval
+        self.pool_size = pool_size
+        self.healthy = True
+        self.retry_at = 0.0
+        self._uri = uri
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_engine(self._uri, echo=True, pool_size=self.pool_size)
+        return self._engine
+
+    def mark_down(self) -> None:
+        if self.healthy:
+            logger.warning("ClickHouse replica %s is unreachable, failing over", self.address)
+        self.healthy = False
+        self.retry_at = time.monotonic() + self.retry_interval
+
+    def mark_up(self) -> None:
+        if not self.healthy:
+            logger.info("ClickHouse replica %s is reachable again", self.address)
+        self.healthy = True
+
+    def ping(self) -> bool:
+        """Health check: run SELECT 1 and update the replica state."""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            self.mark_down()
+            return False
+        self.mark_up()
+        return True
+
+    def prewarm(self, connections: int) -> None:
+        """Open pooled connections up front so the first requests don't pay connection setup."""
+        opened = []
+        try:
+            for _ in range(min(connections, self.pool_size)):
+                connection = self.engine.connect()
+                opened.append(connection)
+                # The native driver connects lazily, on the first query
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in opened:
+                connection.close()
+
+    def insert(self, statement: str, rows: Sequence[Sequence[Any]]) -> None:
+        """Insert rows as a single block through the native driver's executemany."""
+        connection = self.engine.raw_connection()
+        try:
+            connection.cursor().executemany(statement, rows)
+        finally:
+            connection.close()
+
+    def dispose(self) -> None:
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+class Shard:
+    def __init__(self, index: int, replicas: List[Replica]):
+        self.index = index
+        self.replicas = replicas
+        self._turn = itertools.count()
+
+    def candidates(self) -> List[Replica]:
+        """
+        Replicas to try, in order: healthy ones rotated round-robin for load balancing,
+        then those marked down as a last resort, so a transient error on a single-replica
+        shard only fails the request that hit it.
+
+        Down replicas are health-checked in the background (Cluster.check_down_replicas),
+        never here, so an unreachable replica only adds its connect timeout to requests
+        that every healthy replica has failed too.
+        """
+        start = next(self._turn) % len(self.replicas)
+        rotated = self.replicas[start:] + self.replicas[:start]
+        return (
+            [replica for replica in rotated if replica.healthy]
+            + [replica for replica in rotated if not replica.healthy]
+        )
+
+    def insert(self, statement: str, rows: Sequence[Sequence[Any]]) -> None:
+        """
+        Insert a batch on one replica, replication copying it to the others. On a
+        connection error the batch is retried on the next replica; a block that did reach
+        the first one is dropped as a duplicate by ReplicatedMergeTree's insert
+        deduplication.
+        """
+        last_error: Optional[BaseException] = None
+        for replica in self.candidates():
+            try:
+                replica.insert(statement, rows)
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                replica.mark_down()
+                last_error = e
+                continue
+            replica.mark_up()
+            return
+
+        raise NoHealthyReplicaError(
+            f"No reachable ClickHouse replica for shard {self.index}"
+        ) from last_error
+
+
+class Cluster:
+    """
+    ClickHouse nodes grouped into shards of interchangeable replicas.
+
+    With several shards, github_events is distributed by CRC32(repo_canonical) % shard count
+    (a Distributed table with equal shard weights, see github_events_cluster.sql), so a
+    single-repo query can run against the local table of the owning shard only.
+    """
+
+    def __init__(
+        self,
+        shards: Sequence[Sequence[Tuple[str, int]]],
+        uri_for,
+        retry_interval: float,
+        pool_size: int = 5,
+    ):
+        self.shards = [
+            Shard(index, [
+                Replica(host, port, uri_for(host, port), retry_interval, pool_size)
+                for host, port in replicas
+            ])
+            for index, replicas in enumerate(shards)
+        ]
+        self._any_shard = itertools.count()
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.shards) > 1
+
+    def shard_for(self, repo_name: Optional[str]) -> Shard:
+        if not self.sharded:
+            return self.shards[0]
+        if repo_name is None:
+            return self.shards[next(self._any_shard) % len(self.shards)]
+        return self.shards[zlib.crc32(repo_name.encode("utf-8")) % len(self.shards)]
+
+    def replicas(self) -> List[Replica]:
+        return [replica for shard in self.shards for replica in shard.replicas]
+
+    def check_health(self) -> dict:
+        """Ping every replica; returns {address: healthy}."""
+        return {replica.address: replica.ping() for replica in self.replicas()}
+
+    def check_down_replicas(self) -> dict:
+        """Ping the replicas marked down whose retry interval has passed, bringing those
+        that answer back into rotation; returns {address: healthy} of the pinged ones."""
+        now = time.monotonic()
+        return {
+            replica.address: replica.ping()
+            for replica in self.replicas() if not replica.healthy and replica.retry_at <= now
+        }
+
+    def dispose(self) -> None:
+        for replica in self.replicas():
+            replica.dispose()
+
+
+class FailoverSession:
+    """
+    Session bound to one shard. Statements run on one replica, sticking to it for the
+    rest of the request; on a connection error the replica is marked down and the
+    statement is retried on the next one. Only read queries go through this session,
+    so retrying is safe.
+    """
+
+    def __init__(self, shard: Shard):
+        self.shard = shard
+        self.replica: Optional[Replica] = None
+        self._session: Optional[Session] = None
+
+    def _bind(self, replica: Replica) -> Session:
+        if self.replica is not replica or self._session is None:
+            self.close()
+            self._session = Session(replica.engine)
+            self.replica = replica
+        return self._session
+
+    def execute(self, statement: Any, params: Optional[dict] = None) -> Any:
+        candidates = self.shard.candidates()
+        if self.replica in candidates:
+            candidates.remove(self.replica)
+            candidates.insert(0, self.replica)
+
+        last_error: Optional[BaseException] = None
+        for replica in candidates:
+            try:
+                result = self._bind(replica).execute(statement, params)
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                replica.mark_down()
+                self.close()
+                last_error = e
+                continue
+            replica.mark_up()
+            return result
+
+        raise NoHealthyReplicaError(
+            f"No reachable ClickHouse replica for shard {self.shard.index}"
+        ) from last_error
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        self.replica = None
+
+    def __enter__(self) -> "FailoverSession":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -1,22 +1,274 @@
-from sqlmodel import Session, create_engine, SQLModel
-from sqlalchemy.orm import sessionmaker
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
 from clickhouse_sqlalchemy import engines
 
+from app.core.cluster import Cluster, FailoverSession
 from app.core.config import settings
+from app.core.profiling import profiled
+
+# Per-statement statistics of profiled requests (see app/core/profiling.py)
+QUERY_LOG = text("""
+    SELECT
+        log_comment,
+        query_id,
+        query_duration_ms,
+        read_rows,
+        read_bytes,
+        result_rows,
+        result_bytes,
+        memory_usage,
+        ProfileEvents AS profile_events,
+        exception
+    FROM system.query_log
+    WHERE event_date >= yesterday()
+        AND type != 'QueryStart'
+        AND has(:log_comments, log_comment)
+""")
+
+
+class QueryResult(Protocol):
+    def fetchone(self) -> Optional[Sequence[Any]]: ...
+
+    def fetchall(self) -> List[Sequence[Any]]: ...
+
+
+class QuerySession(Protocol):
+    def execute(self, statement: Any, params: Optional[dict] = None) -> QueryResult: ...
+
+
+class QueryBackend:
+    """
+    Base class for query backends.
+
+    Routes only rely on the session yielded by `session()` exposing
+    `execute(statement, params)` whose result has fetchone()/fetchall(), so any engine
+    that runs ClickHouse SQL against a `github_events` table can serve them.
+    """
+
+    name = "base"
+    # Whether github_events supports SAMPLE (accuracy=approx)
+    supports_sampling = False
+    # Whether insert() is available (webhook ingestion)
+    supports_inserts = False
+    # Whether query_log() is available (request profiling)
+    supports_query_log = False
+    # Whether the tables derived from github_events by materialized views and jobs exist:
+    # repo_catalog, repo_actor_roles, repo_contributor_months and the backlog snapshots
+    supports_derived_tables = False
+
+    @contextmanager
+    def session(self, repo_name: Optional[str] = None) -> Iterator[QuerySession]:
+        """Yield a session; repo_name lets backends route single-repo queries."""
+        raise NotImplementedError
+        yield
+
+    def each_shard(self) -> Iterator[QuerySession]:
+        """Yield a session on every shard in turn, for queries spanning all repositories."""
+        with self.session() as session:
+            yield session
+
+    def insert(self, table: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+        """Insert rows in as few blocks as possible, never row by row."""
+        raise NotImplementedError(f"The {self.name} backend does not support inserts")
+
+    def query_log(self, statements: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """system.query_log entries of profiled statements, looked up by their log_comment
+        on the replica that ran them (the 'log_comment' and 'replica' keys)."""
+        raise NotImplementedError(f"The {self.name} backend has no query log")
+
+    def warm_up(self, connections: int, query: str) -> None:
+        """Prepare the backend before the worker reports ready: open `connections`
+        pooled connections where pooling applies and run the warm-up `query`."""
+        with self.session() as session:
+            session.execute(text(query)).fetchall()
+
+    def check_replicas(self) -> None:
+        """Health-check servers that failed, off the request path, where there are any."""
+
+    def close(self) -> None:
+        pass
+
+
+class ClickHouseBackend(QueryBackend):
+    """
+    ClickHouse servers reached through SQLAlchemy's native interface.
+
+    A single CLICKHOUSE_HOST is a cluster of one; with CLICKHOUSE_HOSTS, sessions
+    load-balance across the replicas of the shard owning the requested repository and
+    fail over on connection errors.
+    """
+
+    name = "clickhouse"
+    supports_sampling = True
+    supports_inserts = True
+    supports_query_log = True
+    supports_derived_tables = True
+
+    def __init__(self, shards: Sequence[Sequence[Tuple[str, int]]]):
+        self.cluster = Cluster(
+            shards,
+            settings.clickhouse_uri,
+            settings.CLICKHOUSE_RETRY_INTERVAL,
+            settings.DB_POOL_SIZE,
+        )
+
+    @contextmanager
+    def session(self, repo_name: Optional[str] = None) -> Iterator[QuerySession]:
+        session = FailoverSession(self.cluster.shard_for(repo_name))
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def each_shard(self) -> Iterator[QuerySession]:
+        for shard in self.cluster.shards:
+            with FailoverSession(shard) as session:
+                yield session
+
+    def insert(self, table: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+        # One block per shard; with several shards rows go to the local table of the shard
+        # owning their repository, as the Distributed table would route them: by its
+        # current name when the rows carry it
+        batches: Dict[int, List[Sequence[Any]]] = {}
+        repo_column = "repo_canonical" if "repo_canonical" in columns else "repo_name"
+        repo_index = list(columns).index(repo_column) if repo_column in columns else None
+        for row in rows:
+            repo_name = row[repo_index] if repo_index is not None else None
+            batches.setdefault(self.cluster.shard_for(repo_name).index, []).append(row)
+
+        settings_clause = (
+            " SETTINGS async_insert = 1, wait_for_async_insert = 1"
+            if settings.INGEST_ASYNC_INSERT else ""
+        )
+        statement = f"INSERT INTO {table} ({', '.join(columns)}){settings_clause} VALUES"
+        for index, batch in batches.items():
+            self.cluster.shards[index].insert(statement, batch)
+
+    def query_log(self, statements: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # query_log is local to each node, so ask the replicas that ran the statements
+        comments: Dict[str, List[str]] = {}
+        for statement in statements:
+            if statement["replica"] is not None:
+                comments.setdefault(statement["replica"], []).append(statement["log_comment"])
 
-# Use ClickHouse's HTTP interface with SQLModel
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), echo=True)
+        entries = []
+        for replica in self.cluster.replicas():
+            if replica.address not in comments:
+                continue
+            with Session(replica.engine) as session:
+                result = session.execute(QUERY_LOG, {"log_comments": comments[replica.address]})
+                entries.extend(dict(row._mapping) for row in result.fetchall())
+        return entries
 
-# Use SQLModel's session maker
-SessionLocal = sessionmaker(bind=engine)
+    def warm_up(self, connections: int, query: str) -> None:
+        for shard in self.cluster.shards:
+            for replica in shard.replicas:
+                replica.prewarm(connections)
+            with FailoverSession(shard) as session:
+                session.execute(text(query)).fetchall()
 
-def get_db():
-    with Session(engine) as session:
-        yield session
+    def check_replicas(self) -> None:
+        self.cluster.check_down_replicas()
+
+    def close(self) -> None:
+        self.cluster.dispose()
+
+
+class StubResult:
+    def fetchone(self) -> Optional[Sequence[Any]]:
+        return None
+
+    def fetchall(self) -> List[Sequence[Any]]:
+        return []
+
+
+class StubSession:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def execute(self, statement: Any, params: Optional[dict] = None) -> StubResult:
+        # Block like the native driver does, so the threadpool fills up as it would
+        time.sleep(self.latency)
+        return StubResult()
+
+
+class StubBackend(QueryBackend):
+    """
+    Answers every query with an empty result after a fixed delay.
+
+    For load tests of the API itself (see app/loadtest.py): the delay stands in for
+    ClickHouse query time, and routes answer as they do for repositories without data,
+    with their "no data" 404 or an empty 200. Stub throughput therefore only covers routing,
+    threadpool contention and the delay, not building responses or assembling metrics,
+    and overstates the capacity of a server answering with real data.
+    """
+
+    name = "stub"
+    # Every query answers no rows, whatever table it reads
+    supports_derived_tables = True
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+
+    @contextmanager
+    def session(self, repo_name: Optional[str] = None) -> Iterator[QuerySession]:
+        yield StubSession(self.latency)
+
+
+def create_backend() -> QueryBackend:
+    if settings.QUERY_BACKEND == "embedded":
+        from app.core.embedded import EmbeddedBackend
+        return EmbeddedBackend(settings.EMBEDDED_DATA_DIR)
+    if settings.QUERY_BACKEND == "stub":
+        return StubBackend(settings.STUB_QUERY_LATENCY_MS)
+    return ClickHouseBackend(settings.CLICKHOUSE_SHARDS)
+
+
+_backend: Optional[QueryBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> QueryBackend:
+    """The configured query backend, created on first use rather than at import."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def close_backend() -> None:
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+        _backend = None
+
+
+def require_derived_tables() -> None:
+    """Answer 501 for routes reading tables derived from github_events on backends
+    without them (see QueryBackend.supports_derived_tables)."""
+    backend = get_backend()
+    if not backend.supports_derived_tables:
+        raise HTTPException(
+            status_code=501, detail=f"Not supported by the {backend.name} backend"
+        )
+
+
+def get_db(request: Request):
+    # Single-repo routes take repo_name as a query parameter; it selects the owning shard
+    with get_backend().session(request.query_params.get("repo_name")) as session:
+        yield profiled(session)
 
 # Ensure all tables are created
 def init_db():
     from app.models import Stats
-    
-    #SQLModel.metadata.create_all(engine)
 
+    #SQLModel.metadata.create_all(engine)
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional
+
+from clickhouse_driver.util.escape import escape_params
+from clickhouse_sqlalchemy.drivers.native.base import ClickHouseDialect_native
+
+from app.core.db import QueryBackend, QuerySession
+from app.core.tiering import RECENT_EVENTS_TABLE
+
+# Tables served from Parquet files: <data dir>/<table>/**/*.parquet
+EMBEDDED_TABLES = ("github_events",)
+
+
+class _EscapeContext:
+    """Minimal stand-in for the clickhouse_driver context used to escape parameters."""
+
+    class server_info:
+        @staticmethod
+        def get_timezone() -> str:
+            return "UTC"
+
+
+def _convert(type_name: str, value: Any) -> Any:
+    """Convert a JSONCompact value to the Python type the native driver would return."""
+    if value is None:
+        return None
+    if type_name.startswith("Nullable("):
+        return _convert(type_name[9:-1], value)
+    if type_name.startswith("LowCardinality("):
+        return _convert(type_name[15:-1], value)
+    if type_name.startswith("DateTime"):
+        return datetime.fromisoformat(value[:19])
+    if type_name in ("Date", "Date32"):
+        return date.fromisoformat(value)
+    if type_name.startswith("Array("):
+        return [_convert(type_name[6:-1], item) for item in value]
+    if type_name.startswith(("UInt", "Int")) and isinstance(value, str):
+        return int(value)
+    if type_name.startswith("Float") and isinstance(value, str):
+        return float(value)
+    return value
+
+
+class EmbeddedResult:
+    def __init__(self, rows: List[tuple]):
+        self._rows = rows
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self) -> List[tuple]:
+        return list(self._rows)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self._rows)
+
+
+class EmbeddedSession:
+    """Session facade executing SQLAlchemy text() statements in chDB."""
+
+    _dialect = ClickHouseDialect_native()
+
+    def __init__(self, backend: "EmbeddedBackend"):
+        self._backend = backend
+
+    def render(self, statement: Any, params: Optional[dict] = None) -> str:
+        """Render a statement with its parameters inlined, as the native driver does client-side."""
+        if isinstance(statement, str):
+            compiled = statement
+        else:
+            compiled = str(statement.compile(dialect=self._dialect))
+        if not params:
+            return compiled.replace("%%", "%")
+        return compiled % escape_params(params, _EscapeContext)
+
+    def execute(self, statement: Any, params: Optional[dict] = None) -> EmbeddedResult:
+        return self._backend.query(self.render(statement, params))
+
+
+class EmbeddedBackend(QueryBackend):
+    """
+    In-process chDB engine over partitioned Parquet files.
+
+    Each table in EMBEDDED_TABLES is exposed as a view over
+    `<data_dir>/<table>/**/*.parquet`, so the route SQL runs unchanged with no
+    network hop. Sorting the files by (event_type, repo_canonical, created_at) lets
+    Parquet row-group statistics skip most of the data for single-repo queries.
+    Tables ClickHouse derives from github_events are not built, so routes reading them
+    answer 501 (see QueryBackend.supports_derived_tables).
+    """
+
+    name = "embedded"
+    supports_sampling = False
+
+    def __init__(self, data_dir: str):
+        try:
+            import chdb.session
+        except ImportError as e:
+            raise RuntimeError(
+                "QUERY_BACKEND=embedded requires chdb (pip install 'gitlytix[embedded]')"
+            ) from e
+
+        self.data_dir = os.path.abspath(data_dir)
+        self._session = chdb.session.Session()
+        # chDB sessions are not safe for concurrent use from the request threadpool
+        self._lock = threading.Lock()
+        for table in EMBEDDED_TABLES:
+            pattern = os.path.join(self.data_dir, table, "**", "*.parquet").replace("'", "\\'")
+            source = f"file('{pattern}', Parquet)"
+            columns = "*"
+            if table == "github_events" and not self._has_column(source, "repo_canonical"):
+                # Exported before repositories had canonical names: the names recorded are
+                # taken as current
+                columns = "*, repo_name AS repo_canonical"
+            self.query(f"CREATE OR REPLACE VIEW {table} AS SELECT {columns} FROM {source}")
+        # Exports have no separate recent table; queries routed to it read every event
+        self.query(f"CREATE OR REPLACE VIEW {RECENT_EVENTS_TABLE} AS SELECT * FROM github_events")
+
+    def _has_column(self, source: str, column: str) -> bool:
+        try:
+            return any(row[0] == column for row in self.query(f"DESCRIBE {source}").fetchall())
+        except Exception:
+            # No files yet: whatever is exported later is expected to have every column
+            return True
+
+    def query(self, sql: str) -> EmbeddedResult:
+        with self._lock:
+            output = self._session.query(sql, "JSONCompact").bytes()
+        if not output.strip():
+            return EmbeddedResult([])
+
+        payload = json.loads(output)
+        types = [column["type"] for column in payload["meta"]]
+        return EmbeddedResult([
+            tuple(_convert(type_name, value) for type_name, value in zip(types, row))
+            for row in payload["data"]
+        ])
+
+    @contextmanager
+    def session(self, repo_name: Optional[str] = None) -> Iterator[QuerySession]:
+        yield EmbeddedSession(self)
+
+    def close(self) -> None:
+        self._session.close()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, Any]
+FlushListener = Callable[[List[Event]], Awaitable[None]]
+
+# Delivery IDs remembered to drop webhooks GitHub redelivers
+RECENT_DELIVERIES = 10000
+
+
+class BufferFullError(Exception):
+    pass
+
+
+class EventBuffer:
+    """
+    In-memory buffer batching ingested events into block inserts.
+
+    `add()` queues events and `run()` flushes them once `flush_rows` are pending or
+    `flush_interval` seconds after the previous flush. A failed insert keeps its events
+    queued for the next attempt, and `add()` refuses new events while `max_rows` are
+    waiting, so producers see backpressure instead of the worker running out of memory.
+
+    Listeners are awaited with every batch after it has been inserted.
+    """
+
+    def __init__(
+        self,
+        insert: Callable[[List[Event]], None],
+        flush_rows: int,
+        flush_interval: float,
+        max_rows: int,
+    ):
+        self._insert = insert
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._pending: List[Event] = []
+        self._in_flight = 0
+        self._deliveries: "OrderedDict[str, None]" = OrderedDict()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._listeners: List[FlushListener] = []
+
+    @property
+    def size(self) -> int:
+        """Events not inserted yet, including the batch being inserted."""
+        return len(self._pending) + self._in_flight
+
+    def add_listener(self, listener: FlushListener) -> None:
+        self._listeners.append(listener)
+
+    def add(self, events: Sequence[Event], delivery_id: Optional[str] = None) -> bool:
+        """
+        Queue events, returning False for a delivery that was already queued.
+
+        Raises BufferFullError when accepting them would exceed max_rows.
+        """
+        if delivery_id is not None and delivery_id in self._deliveries:
+            return False
+        if self.size + len(events) > self.max_rows:
+            raise BufferFullError(f"{self.size} events are waiting to be inserted")
+
+        if delivery_id is not None:
+            self._deliveries[delivery_id] = None
+            if len(self._deliveries) > RECENT_DELIVERIES:
+                self._deliveries.popitem(last=False)
+        self._pending.extend(events)
+        if len(self._pending) >= self.flush_rows:
+            self._wake.set()
+        return True
+
+    async def flush(self) -> int:
+        """Insert everything pending as one batch; returns the number of events inserted."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            self._in_flight = len(batch)
+            try:
+                await run_in_threadpool(self._insert, batch)
+            except BaseException:
+                # Keep arrival order for the retry
+                self._pending = batch + self._pending
+                raise
+            finally:
+                self._in_flight = 0
+
+        for listener in self._listeners:
+            try:
+                await listener(batch)
+            except Exception:
+                logger.exception("Ingest flush listener %r failed", listener)
+        return len(batch)
+
+    async def run(self) -> None:
+        """Flush on size or time until cancelled, backing off while inserts fail."""
+        retry_delay = 0.0
+        while True:
+            if retry_delay:
+                await asyncio.sleep(retry_delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                retry_delay = min(max(retry_delay * 2, 1.0), 60.0)
+                logger.warning(
+                    "Inserting %d buffered events failed, retrying in %.0fs: %s",
+                    self.size, retry_delay, e
+                )
+                continue
+            retry_delay = 0.0
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+from app.core.db import QuerySession, get_backend
+
+logger = logging.getLogger(__name__)
+
+# Computes one metric of a repository: (session, repo_name) -> response
+Metric = Callable[[QuerySession, str], Any]
+
+
+class Subscription:
+    """One open stream: queued (event, data) pairs, and whether it got a snapshot yet."""
+
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue(queue_size)
+        self.synced = False
+
+
+class MetricHub:
+    """
+    Shares metric computations between everyone watching a repository.
+
+    A repository's metrics are computed when its first subscriber arrives and again when
+    new events for it are ingested (or every refresh interval), once per change however
+    many subscribers there are. Each subscriber gets a 'snapshot' of all metrics, then
+    'update' events carrying only the metrics whose value changed.
+    """
+
+    def __init__(self, metrics: Dict[str, Metric], queue_size: int = 16):
+        self.metrics = metrics
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._refreshing: Dict[str, "asyncio.Task[None]"] = {}
+        self._stale: Set[str] = set()
+
+    @property
+    def repos(self) -> List[str]:
+        """Repositories with at least one subscriber."""
+        return list(self._subscribers)
+
+    def subscribe(self, repo_name: str) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.setdefault(repo_name, set()).add(subscription)
+        snapshot = self._snapshots.get(repo_name)
+        if snapshot is not None:
+            self._send(repo_name, subscription, "snapshot", snapshot)
+        else:
+            self.refresh(repo_name)
+        return subscription
+
+    def unsubscribe(self, repo_name: str, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(repo_name)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[repo_name]
+            self._snapshots.pop(repo_name, None)
+
+    def refresh(self, repo_name: str) -> None:
+        """Recompute a repository's metrics in the background. Requests made while a
+        computation runs are folded into a single follow-up computation."""
+        if repo_name in self._refreshing:
+            self._stale.add(repo_name)
+            return
+        self._refreshing[repo_name] = asyncio.create_task(self._refresh(repo_name))
+
+    async def on_events_ingested(self, events: Iterable[Dict[str, Any]]) -> None:
+        """EventBuffer flush listener: refresh watched repositories that got new events."""
+        for repo_name in {event["repo_canonical"] for event in events}:
+            if repo_name in self._subscribers:
+                self.refresh(repo_name)
+
+    async def run(self, interval: float) -> None:
+        """Refresh every watched repository periodically, which also picks up events
+        inserted by other workers or backfills."""
+        while True:
+            await asyncio.sleep(interval)
+            for repo_name in self.repos:
+                self.refresh(repo_name)
+
+    def compute(self, repo_name: str) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        with get_backend().session(repo_name) as db:
+            for name, metric in self.metrics.items():
+                try:
+                    values[name] = jsonable_encoder(metric(db, repo_name))
+                except HTTPException as e:
+                    values[name] = {"error": e.detail}
+                except Exception as e:
+                    logger.warning("Computing %s for %s failed: %s", name, repo_name, e)
+                    values[name] = {"error": str(e)}
+        return values
+
+    async def _refresh(self, repo_name: str) -> None:
+        try:
+            while repo_name in self._subscribers:
+                self._stale.discard(repo_name)
+                snapshot = await run_in_threadpool(self.compute, repo_name)
+                self._publish(repo_name, snapshot)
+                if repo_name not in self._stale:
+                    break
+        except Exception:
+            logger.exception("Refreshing live metrics for %s failed", repo_name)
+        finally:
+            self._refreshing.pop(repo_name, None)
+
+    def _publish(self, repo_name: str, snapshot: Dict[str, Any]) -> None:
+        subscribers = self._subscribers.get(repo_name)
+        if not subscribers:
+            return
+        previous: Optional[Dict[str, Any]] = self._snapshots.get(repo_name)
+        self._snapshots[repo_name] = snapshot
+        changes = {
+            name: value for name, value in snapshot.items()
+            if previous is None or previous.get(name) != value
+        }
+        for subscription in list(subscribers):
+            if not subscription.synced:
+                self._send(repo_name, subscription, "snapshot", snapshot)
+            elif changes:
+                self._send(repo_name, subscription, "update", changes)
+
+    def _send(self, repo_name: str, subscription: Subscription, event: str, data: Dict[str, Any]) -> None:
+        try:
+            subscription.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # A subscriber that fell behind skips the updates it missed and resyncs
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            event, data = "snapshot", self._snapshots[repo_name]
+            subscription.queue.put_nowait((event, data))
+        if event == "snapshot":
+            subscription.synced = True
@@ -0,0 +1,383 @@
+"""
+Metrics over github_events, each declared once, and the compiler turning a set of them
+into as few queries as possible.
+
+A metric names the events it reads, what it is measured per (`key`), the value measured
+(`measure`), which items count (`where`) and how the values combine (`aggregate`):
+
+- key 'number': one row per issue or PR, built from per-item facts (FACTS) such as when
+  it was opened or first responded to; the measure and condition are written over facts.
+- key 'month': events grouped by month; the measure and condition are written over
+  github_events columns. Windows of monthly metrics are summed over the months.
+
+Metrics with the same key are computed by a single scan over the repository's events:
+its WHERE clause is the union of their event filters, and each fact and aggregate only
+sees its own events through -If combinators. Requesting any set of metrics over the same
+repository and range therefore costs one query per key.
+"""
+import re
+from datetime import date, datetime
+from typing import (
+    Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple, Union
+)
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.actors import responder_condition
+from app.core.sampling import sample_clause
+from app.core.tiering import EVENTS_TABLE, events_table
+from app.core.windows import window_comparisons, window_select
+
+ISSUE_OPENED = "event_type = 'IssuesEvent' AND action = 'opened'"
+ISSUE_OPENED_OR_CLOSED = "event_type = 'IssuesEvent' AND action IN ('opened', 'closed')"
+ISSUE_COMMENT = "event_type = 'IssueCommentEvent' AND action = 'created'"
+PR_EVENT = "event_type = 'PullRequestEvent'"
+PR_OPENED = "event_type = 'PullRequestEvent' AND action = 'opened'"
+PR_OPENED_OR_CLOSED = "event_type = 'PullRequestEvent' AND action IN ('opened', 'closed')"
+PR_REVIEW = "event_type IN ('PullRequestReviewCommentEvent', 'PullRequestReviewEvent')"
+
+# Per-item aggregates over the events of one issue or PR. A fact may use the facts a
+# metric lists before it; {responder_condition} and {opener_condition} come from the
+# request's options (see _options)
+FACTS = {
+    "issue_opened_at": f"minIfOrNull(created_at, {ISSUE_OPENED})",
+    "issue_closed_at": "maxIfOrNull(created_at, event_type = 'IssuesEvent' AND action = 'closed')",
+    "issue_opener": f"argMinIf(actor_login, created_at, {ISSUE_OPENED})",
+    "issue_is_bug": f"maxIf(hasAny(labels, ['bug']), {ISSUE_OPENED_OR_CLOSED})",
+    "issue_comments": (
+        f"groupArrayIf((created_at, actor_login), {ISSUE_COMMENT} {{responder_condition}})"
+    ),
+    # Epoch when there is none, which no condition on a later timestamp accepts
+    "issue_first_response_at": (
+        "arrayMin(arrayMap(comment -> comment.1, arrayFilter("
+        "comment -> comment.1 > issue_opened_at {opener_condition}, issue_comments)))"
+    ),
+    "pr_opened_at": f"minIfOrNull(created_at, {PR_OPENED})",
+    "pr_closed_at": f"maxIfOrNull(created_at, {PR_EVENT} AND action = 'closed')",
+    "pr_author": f"argMinIf(actor_login, created_at, {PR_OPENED})",
+    "pr_reviews": f"groupArrayIf((created_at, actor_login), {PR_REVIEW} {{responder_condition}})",
+    "pr_first_review_at": (
+        "arrayMin(arrayMap(review -> review.1, arrayFilter("
+        "review -> review.1 >= pr_opened_at AND review.2 != pr_author, pr_reviews)))"
+    ),
+    "pr_final_action": f"argMaxIf(action, created_at, {PR_EVENT})",
+    "pr_final_merged": f"argMaxIf(merged, created_at, {PR_EVENT})",
+    "pr_last_updated": f"maxIfOrNull(created_at, {PR_EVENT})",
+}
+
+
+class Metric(NamedTuple):
+    """A metric's declaration, see the module docstring."""
+    events: str
+    aggregate: str
+    key: str = "number"
+    facts: Tuple[str, ...] = ()
+    measure: str = "1"
+    where: str = "1"
+    # Timestamp fact the metric's windows are computed on
+    anchor: Optional[str] = None
+
+
+def _summarize_ratio(values):
+    hits, count = values
+    return (round(hits * 100.0 / count, 2) if count else None), count
+
+
+# Columns of each aggregate, over a metric's {measure} and {where}; how many of them are
+# repeated per window; and how the columns reduce to (value, count)
+AGGREGATES: Dict[str, Tuple[Tuple[str, ...], int, Callable[[Sequence], Tuple[Any, int]]]] = {
+    # Average, number of items and standard deviation (for confidence intervals)
+    "mean": (
+        ("avgIf({measure}, {where})", "countIf({where})", "stddevPopIf({measure}, {where})"),
+        2,
+        lambda values: (values[0], values[1]),
+    ),
+    "count": (("countIf({where})",), 1, lambda values: (values[0], values[0])),
+    # Items with a true measure, and all items; the value is their percentage
+    "ratio": (("countIf(({where}) AND ({measure}))", "countIf({where})"), 2, _summarize_ratio),
+}
+
+METRICS = {
+    "issues_opened": Metric(
+        key="month", events=ISSUE_OPENED, aggregate="count", anchor="created_at"
+    ),
+    "issues_closed": Metric(
+        key="month", events="event_type = 'IssuesEvent' AND action = 'closed'", aggregate="count",
+        anchor="created_at",
+    ),
+    "releases": Metric(
+        key="month", events="event_type = 'ReleaseEvent'", aggregate="count", anchor="created_at"
+    ),
+    "issue_first_response_time": Metric(
+        events=f"{ISSUE_OPENED} OR {ISSUE_COMMENT}",
+        facts=("issue_opened_at", "issue_opener", "issue_comments", "issue_first_response_at"),
+        measure="dateDiff('second', issue_opened_at, issue_first_response_at)",
+        where="issue_first_response_at > issue_opened_at",
+        aggregate="mean",
+        anchor="issue_opened_at",
+    ),
+    "issue_resolution_time": Metric(
+        events=ISSUE_OPENED_OR_CLOSED,
+        facts=("issue_opened_at", "issue_closed_at"),
+        measure="dateDiff('second', issue_opened_at, issue_closed_at)",
+        where="issue_closed_at > issue_opened_at",
+        aggregate="mean",
+        anchor="issue_closed_at",
+    ),
+    "bug_resolution_time": Metric(
+        events=ISSUE_OPENED_OR_CLOSED,
+        facts=("issue_opened_at", "issue_closed_at", "issue_is_bug"),
+        measure="dateDiff('second', issue_opened_at, issue_closed_at)",
+        # Resolutions over a year are left out
+        where=(
+            "issue_is_bug AND issue_closed_at > issue_opened_at "
+            "AND issue_closed_at < issue_opened_at + INTERVAL 365 DAY"
+        ),
+        aggregate="mean",
+        anchor="issue_closed_at",
+    ),
+    "pr_success_rate": Metric(
+        events=PR_EVENT,
+        facts=("pr_final_action", "pr_final_merged", "pr_last_updated"),
+        measure="pr_final_merged = 1",
+        where="pr_final_action = 'closed'",
+        aggregate="ratio",
+        anchor="pr_last_updated",
+    ),
+    "pr_closing_time": Metric(
+        events=PR_OPENED_OR_CLOSED,
+        facts=("pr_opened_at", "pr_closed_at"),
+        measure="dateDiff('second', pr_opened_at, pr_closed_at)",
+        where="pr_closed_at > pr_opened_at",
+        aggregate="mean",
+        anchor="pr_closed_at",
+    ),
+    "pr_review_time": Metric(
+        events=f"{PR_OPENED} OR {PR_REVIEW}",
+        facts=("pr_opened_at", "pr_author", "pr_reviews", "pr_first_review_at"),
+        measure="dateDiff('second', pr_opened_at, pr_first_review_at)",
+        where="pr_first_review_at >= pr_opened_at",
+        aggregate="mean",
+        anchor="pr_opened_at",
+    ),
+}
+
+PER_ITEM_SCAN = """
+SELECT
+    {aggregates}
+FROM (
+    SELECT
+        number,
+        {facts}
+    FROM {table} {sample}
+    WHERE repo_canonical = :repo_name
+      AND ({events})
+      {time_range}
+    GROUP BY number
+)
+"""
+
+MONTHLY_SCAN = """
+SELECT
+    toStartOfMonth(created_at) AS month,
+    {aggregates}
+FROM {table} {sample}
+WHERE repo_canonical = :repo_name
+  AND ({events})
+  {time_range}
+GROUP BY month
+ORDER BY month
+"""
+
+
+class Scan(NamedTuple):
+    """One compiled query, and where each of its metrics' columns are in its rows."""
+    key: str
+    query: Any
+    columns: Dict[str, slice]
+    window_columns: Dict[str, slice]
+
+
+class MetricResult(NamedTuple):
+    # The aggregate's columns (see AGGREGATES); None for metrics keyed by month
+    values: Optional[Tuple[Any, ...]]
+    # Per-window comparisons when windows were requested and the metric has an anchor
+    windows: Optional[List[dict]]
+    # The aggregate's columns per month, for metrics keyed by month
+    months: Optional[Dict[date, Tuple[Any, ...]]]
+
+
+def summarize(name: str, values: Sequence) -> Tuple[Any, int]:
+    """(value, count) of a metric's aggregate columns: the mean, count or percentage."""
+    return AGGREGATES[METRICS[name].aggregate][2](values)
+
+
+def _empty_columns(name: str, windows: Optional[List[Tuple[str, int]]] = None) -> Tuple[Any, ...]:
+    """
+    A metric's aggregate columns over no items, or with `windows` its window columns:
+    counts of 0 and no values.
+    """
+    templates, window_width, _ = AGGREGATES[METRICS[name].aggregate]
+    if windows:
+        templates = templates[:window_width] * (2 * len(windows))
+    return tuple(0 if template.startswith("count") else None for template in templates)
+
+
+def event_types(name: str) -> FrozenSet[str]:
+    """Event types a metric reads, i.e. those whose ingestion can change its value."""
+    return frozenset(re.findall(r"'(\w+Event)'", METRICS[name].events))
+
+
+def _options(responder: str, exclude_opener_comments: bool) -> Dict[str, str]:
+    return {
+        "responder_condition": responder_condition(responder, "repo_canonical", "actor_login"),
+        "opener_condition": "AND comment.2 != issue_opener" if exclude_opener_comments else "",
+    }
+
+
+def compile_metrics(
+    names: Sequence[str],
+    start: bool = False,
+    end: bool = False,
+    windows: Optional[List[Tuple[str, int]]] = None,
+    sample_ratio: Optional[float] = None,
+    responder: str = "any",
+    exclude_opener_comments: bool = True,
+    table: str = EVENTS_TABLE,
+) -> List[Scan]:
+    """
+    Compile metrics into one scan per key.
+
+    The scans read events of :repo_name from `table`, from :start_date and through
+    :end_date when `start` and `end` are set, and windows end at :window_end. Raises
+    KeyError for unknown metric names.
+    """
+    options = _options(responder, exclude_opener_comments)
+    time_range = " ".join(filter(None, [
+        "AND created_at >= :start_date" if start else "",
+        "AND created_at <= :end_date" if end else "",
+    ]))
+
+    by_key: Dict[str, List[str]] = {}
+    for name in dict.fromkeys(names):
+        by_key.setdefault(METRICS[name].key, []).append(name)
+
+    scans = []
+    for key, key_names in by_key.items():
+        facts: Dict[str, str] = {}
+        events: Dict[str, None] = {}
+        aggregates: List[str] = []
+        window_aggregates: List[str] = []
+        columns: Dict[str, slice] = {}
+        window_columns: Dict[str, slice] = {}
+        # Monthly rows start with the month
+        first = 1 if key == "month" else 0
+        for name in key_names:
+            metric = METRICS[name]
+            events[f"({metric.events})"] = None
+            for fact in metric.facts:
+                facts.setdefault(fact, f"{FACTS[fact].format(**options)} AS {fact}")
+
+            # Monthly metrics scan the other metrics' events too
+            where = metric.where if key == "number" else f"({metric.events}) AND ({metric.where})"
+            templates, window_width, _ = AGGREGATES[metric.aggregate]
+            start_column = first + len(aggregates)
+            aggregates.extend(
+                template.format(measure=metric.measure, where=where) for template in templates
+            )
+            columns[name] = slice(start_column, first + len(aggregates))
+
+            if windows and metric.anchor:
+                per_window = [
+                    template.format(measure=metric.measure, where=f"({where}) AND {{cond}}")
+                    for template in templates[:window_width]
+                ]
+                start_column = len(window_aggregates)
+                window_aggregates.extend(
+                    window_select(windows, metric.anchor, per_window).split(",\n")
+                )
+                window_columns[name] = slice(start_column, len(window_aggregates))
+
+        # Window columns follow those of every metric
+        offset = first + len(aggregates)
+        window_columns = {
+            name: slice(window.start + offset, window.stop + offset)
+            for name, window in window_columns.items()
+        }
+
+        template = PER_ITEM_SCAN if key == "number" else MONTHLY_SCAN
+        query = text(template.format(
+            aggregates=",\n    ".join(aggregates + window_aggregates),
+            facts=",\n        ".join(facts.values()),
+            events=" OR ".join(events),
+            time_range=time_range,
+            table=table,
+            sample=sample_clause(sample_ratio),
+        ))
+        scans.append(Scan(key, query, columns, window_columns))
+    return scans
+
+
+def compute_metrics(
+    db: Session,
+    repo_name: str,
+    names: Sequence[str],
+    start_date: Union[str, datetime, None] = None,
+    end_date: Union[str, datetime, None] = None,
+    windows: Optional[List[Tuple[str, int]]] = None,
+    window_end: Optional[datetime] = None,
+    sample_ratio: Optional[float] = None,
+    responder: str = "any",
+    exclude_opener_comments: bool = True,
+) -> Dict[str, MetricResult]:
+    """
+    Compute metrics of a repository over events from `start_date` through `end_date`
+    (both optional), with one query per key, against github_events_recent when it covers
+    `start_date`.
+
+    Window comparisons end at `window_end` (default: now), and their counts are scaled
+    up by the sample ratio like those of the routes. A scan returning no rows, as the stub
+    backend's do, gives metrics over no items.
+    """
+    scans = compile_metrics(
+        names, start_date is not None, end_date is not None, windows, sample_ratio,
+        responder, exclude_opener_comments, events_table(start_date)
+    )
+    params = {
+        "repo_name": repo_name,
+        "start_date": start_date,
+        "end_date": end_date,
+        "window_end": window_end or datetime.utcnow(),
+    }
+
+    results = {}
+    for scan in scans:
+        rows = db.execute(scan.query, params).fetchall()
+        for name, columns in scan.columns.items():
+            window_stats = None
+            if name in scan.window_columns:
+                window = scan.window_columns[name]
+                if scan.key == "month":
+                    # Window counts come per month; sum them over the months
+                    window_values = [
+                        sum(row[column] for row in rows) for column in range(window.start, window.stop)
+                    ]
+                elif rows:
+                    window_values = rows[0][window]
+                else:
+                    window_values = _empty_columns(name, windows)
+                window_stats = window_comparisons(
+                    windows, window_values,
+                    AGGREGATES[METRICS[name].aggregate][2], 1 / (sample_ratio or 1)
+                )
+            if scan.key == "month":
+                # Months with only other metrics' events are left out
+                results[name] = MetricResult(None, window_stats, {
+                    row[0]: tuple(row[columns]) for row in rows
+                    if summarize(name, row[columns])[1]
+                })
+                continue
+            values = tuple(rows[0][columns]) if rows else _empty_columns(name)
+            results[name] = MetricResult(values, window_stats, None)
+    return results
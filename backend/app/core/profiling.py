@@ -0,0 +1,347 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Request header carrying PROFILING_TOKEN, and the response header naming the stored report
+PROFILE_HEADER = "X-Gitlytix-Profile"
+PROFILE_ID_HEADER = "X-Gitlytix-Profile-Id"
+# ClickHouse flushes system.query_log every 7.5s by default; seconds between lookups
+QUERY_LOG_DELAYS = (2.0, 4.0, 8.0, 16.0)
+# Innermost frames of a thread with nothing to do: the event loop waiting in select(),
+# or a threadpool worker waiting for its next job
+IDLE_FRAMES = {("selectors.py", "select"), ("queue.py", "get")}
+
+_current_profile: ContextVar[Optional["Profile"]] = ContextVar("current_profile", default=None)
+
+
+def current_profile() -> Optional["Profile"]:
+    return _current_profile.get()
+
+
+def _frame_label(filename: str, function: str, line: int) -> str:
+    return f"{function} ({os.path.basename(filename)}:{line})"
+
+
+class Profile:
+    """
+    Samples and SQL statements of one profiled request.
+
+    Only threads working on the request are sampled: the event loop thread serving it and
+    the threadpool threads running its queries, registered on their first statement.
+    """
+
+    def __init__(self, method: str, path: str, sample_interval: float):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.sample_interval = sample_interval
+        self.started_at = datetime.utcnow()
+        self.status_code: Optional[int] = None
+        self.statements: List[Dict[str, Any]] = []
+        self.stacks: "Counter[Tuple[str, ...]]" = Counter()
+        self.samples = 0
+        self.query_log = "pending"
+        self._threads: Set[int] = set()
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+
+    @property
+    def query_time(self) -> float:
+        return sum(statement["elapsed_ms"] for statement in self.statements) / 1000.0
+
+    def register_current_thread(self) -> None:
+        self._threads.add(threading.get_ident())
+
+    def finish(self) -> None:
+        self._elapsed = time.perf_counter() - self._started
+        self._threads.clear()
+
+    def sample(self, frames: Dict[int, Any]) -> None:
+        for ident in list(self._threads):
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, frame.f_lineno))
+                frame = frame.f_back
+            if not stack or any(
+                (os.path.basename(filename), function) in IDLE_FRAMES
+                for filename, function, _ in stack[:2]
+            ):
+                continue
+            self.stacks[tuple(_frame_label(*entry) for entry in reversed(stack))] += 1
+            self.samples += 1
+
+    def record_statement(self, statement: Any, params: Optional[dict], log_comment: str,
+                         replica: Optional[str], elapsed: float) -> None:
+        self.statements.append({
+            "statement": str(statement).strip(),
+            "parameters": jsonable_encoder(params or {}),
+            "log_comment": log_comment,
+            "replica": replica,
+            "elapsed_ms": round(elapsed * 1000, 3),
+        })
+
+    def add_query_log(self, rows: Sequence[Dict[str, Any]]) -> bool:
+        """Merge system.query_log rows into the statements; True once all are found."""
+        by_comment = {row["log_comment"]: row for row in rows}
+        for statement in self.statements:
+            row = by_comment.get(statement["log_comment"])
+            if row is not None:
+                statement.update(
+                    {key: value for key, value in row.items() if key != "log_comment"}
+                )
+        return all("query_id" in statement for statement in self.statements)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "elapsed_ms": round(self.elapsed * 1000, 3),
+            "query_ms": round(self.query_time * 1000, 3),
+            "outside_queries_ms": round((self.elapsed - self.query_time) * 1000, 3),
+            "sample_interval_ms": self.sample_interval * 1000,
+            "samples": self.samples,
+            "stacks": [
+                {"frames": list(frames), "samples": count}
+                for frames, count in self.stacks.most_common()
+            ],
+            "query_log": self.query_log,
+            "queries": self.statements,
+        }
+
+
+class ProfiledSession:
+    """Session wrapper tagging each statement with a log_comment to find it in
+    system.query_log, and timing it."""
+
+    def __init__(self, session: Any, profile: Profile):
+        self.session = session
+        self.profile = profile
+
+    def execute(self, statement: Any, params: Optional[dict] = None) -> Any:
+        self.profile.register_current_thread()
+        log_comment = f"gitlytix-profile:{self.profile.id}:{len(self.profile.statements)}"
+        tagged = statement
+        if hasattr(statement, "execution_options"):
+            query_settings = dict(statement.get_execution_options().get("settings") or {})
+            query_settings["log_comment"] = log_comment
+            tagged = statement.execution_options(settings=query_settings)
+
+        started = time.perf_counter()
+        try:
+            return self.session.execute(tagged, params)
+        finally:
+            replica = getattr(self.session, "replica", None)
+            self.profile.record_statement(
+                statement, params, log_comment,
+                getattr(replica, "address", None), time.perf_counter() - started
+            )
+
+
+def profiled(session: Any) -> Any:
+    """The session itself, or a ProfiledSession when the current request is profiled."""
+    profile = current_profile()
+    return ProfiledSession(session, profile) if profile is not None else session
+
+
+class Sampler:
+    """Background thread taking a stack sample of every running profile's threads."""
+
+    def __init__(self) -> None:
+        self._profiles: Set[Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="profile-sampler", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            time.sleep(min(profile.sample_interval for profile in profiles))
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.sample(frames)
+
+
+class ProfileStore:
+    """Profile reports as JSON files, shared by the workers of one host."""
+
+    def __init__(self, directory: str, keep: int):
+        self.directory = directory
+        self.keep = keep
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, report: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(report["profile_id"])
+        with open(path + ".tmp", "w") as f:
+            json.dump(jsonable_encoder(report), f)
+        os.replace(path + ".tmp", path)
+
+        reports = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in reports[:max(len(reports) - self.keep, 0)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+async def collect_query_log(profile: Profile, store: ProfileStore) -> None:
+    """Add the request's system.query_log entries to its stored report once ClickHouse
+    has flushed them."""
+    from app.core.db import get_backend
+
+    backend = get_backend()
+    if not profile.statements:
+        profile.query_log = "complete"
+    elif not backend.supports_query_log:
+        profile.query_log = "unavailable"
+    else:
+        profile.query_log = "incomplete"
+        for delay in QUERY_LOG_DELAYS:
+            await asyncio.sleep(delay)
+            try:
+                rows = await run_in_threadpool(backend.query_log, profile.statements)
+            except Exception as e:
+                logger.warning("Reading system.query_log for profile %s failed: %s", profile.id, e)
+                continue
+            if profile.add_query_log(rows):
+                profile.query_log = "complete"
+                break
+    try:
+        await run_in_threadpool(store.save, profile.report())
+    except OSError as e:
+        logger.warning("Storing profile %s failed: %s", profile.id, e)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests carrying the profiling token in the X-Gitlytix-Profile header.
+
+    The response gets an X-Gitlytix-Profile-Id header naming the report (see
+    /profiles/{profile_id}) and a Server-Timing header splitting the time between queries
+    and everything else. The report is stored right away and updated with the queries'
+    system.query_log entries once ClickHouse has written them. Requests without the
+    header, and those under exclude_prefix (the reports themselves), are passed straight
+    through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: str,
+        store: ProfileStore,
+        sample_interval: float,
+        exclude_prefix: Optional[str] = None,
+    ):
+        self.app = app
+        self.token = token
+        self.exclude_prefix = exclude_prefix
+        self.store = store
+        self.sample_interval = sample_interval
+        self.sampler = Sampler()
+        self._collecting: Set["asyncio.Task[None]"] = set()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.token:
+            await self.app(scope, receive, send)
+            return
+        supplied = Headers(scope=scope).get(PROFILE_HEADER)
+        excluded = self.exclude_prefix is not None and scope["path"].startswith(self.exclude_prefix)
+        if supplied is None or excluded:
+            await self.app(scope, receive, send)
+            return
+        if not hmac.compare_digest(supplied.encode("utf-8"), self.token.encode("utf-8")):
+            response = JSONResponse({"detail": "Invalid profiling token"}, status_code=401)
+            await response(scope, receive, send)
+            return
+
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        profile = Profile(
+            scope["method"],
+            scope["path"] + (f"?{query_string}" if query_string else ""),
+            self.sample_interval,
+        )
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(PROFILE_ID_HEADER, profile.id)
+                headers.append(
+                    "Server-Timing",
+                    f"total;dur={profile.elapsed * 1000:.1f}, "
+                    f"db;dur={profile.query_time * 1000:.1f}",
+                )
+            await send(message)
+
+        context_token = _current_profile.set(profile)
+        profile.register_current_thread()
+        self.sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            self.sampler.remove(profile)
+            profile.finish()
+            _current_profile.reset(context_token)
+            try:
+                await run_in_threadpool(self.store.save, profile.report())
+            except OSError as e:
+                logger.warning("Storing profile %s failed: %s", profile.id, e)
+            else:
+                task = asyncio.create_task(collect_query_log(profile, self.store))
+                self._collecting.add(task)
+                task.add_done_callback(self._collecting.discard)
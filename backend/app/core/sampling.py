@@ -0,0 +1,96 @@
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import get_backend
+
+CONFIDENCE_LEVEL = 0.95
+Z_SCORE = 1.959964  # two-sided 95%
+
+ACCURACY_DESCRIPTION = (
+    "'exact', 'approx' (sampled, with a confidence interval) or 'auto' "
+    "(approx above the configured per-repo event-count threshold)"
+)
+
+# repo_name -> (event_count, fetched_at)
+_event_counts: Dict[str, Tuple[int, float]] = {}
+
+
+def repo_event_count(db: Session, repo_name: str) -> int:
+    """Number of events stored for a repository, cached for APPROX_EVENT_COUNT_TTL_SECONDS."""
+    cached = _event_counts.get(repo_name)
+    if cached and time.monotonic() - cached[1] < settings.APPROX_EVENT_COUNT_TTL_SECONDS:
+        return cached[0]
+
+    result = db.execute(
+        text("SELECT count() FROM github_events WHERE repo_canonical = :repo_name"),
+        {"repo_name": repo_name}
+    )
+    row = result.fetchone()
+    count = int(row[0]) if row else 0
+    _event_counts[repo_name] = (count, time.monotonic())
+    return count
+
+
+def resolve_sample_ratio(db: Session, repo_name: str, accuracy: str) -> Optional[float]:
+    """
+    Decide whether a query should sample, returning the sample ratio or None for exact.
+
+    accuracy is one of 'exact', 'approx' or 'auto'; auto samples only repositories with
+    more than APPROX_EVENT_THRESHOLD events. Backends without SAMPLE support are always exact.
+    """
+    ratio = settings.APPROX_SAMPLE_RATIO
+    if accuracy == "exact" or not get_backend().supports_sampling or not 0 < ratio < 1:
+        return None
+    if accuracy == "approx":
+        return ratio
+    if settings.APPROX_EVENT_THRESHOLD <= 0:
+        return None
+    return ratio if repo_event_count(db, repo_name) > settings.APPROX_EVENT_THRESHOLD else None
+
+
+def sample_clause(ratio: Optional[float]) -> str:
+    """SAMPLE clause for github_events. Sampling is keyed on the issue/PR number, so
+    every event of a sampled issue or PR is kept and per-number aggregates stay valid.
+
+    Sampled queries keep their aggregates: the metrics offered in approx mode are
+    averages, counts and ratios, whose exact forms are already single-pass with constant
+    state, so there is no cheaper approximate form to swap in. The saving is the granules
+    SAMPLE skips, which the sort key of github_events.sql makes possible."""
+    return f"SAMPLE {float(ratio)}" if ratio else ""
+
+
+def scale_count(count: int, ratio: Optional[float]) -> int:
+    """Estimate the full-data count from a sampled count."""
+    return int(round(count / ratio)) if ratio else int(count)
+
+
+def mean_interval(mean: float, stddev: Optional[float], sampled: int) -> Tuple[float, float]:
+    """Normal-approximation confidence interval for a sample mean."""
+    if not sampled or stddev is None or math.isnan(stddev):
+        return mean, mean
+    margin = Z_SCORE * stddev / math.sqrt(sampled)
+    return max(mean - margin, 0.0), mean + margin
+
+
+def percent_interval(percent: float, sampled: int) -> Tuple[float, float]:
+    """Normal-approximation confidence interval for a percentage over sampled items."""
+    if not sampled:
+        return percent, percent
+    p = percent / 100.0
+    margin = Z_SCORE * math.sqrt(p * (1 - p) / sampled) * 100.0
+    return max(round(percent - margin, 2), 0.0), min(round(percent + margin, 2), 100.0)
+
+
+def approximation_info(ratio: float, interval: Tuple[float, float], sampled: int) -> dict:
+    return {
+        "sample_ratio": ratio,
+        "sampled_items": int(sampled),
+        "confidence_level": CONFIDENCE_LEVEL,
+        "confidence_interval_low": interval[0],
+        "confidence_interval_high": interval[1],
+    }
@@ -0,0 +1,41 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """Readiness flag and per-phase timings of a worker's startup."""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.ready_after_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a startup phase; the duration is recorded even if the phase fails."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 4)
+            logger.info("Startup phase %s took %.4fs", name, self.phases[name])
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.last_error = None
+        self.ready_after_seconds = round(time.perf_counter() - self.started_at, 4)
+        logger.info("Worker ready %.4fs after start", self.ready_after_seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "ready_after_seconds": self.ready_after_seconds,
+            "phases": dict(self.phases),
+            "last_error": self.last_error,
+        }
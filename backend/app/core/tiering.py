@@ -0,0 +1,43 @@
+"""
+Routing between github_events and github_events_recent (see github_events_tiering.sql).
+
+github_events_recent holds every event from the first day of the month
+RECENT_EVENTS_MONTHS months ago: its materialized view only copies events from then on,
+and its TTL drops whole months once they fall out of that range. A query whose start date
+lies within it reads the recent table, a small fraction of the full history that stays on
+the hot volume; anything older, or unbounded, reads github_events.
+"""
+from datetime import date, datetime
+from typing import Optional, Union
+
+from app.core.config import settings
+
+EVENTS_TABLE = "github_events"
+RECENT_EVENTS_TABLE = "github_events_recent"
+
+
+def recent_events_start(today: Optional[date] = None) -> date:
+    """First day covered by github_events_recent."""
+    today = today or datetime.utcnow().date()
+    months = today.year * 12 + today.month - 1 - settings.RECENT_EVENTS_MONTHS
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def events_table(start_date: Union[str, date, datetime, None]) -> str:
+    """The smallest events table holding every event from start_date on."""
+    if settings.RECENT_EVENTS_MONTHS <= 0 or not start_date:
+        return EVENTS_TABLE
+    if isinstance(start_date, str):
+        try:
+            start_date = datetime.fromisoformat(start_date.strip())
+        except ValueError:
+            # Left for ClickHouse to parse, or reject, against the full table
+            return EVENTS_TABLE
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    return RECENT_EVENTS_TABLE if start_date >= recent_events_start() else EVENTS_TABLE
+
+
+def events_table_for_months(months: int) -> str:
+    """The smallest events table holding the last `months` months of events."""
+    return RECENT_EVENTS_TABLE if 0 < months <= settings.RECENT_EVENTS_MONTHS else EVENTS_TABLE
@@ -0,0 +1,176 @@
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.aliases import canonical_repo_name
+from app.core.db import get_backend
+
+# github_events columns filled from webhook payloads; the others keep their defaults
+COLUMNS = (
+    "file_time", "event_type", "actor_login", "repo_name", "repo_canonical", "created_at",
+    "updated_at", "action", "comment_id", "body", "path", "position", "line", "ref", "ref_type",
+    "creator_user_login", "number", "title", "labels", "state", "locked", "assignee",
+    "assignees", "comments", "author_association", "closed_at", "merged_at",
+    "merge_commit_sha", "requested_reviewers", "requested_teams", "merged", "mergeable",
+    "mergeable_state", "merged_by", "review_comments", "maintainer_can_modify", "commits",
+    "additions", "deletions", "changed_files", "commit_id", "original_commit_id",
+    "member_login", "release_tag_name", "release_name", "review_state",
+)
+
+# X-GitHub-Event header -> github_events.event_type, as named in the GH Archive
+EVENT_TYPES = {
+    "commit_comment": "CommitCommentEvent",
+    "create": "CreateEvent",
+    "delete": "DeleteEvent",
+    "fork": "ForkEvent",
+    "gollum": "GollumEvent",
+    "issue_comment": "IssueCommentEvent",
+    "issues": "IssuesEvent",
+    "member": "MemberEvent",
+    "public": "PublicEvent",
+    "pull_request": "PullRequestEvent",
+    "pull_request_review": "PullRequestReviewEvent",
+    "pull_request_review_comment": "PullRequestReviewCommentEvent",
+    "pull_request_review_thread": "PullRequestReviewThreadEvent",
+    "push": "PushEvent",
+    "release": "ReleaseEvent",
+    "sponsorship": "SponsorshipEvent",
+    "watch": "WatchEvent",
+}
+
+# Values of the github_events Enum columns
+ACTIONS = {
+    "none", "created", "added", "edited", "deleted", "opened", "closed", "reopened",
+    "assigned", "unassigned", "labeled", "unlabeled", "review_requested",
+    "review_request_removed", "synchronize", "started", "published", "update", "create",
+    "fork", "merged", "resolved", "unresolved",
+}
+REF_TYPES = {"branch", "tag", "repository"}
+AUTHOR_ASSOCIATIONS = {"NONE", "CONTRIBUTOR", "OWNER", "COLLABORATOR", "MEMBER", "MANNEQUIN"}
+ASSOCIATION_ALIASES = {"FIRST_TIME_CONTRIBUTOR": "CONTRIBUTOR", "FIRST_TIMER": "CONTRIBUTOR"}
+MERGEABLE_STATES = {"unknown", "dirty", "clean", "unstable", "draft", "blocked"}
+REVIEW_STATES = {"approved", "changes_requested", "commented", "dismissed", "pending"}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check the X-Hub-Signature-256 header: 'sha256=' + HMAC-SHA256 of the raw body."""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    """GitHub ISO 8601 timestamp as a naive UTC datetime, the way DateTime columns store it."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _login(user: Optional[dict]) -> str:
+    return (user or {}).get("login") or ""
+
+
+def _enum(value: Optional[str], allowed: set, default: str) -> str:
+    return value if value in allowed else default
+
+
+def map_webhook_event(event: str, payload: Dict[str, Any], received_at: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Map a webhook delivery onto a github_events row, or None for events github_events doesn't
+    record (unknown event types, or actions outside the action Enum such as 'milestoned').
+
+    created_at is the time of the change according to the payload, falling back to when
+    the webhook was received.
+    """
+    event_type = EVENT_TYPES.get(event)
+    repository = payload.get("repository") or {}
+    if event_type is None or not repository.get("full_name"):
+        return None
+
+    action = payload.get("action") or "none"
+    if event == "pull_request_review" and action == "submitted":
+        # GH Archive records submitted reviews as 'created'
+        action = "created"
+    if action not in ACTIONS:
+        return None
+
+    issue = payload.get("issue") or payload.get("pull_request") or {}
+    pull_request = payload.get("pull_request") or {}
+    comment = payload.get("comment") or {}
+    review = payload.get("review") or {}
+    release = payload.get("release") or {}
+    # Comment and review events carry the commenter's association, like the GH Archive
+    association = (comment or review or issue).get("author_association") or ""
+
+    created_at = (
+        _timestamp(review.get("submitted_at"))
+        or _timestamp(comment.get("updated_at") if action == "edited" else comment.get("created_at"))
+        or _timestamp(release.get("published_at") or release.get("created_at"))
+        or _timestamp(issue.get("updated_at"))
+        or received_at
+    )
+    ref_type = payload.get("ref_type")
+
+    return {
+        "file_time": received_at,
+        "event_type": event_type,
+        "actor_login": _login(payload.get("sender")),
+        "repo_name": repository["full_name"],
+        "repo_canonical": canonical_repo_name(repository["full_name"]),
+        "created_at": created_at,
+        "updated_at": _timestamp(comment.get("updated_at") or issue.get("updated_at")) or created_at,
+        "action": action,
+        "comment_id": comment.get("id") or 0,
+        "body": comment.get("body") or review.get("body") or issue.get("body") or "",
+        "path": comment.get("path") or "",
+        "position": comment.get("position") or 0,
+        "line": comment.get("line") or 0,
+        "ref": payload.get("ref") or "",
+        "ref_type": _enum(ref_type, REF_TYPES, "unknown" if ref_type else "none"),
+        "creator_user_login": _login(issue.get("user")),
+        "number": issue.get("number") or 0,
+        "title": issue.get("title") or "",
+        "labels": [label["name"] for label in issue.get("labels") or []],
+        "state": _enum(issue.get("state"), {"open", "closed"}, "none"),
+        "locked": int(bool(issue.get("locked"))),
+        "assignee": _login(issue.get("assignee")),
+        "assignees": [_login(user) for user in issue.get("assignees") or []],
+        "comments": issue.get("comments") or 0,
+        "author_association": _enum(
+            ASSOCIATION_ALIASES.get(association, association), AUTHOR_ASSOCIATIONS, "NONE"
+        ),
+        "closed_at": _timestamp(issue.get("closed_at")) or EPOCH,
+        "merged_at": _timestamp(pull_request.get("merged_at")) or EPOCH,
+        "merge_commit_sha": pull_request.get("merge_commit_sha") or "",
+        "requested_reviewers": [_login(user) for user in pull_request.get("requested_reviewers") or []],
+        "requested_teams": [team.get("slug") or "" for team in pull_request.get("requested_teams") or []],
+        "merged": int(bool(pull_request.get("merged"))),
+        "mergeable": int(bool(pull_request.get("mergeable"))),
+        "mergeable_state": _enum(pull_request.get("mergeable_state"), MERGEABLE_STATES, "unknown"),
+        "merged_by": _login(pull_request.get("merged_by")),
+        "review_comments": pull_request.get("review_comments") or 0,
+        "maintainer_can_modify": int(bool(pull_request.get("maintainer_can_modify"))),
+        "commits": pull_request.get("commits") or 0,
+        "additions": pull_request.get("additions") or 0,
+        "deletions": pull_request.get("deletions") or 0,
+        "changed_files": pull_request.get("changed_files") or 0,
+        "commit_id": comment.get("commit_id") or review.get("commit_id") or "",
+        "original_commit_id": comment.get("original_commit_id") or "",
+        "member_login": _login(payload.get("member")),
+        "release_tag_name": release.get("tag_name") or "",
+        "release_name": release.get("name") or "",
+        "review_state": _enum((review.get("state") or "").lower(), REVIEW_STATES, "none"),
+    }
+
+
+def insert_events(events: List[Dict[str, Any]]) -> None:
+    """Insert mapped events into github_events as one batch."""
+    rows = [[event[column] for column in COLUMNS] for event in events]
+    get_backend().insert("github_events", COLUMNS, rows)
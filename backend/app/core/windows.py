@@ -0,0 +1,112 @@
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Sequence, Tuple
+
+WINDOW_UNITS = {"d": 1, "w": 7, "m": 30, "y": 365}
+WINDOW_PATTERN = re.compile(r"^(\d+)([dwmy])$")
+MAX_WINDOWS = 6
+
+WINDOWS_DESCRIPTION = (
+    "Comma-separated horizons, e.g. '30d,90d,365d'. All horizons and their previous "
+    "periods are computed in one scan and returned with period-over-period deltas"
+)
+
+
+def parse_windows(spec: str) -> List[Tuple[str, int]]:
+    """Parse a window spec such as '30d,90d,365d' into (label, days) pairs sorted by length.
+
+    Raises ValueError for malformed or empty specs.
+    """
+    windows = {}
+    for part in spec.split(","):
+        label = part.strip().lower()
+        if not label:
+            continue
+        match = WINDOW_PATTERN.match(label)
+        if not match or int(match.group(1)) == 0:
+            raise ValueError(f"Invalid window '{part.strip()}', expected e.g. '30d', '12w', '6m' or '1y'")
+        windows[label] = int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+    if not windows:
+        raise ValueError("At least one window is required")
+    if len(windows) > MAX_WINDOWS:
+        raise ValueError(f"At most {MAX_WINDOWS} windows can be requested at once")
+
+    return sorted(windows.items(), key=lambda item: item[1])
+
+
+def windows_scan_start(windows: List[Tuple[str, int]], window_end: datetime) -> datetime:
+    """Earliest timestamp needed to compute every window and the period preceding it."""
+    return window_end - timedelta(days=2 * max(days for _, days in windows))
+
+
+def window_select(windows: List[Tuple[str, int]], anchor: str, aggregates: List[str]) -> str:
+    """
+    Render conditional aggregates for every window and its previous period.
+
+    Each aggregate is a template with a '{cond}' placeholder, e.g. 'avgIf(seconds, {cond})'.
+    Windows end at the ':window_end' query parameter; the previous period is the window
+    of the same length immediately before it. Columns are emitted per window as
+    current aggregates followed by previous aggregates, in the order given.
+    """
+    columns = []
+    for _, days in windows:
+        current = (
+            f"{anchor} > :window_end - INTERVAL {days} DAY AND {anchor} <= :window_end"
+        )
+        previous = (
+            f"{anchor} > :window_end - INTERVAL {2 * days} DAY"
+            f" AND {anchor} <= :window_end - INTERVAL {days} DAY"
+        )
+        for cond in (current, previous):
+            columns.extend(aggregate.format(cond=cond) for aggregate in aggregates)
+    return ",\n".join(columns)
+
+
+def _clean(value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def window_comparisons(
+    windows: List[Tuple[str, int]],
+    values: Sequence,
+    summarize: Callable[[Sequence], Tuple[Optional[float], int]],
+    count_scale: float = 1.0,
+) -> List[dict]:
+    """
+    Build period-over-period comparisons from the columns rendered by window_select.
+
+    `summarize` turns the aggregates of one period into (value, count). Counts are
+    multiplied by `count_scale`, e.g. to extrapolate sampled counts.
+    """
+    width = len(values) // (2 * len(windows))
+    comparisons = []
+    for index, (label, days) in enumerate(windows):
+        offset = index * 2 * width
+        value, count = summarize(values[offset:offset + width])
+        previous_value, previous_count = summarize(values[offset + width:offset + 2 * width])
+        value = _clean(value) if count else None
+        previous_value = _clean(previous_value) if previous_count else None
+
+        delta = None
+        delta_percent = None
+        if value is not None and previous_value is not None:
+            delta = value - previous_value
+            if previous_value:
+                delta_percent = round(delta * 100.0 / previous_value, 2)
+
+        comparisons.append({
+            "window": label,
+            "days": days,
+            "value": value,
+            "previous_value": previous_value,
+            "delta": delta,
+            "delta_percent": delta_percent,
+            "count": int(round(count * count_scale)),
+            "previous_count": int(round(previous_count * count_scale)),
+        })
+    return comparisons
@@ -0,0 +1,232 @@
+"""
+Load generator replaying the dashboard's traffic against a running API.
+
+Each virtual user loads dashboards back to back: it picks a repository from a Zipf
+distribution (a few popular repositories get most views, as in production) and fires
+the requests of frontend/app/page.tsx concurrently, as the page's Promise.all does.
+Concurrency steps up through the given user counts, and each step reports throughput
+and per-route latency percentiles.
+
+    # Against the API's routing and threadpool, with a fixed query latency. Every query
+    # returns no rows, so routes take their "no data" path (a 404 or an empty 200) and
+    # response building is not measured: size capacity from a run against real data.
+    QUERY_BACKEND=stub STUB_QUERY_LATENCY_MS=50 uvicorn app.main:app --workers 4
+    python -m app.loadtest --concurrency 1,4,16,64 --duration 30 --slo-p95-ms 500
+
+    # Against real data, with repositories listed most popular first
+    python -m app.loadtest --repos-file repos.txt --json results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+
+# Requests behind one dashboard view, as issued by frontend/app/page.tsx
+DASHBOARD_REQUESTS = {
+    "releases/frequency": "/api/v1/stats/releases/frequency",
+    "issues/open-closed": "/api/v1/stats/issues/open-closed",
+    "issues/first-response-time": "/api/v1/stats/issues/first-response-time",
+    "issues/avg-resolution-time": "/api/v1/stats/issues/avg-resolution-time",
+    "prs/review-time": "/api/v1/stats/prs/review-time",
+    "contributors/new": "/api/v1/stats/contributors/new",
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+class ZipfRepos:
+    """Repositories drawn with probability proportional to 1 / rank ** exponent."""
+
+    def __init__(self, repos: Sequence[str], exponent: float, seed: Optional[int] = None):
+        self.repos = list(repos)
+        self._cumulative = list(itertools.accumulate(
+            1.0 / rank ** exponent for rank in range(1, len(self.repos) + 1)
+        ))
+        self._random = random.Random(seed)
+
+    def pick(self) -> str:
+        point = self._random.random() * self._cumulative[-1]
+        return self.repos[bisect_left(self._cumulative, point)]
+
+
+class StepStats:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.dashboards = 0
+
+    def record(self, route: str, seconds: float, outcome: str) -> None:
+        self.latencies[route].append(seconds)
+        self.statuses[route][outcome] += 1
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def outcome_of(status_code: int) -> str:
+    """Bucket a response: 404s are the API's answer for repositories without data
+    (and some dashboard routes' answer with the stub backend), so they are reported apart
+    from errors."""
+    if status_code == 404:
+        return "not_found"
+    return "ok" if status_code < 400 else "error"
+
+
+async def fetch(
+    client: httpx.AsyncClient, route: str, path: str, repo: str, stats: StepStats
+) -> None:
+    started = time.perf_counter()
+    try:
+        response = await client.get(path, params={"repo_name": repo})
+        outcome = outcome_of(response.status_code)
+    except httpx.HTTPError:
+        outcome = "error"
+    stats.record(route, time.perf_counter() - started, outcome)
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, repos: ZipfRepos, stats: StepStats, stop_at: float, think_time: float
+) -> None:
+    while time.monotonic() < stop_at:
+        repo = repos.pick()
+        await asyncio.gather(*(
+            fetch(client, route, path, repo, stats) for route, path in DASHBOARD_REQUESTS.items()
+        ))
+        stats.dashboards += 1
+        if think_time > 0:
+            await asyncio.sleep(random.expovariate(1.0 / think_time))
+
+
+async def run_step(
+    base_url: str, repos: ZipfRepos, users: int, duration: float, think_time: float, timeout: float
+) -> dict:
+    stats = StepStats()
+    limits = httpx.Limits(max_connections=users * len(DASHBOARD_REQUESTS))
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(
+            virtual_user(client, repos, stats, started + duration, think_time) for _ in range(users)
+        ))
+        elapsed = time.monotonic() - started
+
+    routes = {}
+    for route in DASHBOARD_REQUESTS:
+        latencies = sorted(stats.latencies[route])
+        statuses = stats.statuses[route]
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": statuses["error"],
+            "not_found": statuses["not_found"],
+            **{f"p{p}_ms": round(percentile(latencies, p) * 1000, 1) for p in PERCENTILES},
+        }
+    requests = sum(route["requests"] for route in routes.values())
+    errors = sum(route["errors"] for route in routes.values())
+    all_latencies = sorted(itertools.chain.from_iterable(stats.latencies.values()))
+    return {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "dashboards_per_second": round(stats.dashboards / elapsed, 2),
+        "requests_per_second": round(requests / elapsed, 2),
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        **{f"p{p}_ms": round(percentile(all_latencies, p) * 1000, 1) for p in PERCENTILES},
+        "routes": routes,
+    }
+
+
+def print_step(step: dict) -> None:
+    print(
+        f"\n{step['users']} users: {step['dashboards_per_second']} dashboards/s, "
+        f"{step['requests_per_second']} requests/s, {step['error_rate']:.2%} errors, "
+        f"p50/p95/p99 {step['p50_ms']}/{step['p95_ms']}/{step['p99_ms']} ms"
+    )
+    print(f"  {'route':<28}{'requests':>9}{'errors':>8}{'404s':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in step["routes"].items():
+        print(
+            f"  {route:<28}{stats['requests']:>9}{stats['errors']:>8}{stats['not_found']:>8}"
+            f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+        )
+
+
+def load_repos(args: argparse.Namespace) -> List[str]:
+    if args.repos_file:
+        with open(args.repos_file) as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [f"loadtest/repo-{rank}" for rank in range(1, args.repo_count + 1)]
+
+
+async def main(args: argparse.Namespace) -> List[dict]:
+    repos = ZipfRepos(load_repos(args), args.zipf_exponent, args.seed)
+    results = []
+    for users in args.concurrency:
+        step = await run_step(
+            args.base_url, repos, users, args.duration, args.think_time, args.timeout
+        )
+        print_step(step)
+        results.append(step)
+        if args.max_error_rate is not None and step["error_rate"] > args.max_error_rate:
+            print(f"\nStopping: error rate above {args.max_error_rate:.2%}")
+            break
+
+    if args.slo_p95_ms is not None:
+        within = [
+            step["users"] for step in results
+            if step["p95_ms"] <= args.slo_p95_ms and step["error_rate"] == 0
+        ]
+        print(
+            f"\nHighest concurrency with p95 <= {args.slo_p95_ms} ms and no errors: "
+            f"{max(within) if within else 'none'} users"
+        )
+    return results
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.loadtest", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--repos-file", help="Repositories to request, one per line, most popular first"
+    )
+    parser.add_argument(
+        "--repo-count", type=int, default=1000, help="Synthetic repositories without --repos-file"
+    )
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument(
+        "--concurrency", default="1,2,4,8,16,32,64",
+        type=lambda value: [int(users) for users in value.split(",")],
+        help="Comma-separated virtual user counts, one step each"
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per step")
+    parser.add_argument(
+        "--think-time", type=float, default=0.0, help="Mean seconds between a user's dashboards"
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument(
+        "--max-error-rate", type=float, default=0.05, help="Stop stepping up above this error rate"
+    )
+    parser.add_argument(
+        "--slo-p95-ms", type=float, help="Report the highest concurrency meeting this p95"
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    results = asyncio.run(main(arguments))
+    if arguments.json:
+        with open(arguments.json, "w") as f:
+            json.dump(results, f, indent=2)
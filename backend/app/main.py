@@ -1,23 +1,220 @@
+import time
+
+IMPORT_STARTED_AT = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
-from fastapi.routing import APIRoute    
+from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from app.api.main import api_router
+from app.api.routes.live import DASHBOARD_METRICS
+from app.core.alerts import (
+    AlertEvaluator,
+    ClickHouseAlertSink,
+    RuleSet,
+    WebhookAlertSink,
+    load_alert_rules,
+)
+from app.core.aliases import RepoAliasMiddleware, load_repo_aliases
+from app.core.catalog import load_repo_catalog
 from app.core.config import settings
-from app.core.db import init_db
+from app.core.db import close_backend, get_backend, init_db
+from app.core.ingest import EventBuffer
+from app.core.live import MetricHub
+from app.core.profiling import ProfileStore, ProfilingMiddleware
+from app.core.startup import StartupState
+from app.core.webhooks import insert_events
+
+logger = logging.getLogger(__name__)
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
-init_db()
+
+async def warm_up(startup: StartupState) -> None:
+    """Pre-open pooled connections and run the warm-up query, retrying until it succeeds."""
+    delay = 1.0
+    while True:
+        try:
+            with startup.phase("warm_up"):
+                await run_in_threadpool(
+                    get_backend().warm_up,
+                    settings.DB_PREWARM_CONNECTIONS,
+                    settings.DB_WARMUP_QUERY,
+                )
+        except Exception as e:
+            startup.last_error = str(e)
+            logger.warning("Warm-up failed, retrying in %.0fs: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+            continue
+        startup.mark_ready()
+        return
+
+
+async def reload_repo_catalog() -> None:
+    try:
+        await run_in_threadpool(load_repo_catalog)
+    except Exception as e:
+        logger.warning("Loading the repository catalog failed, keeping the previous one: %s", e)
+
+
+async def reload_repo_aliases() -> None:
+    # Renames are only recorded where inserts are
+    if not get_backend().supports_inserts:
+        return
+    try:
+        await run_in_threadpool(load_repo_aliases)
+    except Exception as e:
+        logger.warning("Loading the repository aliases failed, keeping the previous ones: %s", e)
+
+
+async def keep_repo_catalog_loaded(startup: StartupState, warm_up_task: asyncio.Task) -> None:
+    """Load the repository aliases and catalog once the backend is warm, then reload them
+    periodically."""
+    await warm_up_task
+    with startup.phase("repo_aliases"):
+        await reload_repo_aliases()
+    with startup.phase("repo_catalog"):
+        await reload_repo_catalog()
+    while settings.REPO_CATALOG_REFRESH_SECONDS > 0:
+        await asyncio.sleep(settings.REPO_CATALOG_REFRESH_SECONDS)
+        await reload_repo_aliases()
+        await reload_repo_catalog()
+
+
+async def keep_alert_rules_loaded(evaluator: AlertEvaluator, warm_up_task: asyncio.Task) -> None:
+    """Load the alert rules and their last states once the backend is warm, then reload
+    the rules periodically."""
+    await warm_up_task
+    try:
+        evaluator.seed_states(await run_in_threadpool(evaluator.sink.last_states))
+    except Exception as e:
+        logger.warning("Loading the last alert states failed: %s", e)
+    while True:
+        try:
+            rules = await run_in_threadpool(load_alert_rules, settings.ALERT_RULES)
+            evaluator.rules = RuleSet(rules)
+        except Exception as e:
+            logger.warning("Loading the alert rules failed, keeping the previous ones: %s", e)
+        if settings.ALERT_RULES_REFRESH_SECONDS <= 0:
+            return
+        await asyncio.sleep(settings.ALERT_RULES_REFRESH_SECONDS)
+
+
+async def keep_replicas_checked() -> None:
+    """Health-check replicas marked down every CLICKHOUSE_RETRY_INTERVAL, so requests
+    never wait on an unreachable one (see Shard.candidates)."""
+    while True:
+        await asyncio.sleep(settings.CLICKHOUSE_RETRY_INTERVAL)
+        try:
+            await run_in_threadpool(get_backend().check_replicas)
+        except Exception as e:
+            logger.warning("Checking ClickHouse replicas failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup = app.state.startup
+    startup.phases["import"] = round(time.perf_counter() - IMPORT_STARTED_AT, 4)
+
+    with startup.phase("init_db"):
+        init_db()
+    with startup.phase("backend"):
+        await run_in_threadpool(get_backend)
+
+    # Serve once warm, but don't hold startup hostage to an unreachable database:
+    # warm-up continues in the background and /health/ready reports 503 until it is done.
+    warm_up_task = asyncio.create_task(warm_up(startup))
+    # Until the catalog is loaded, search falls back to repo_catalog's index and the
+    # known-repository check lets every request through
+    catalog_task = asyncio.create_task(keep_repo_catalog_loaded(startup, warm_up_task))
+    replica_check_task = asyncio.create_task(keep_replicas_checked())
+    try:
+        await asyncio.wait_for(asyncio.shield(warm_up_task), settings.STARTUP_WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Warm-up still running after %.1fs, serving anyway", settings.STARTUP_WARMUP_TIMEOUT)
+
+    event_buffer = None
+    if settings.GITHUB_WEBHOOK_SECRET and get_backend().supports_inserts:
+        event_buffer = EventBuffer(
+            insert_events,
+            settings.INGEST_FLUSH_ROWS,
+            settings.INGEST_FLUSH_INTERVAL,
+            settings.INGEST_MAX_BUFFERED_ROWS,
+        )
+        flush_task = asyncio.create_task(event_buffer.run())
+    app.state.event_buffer = event_buffer
+
+    metric_hub = MetricHub(DASHBOARD_METRICS)
+    if event_buffer is not None:
+        event_buffer.add_listener(metric_hub.on_events_ingested)
+    if settings.LIVE_REFRESH_SECONDS > 0:
+        live_refresh_task = asyncio.create_task(metric_hub.run(settings.LIVE_REFRESH_SECONDS))
+    app.state.metric_hub = metric_hub
+
+    # Alerts are evaluated after this worker's ingested batches, so they need ingestion
+    alert_evaluator = None
+    if event_buffer is not None and settings.ALERT_RULES:
+        sink = (
+            WebhookAlertSink(settings.ALERT_SINK)
+            if settings.ALERT_SINK.startswith(("http://", "https://"))
+            else ClickHouseAlertSink()
+        )
+        alert_evaluator = AlertEvaluator(sink, settings.ALERT_CONCURRENCY)
+        event_buffer.add_listener(alert_evaluator.on_events_ingested)
+        alert_rules_task = asyncio.create_task(
+            keep_alert_rules_loaded(alert_evaluator, warm_up_task)
+        )
+        alert_task = asyncio.create_task(alert_evaluator.run())
+    app.state.alert_evaluator = alert_evaluator
+
+    yield
+
+    if settings.LIVE_REFRESH_SECONDS > 0:
+        live_refresh_task.cancel()
+    if alert_evaluator is not None:
+        alert_rules_task.cancel()
+        alert_task.cancel()
+
+    if event_buffer is not None:
+        flush_task.cancel()
+        try:
+            await event_buffer.flush()
+        except Exception as e:
+            logger.error("Dropping %d buffered events at shutdown: %s", event_buffer.size, e)
+    catalog_task.cancel()
+    replica_check_task.cancel()
+    warm_up_task.cancel()
+    close_backend()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
+)
+app.state.startup = StartupState(IMPORT_STARTED_AT)
+
+app.state.profile_store = ProfileStore(
+    settings.PROFILING_REPORT_DIR, settings.PROFILING_REPORTS_KEPT
 )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+app.add_middleware(RepoAliasMiddleware)
+app.add_middleware(
+    ProfilingMiddleware,
+    token=settings.PROFILING_TOKEN,
+    store=app.state.profile_store,
+    sample_interval=settings.PROFILING_SAMPLE_INTERVAL_MS / 1000.0,
+    exclude_prefix=f"{settings.API_V1_STR}/profiles",
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Change this in production
@@ -27,4 +224,4 @@ app.add_middleware(
 )
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
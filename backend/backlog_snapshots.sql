@@ -0,0 +1,80 @@
+-- Daily open-backlog snapshots per repository, backing /stats/backlog and
+-- /stats/backlog/aging. Built by `python -m app.core.backlog` (see README), one day at a
+-- time on top of the previous day's snapshot, so no query replays an issue's history.
+--
+-- backlog_events: the open, close and reopen events of issues and PRs, sorted by day
+-- so the builder reads one day without scanning github_events.
+-- backlog_items: every issue and PR's state after each day it changed.
+-- backlog_snapshots: open issues and PRs counted by the day they were opened, written
+-- only for days the backlog changed. Counts by opening day give the age distribution
+-- on any later date.
+
+CREATE TABLE backlog_events
+(
+    day Date,
+    repo_name LowCardinality(String),
+    kind Enum8('issue' = 1, 'pr' = 2),
+    number UInt32,
+    created_at DateTime,
+    action Enum8('opened' = 1, 'closed' = 2, 'reopened' = 3)
+) ENGINE = MergeTree
+ORDER BY (day, repo_name, kind, number);
+
+CREATE MATERIALIZED VIEW backlog_events_mv TO backlog_events AS
+SELECT
+    toDate(created_at) AS day,
+    repo_canonical AS repo_name,
+    if(event_type = 'IssuesEvent', 'issue', 'pr') AS kind,
+    number,
+    created_at,
+    toString(action) AS action
+FROM github_events
+WHERE event_type IN ('IssuesEvent', 'PullRequestEvent')
+  AND action IN ('opened', 'closed', 'reopened');
+
+-- One-off backfill of events inserted before the view existed.
+INSERT INTO backlog_events
+SELECT
+    toDate(created_at) AS day,
+    repo_canonical AS repo_name,
+    if(event_type = 'IssuesEvent', 'issue', 'pr') AS kind,
+    number,
+    created_at,
+    toString(action) AS action
+FROM github_events
+WHERE event_type IN ('IssuesEvent', 'PullRequestEvent')
+  AND action IN ('opened', 'closed', 'reopened');
+
+-- Rebuilding a day replaces its rows instead of adding to them. Until a merge removes
+-- the replaced rows, readers pick the latest build of a day by built_at. Tables created
+-- without built_at are dropped, recreated and rebuilt from the first day (--since).
+CREATE TABLE backlog_items
+(
+    repo_name LowCardinality(String),
+    kind Enum8('issue' = 1, 'pr' = 2),
+    number UInt32,
+    as_of Date,
+    opened_on Date,
+    is_open UInt8,
+    built_at DateTime64(3) DEFAULT now64(3)
+) ENGINE = ReplacingMergeTree(built_at)
+ORDER BY (repo_name, kind, number, as_of);
+
+CREATE TABLE backlog_snapshots
+(
+    repo_name LowCardinality(String),
+    day Date,
+    open_issues Map(Date, Int32),
+    open_prs Map(Date, Int32),
+    open_issue_count Int32 MATERIALIZED arraySum(mapValues(open_issues)),
+    open_pr_count Int32 MATERIALIZED arraySum(mapValues(open_prs)),
+    built_at DateTime64(3) DEFAULT now64(3)
+) ENGINE = ReplacingMergeTree(built_at)
+ORDER BY (repo_name, day);
+
+CREATE TABLE backlog_builds
+(
+    day Date,
+    built_at DateTime DEFAULT now()
+) ENGINE = ReplacingMergeTree(built_at)
+ORDER BY day;
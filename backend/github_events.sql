@@ -1,3 +1,24 @@
+-- Former names of renamed and transferred repositories (see app/core/aliases.py). The
+-- dictionary fills github_events.repo_canonical on insert, so every event of a
+-- repository is sorted under its current name.
+CREATE TABLE repo_aliases
+(
+    alias String,
+    canonical String,
+    updated_at DateTime64(3) DEFAULT now64(3)
+) ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY alias;
+
+CREATE DICTIONARY repo_aliases_dict
+(
+    alias String,
+    canonical String
+)
+PRIMARY KEY alias
+SOURCE(CLICKHOUSE(QUERY 'SELECT alias, argMax(canonical, updated_at) AS canonical FROM repo_aliases GROUP BY alias'))
+LIFETIME(MIN 60 MAX 120)
+LAYOUT(COMPLEX_KEY_HASHED());
+
 CREATE TABLE github_events
 (
     file_time DateTime,
@@ -5,14 +26,16 @@ CREATE TABLE github_events
                     'GollumEvent' = 5, 'IssueCommentEvent' = 6, 'IssuesEvent' = 7, 'MemberEvent' = 8,
                     'PublicEvent' = 9, 'PullRequestEvent' = 10, 'PullRequestReviewCommentEvent' = 11,
                     'PullRequestReviewThreadEvent' = 12, 'PushEvent' = 13, 'ReleaseEvent' = 14, 
-                    'SponsorshipEvent' = 15, 'WatchEvent' = 16),
+                    'SponsorshipEvent' = 15, 'WatchEvent' = 16, 'PullRequestReviewEvent' = 19),
     actor_login LowCardinality(String),
     repo_name LowCardinality(String),
+    -- Current name of the repository, which single-repository queries filter on
+    repo_canonical LowCardinality(String) DEFAULT dictGetOrDefault('repo_aliases_dict', 'canonical', tuple(toString(repo_name)), toString(repo_name)),
     created_at DateTime,
     updated_at DateTime,
     action Enum('none' = 0, 'created' = 1, 'added' = 2, 'edited' = 3, 'deleted' = 4, 'opened' = 5, 'closed' = 6, 'reopened' = 7, 'assigned' = 8, 'unassigned' = 9,
                 'labeled' = 10, 'unlabeled' = 11, 'review_requested' = 12, 'review_request_removed' = 13, 'synchronize' = 14, 'started' = 15, 'published' = 16, 'update' = 17, 'create' = 18, 'fork' = 19, 'merged' = 20,
-                'resolved' = 21, 'unresolved' = 22)),
+                'resolved' = 21, 'unresolved' = 22),
     comment_id UInt64,
     body String,
     path String,
@@ -51,7 +74,17 @@ CREATE TABLE github_events
     release_tag_name String,
     release_name String,
     review_state Enum('none' = 0, 'approved' = 1, 'changes_requested' = 2, 'commented' = 3, 'dismissed' = 4, 'pending' = 5)
-) ENGINE = MergeTree ORDER BY (event_type, repo_name, created_at);
+) ENGINE = MergeTree
+-- Monthly partitions let tiered storage move, and recompress, whole months at once
+-- (see github_events_tiering.sql)
+PARTITION BY toYYYYMM(created_at)
+ORDER BY (event_type, repo_canonical, toStartOfMonth(created_at), intHash32(number), created_at)
+-- Sampling by issue/PR number keeps every event of a sampled issue or PR together, so
+-- accuracy=approx queries can use SAMPLE and still pair opened/closed events. SAMPLE
+-- only skips granules when the hash is sorted within a prefix of few distinct values,
+-- so it follows the month (which partitions already prune by) rather than created_at,
+-- and created_at comes last.
+SAMPLE BY intHash32(number);
 
 
 
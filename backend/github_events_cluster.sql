@@ -0,0 +1,95 @@
+-- Sharded and replicated layout for CLICKHOUSE_HOSTS with several shards.
+-- The cluster `gitlytix` is defined in cluster/config.xml; {shard} and {replica} are
+-- per-node macros. Run once against any node.
+--
+-- github_events is the local table on every node: a shard holds every event of the
+-- repositories it owns, so the API sends single-repo queries straight to one replica
+-- of the owning shard and runs them unchanged against the local table.
+-- github_events_all spreads inserts and cross-repo queries over all shards.
+-- The sharding key must stay CRC32(repo_canonical) with equal shard weights: the API
+-- routes with zlib.crc32(repo_canonical) % shard count, so a renamed repository's
+-- history stays on one shard.
+--
+-- repo_aliases is replicated to every node, since each shard's github_events looks the
+-- canonical names up in its own dictionary.
+
+CREATE TABLE repo_aliases ON CLUSTER gitlytix
+(
+    alias String,
+    canonical String,
+    updated_at DateTime64(3) DEFAULT now64(3)
+) ENGINE = ReplicatedReplacingMergeTree('/clickhouse/tables/all/repo_aliases', '{shard}-{replica}', updated_at)
+ORDER BY alias;
+
+CREATE DICTIONARY repo_aliases_dict ON CLUSTER gitlytix
+(
+    alias String,
+    canonical String
+)
+PRIMARY KEY alias
+SOURCE(CLICKHOUSE(QUERY 'SELECT alias, argMax(canonical, updated_at) AS canonical FROM repo_aliases GROUP BY alias'))
+LIFETIME(MIN 60 MAX 120)
+LAYOUT(COMPLEX_KEY_HASHED());
+
+CREATE TABLE github_events ON CLUSTER gitlytix
+(
+    file_time DateTime,
+    event_type Enum('CommitCommentEvent' = 1, 'CreateEvent' = 2, 'DeleteEvent' = 3, 'ForkEvent' = 4,
+                    'GollumEvent' = 5, 'IssueCommentEvent' = 6, 'IssuesEvent' = 7, 'MemberEvent' = 8,
+                    'PublicEvent' = 9, 'PullRequestEvent' = 10, 'PullRequestReviewCommentEvent' = 11,
+                    'PullRequestReviewThreadEvent' = 12, 'PushEvent' = 13, 'ReleaseEvent' = 14, 
+                    'SponsorshipEvent' = 15, 'WatchEvent' = 16, 'PullRequestReviewEvent' = 19),
+    actor_login LowCardinality(String),
+    repo_name LowCardinality(String),
+    -- Current name of the repository, which single-repository queries filter on
+    repo_canonical LowCardinality(String) DEFAULT dictGetOrDefault('repo_aliases_dict', 'canonical', tuple(toString(repo_name)), toString(repo_name)),
+    created_at DateTime,
+    updated_at DateTime,
+    action Enum('none' = 0, 'created' = 1, 'added' = 2, 'edited' = 3, 'deleted' = 4, 'opened' = 5, 'closed' = 6, 'reopened' = 7, 'assigned' = 8, 'unassigned' = 9,
+                'labeled' = 10, 'unlabeled' = 11, 'review_requested' = 12, 'review_request_removed' = 13, 'synchronize' = 14, 'started' = 15, 'published' = 16, 'update' = 17, 'create' = 18, 'fork' = 19, 'merged' = 20,
+                'resolved' = 21, 'unresolved' = 22),
+    comment_id UInt64,
+    body String,
+    path String,
+    position Int32,
+    line Int32,
+    ref LowCardinality(String),
+    ref_type Enum('none' = 0, 'branch' = 1, 'tag' = 2, 'repository' = 3, 'unknown' = 4),
+    creator_user_login LowCardinality(String),
+    number UInt32,
+    title String,
+    labels Array(LowCardinality(String)),
+    state Enum('none' = 0, 'open' = 1, 'closed' = 2),
+    locked UInt8,
+    assignee LowCardinality(String),
+    assignees Array(LowCardinality(String)),
+    comments UInt32,
+    author_association Enum('NONE' = 0, 'CONTRIBUTOR' = 1, 'OWNER' = 2, 'COLLABORATOR' = 3, 'MEMBER' = 4, 'MANNEQUIN' = 5),
+    closed_at DateTime,
+    merged_at DateTime,
+    merge_commit_sha String,
+    requested_reviewers Array(LowCardinality(String)),
+    requested_teams Array(LowCardinality(String)),
+    merged UInt8,
+    mergeable UInt8,
+    mergeable_state Enum('unknown' = 0, 'dirty' = 1, 'clean' = 2, 'unstable' = 3, 'draft' = 4, 'blocked' = 5),
+    merged_by LowCardinality(String),
+    review_comments UInt32,
+    maintainer_can_modify UInt8,
+    commits UInt32,
+    additions UInt32,
+    deletions UInt32,
+    changed_files UInt32,
+    commit_id String,
+    original_commit_id String,
+    member_login LowCardinality(String),
+    release_tag_name String,
+    release_name String,
+    review_state Enum('none' = 0, 'approved' = 1, 'changes_requested' = 2, 'commented' = 3, 'dismissed' = 4, 'pending' = 5)
+) ENGINE = ReplicatedMergeTree('/clickhouse/tables/{shard}/github_events', '{replica}')
+PARTITION BY toYYYYMM(created_at)
+ORDER BY (event_type, repo_canonical, toStartOfMonth(created_at), intHash32(number), created_at)
+SAMPLE BY intHash32(number);
+
+CREATE TABLE github_events_all ON CLUSTER gitlytix AS github_events
+ENGINE = Distributed(gitlytix, currentDatabase(), github_events, CRC32(repo_canonical));
@@ -0,0 +1,47 @@
+-- Hot/cold tiering of github_events (see storage/tiered.xml for the 'tiered' policy).
+--
+-- Most dashboards read the last few months, yet every query used to scan parts holding
+-- the whole history on the same disk. Events older than 12 months are moved to the cold
+-- volume and recompressed harder, whole monthly partitions at a time; the last 12 months
+-- are also kept in github_events_recent, which queries starting within them read instead
+-- (RECENT_EVENTS_MONTHS, see app/core/tiering.py).
+--
+-- The 12 months below must match RECENT_EVENTS_MONTHS. github_events needs the monthly
+-- partitions of github_events.sql; tables created without them get them when rebuilt by
+-- repo_canonical_backfill.sql. On a cluster, run the statements ON CLUSTER gitlytix with
+-- the Replicated engine of github_events_cluster.sql, and on every server configured with
+-- the policy.
+
+-- A table can only move to a policy that keeps its current disks, as 'tiered' does
+ALTER TABLE github_events MODIFY SETTING storage_policy = 'tiered';
+
+ALTER TABLE github_events MODIFY TTL
+    created_at + INTERVAL 12 MONTH RECOMPRESS CODEC(ZSTD(9)),
+    created_at + INTERVAL 12 MONTH TO VOLUME 'cold';
+
+-- The first of the month 12 months ago onwards. Months are dropped whole once their last
+-- event is older than that, so the table always starts where recent_events_start() says.
+CREATE TABLE github_events_recent AS github_events
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(created_at)
+ORDER BY (event_type, repo_canonical, toStartOfMonth(created_at), intHash32(number), created_at)
+SAMPLE BY intHash32(number)
+TTL toStartOfMonth(created_at) + INTERVAL 13 MONTH DELETE
+SETTINGS ttl_only_drop_parts = 1;
+
+-- The view and the backfill split events at the cutoff, the time the script is run, so
+-- events inserted between the two statements are copied once, not by both. Pass it with
+--   clickhouse-client --param_cutoff="$(date -u '+%F %T')" --multiquery < github_events_tiering.sql
+-- The view skips events created before the cutoff, so older events loaded later (e.g. a
+-- late backfill of last month) must be copied into github_events_recent as well.
+CREATE MATERIALIZED VIEW github_events_recent_mv TO github_events_recent AS
+SELECT *
+FROM github_events
+WHERE created_at >= greatest(toStartOfMonth(now() - INTERVAL 12 MONTH), {cutoff:DateTime});
+
+-- One-off backfill of the events created before the cutoff
+INSERT INTO github_events_recent
+SELECT *
+FROM github_events
+WHERE created_at >= toStartOfMonth(now() - INTERVAL 12 MONTH)
+  AND created_at < {cutoff:DateTime};
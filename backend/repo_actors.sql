@@ -0,0 +1,82 @@
+-- Actor roles per repository, used by responder=maintainer|human filters.
+--
+-- repo_actors only stores maintainers: actors that acted with OWNER, MEMBER or
+-- COLLABORATOR association, were added through a MemberEvent, or own the repository.
+-- Everyone else is a contributor, or a bot when the login ends with '[bot]', so the
+-- dictionary stays small and lookups for unknown actors fall back to that default.
+
+CREATE TABLE repo_actors
+(
+    repo_name LowCardinality(String),
+    actor_login LowCardinality(String),
+    last_seen_at SimpleAggregateFunction(max, DateTime)
+) ENGINE = AggregatingMergeTree
+ORDER BY (repo_name, actor_login);
+
+-- Maintainer evidence from newly inserted events, kept up to date incrementally.
+CREATE MATERIALIZED VIEW repo_actors_mv TO repo_actors AS
+SELECT
+    repo_canonical AS repo_name,
+    maintainer_login AS actor_login,
+    max(created_at) AS last_seen_at
+FROM
+(
+    SELECT
+        repo_canonical,
+        created_at,
+        arrayJoin(arrayFilter(login -> login.2, [
+            (toString(actor_login), author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')
+                OR startsWith(repo_name, concat(actor_login, '/'))),
+            (toString(member_login), event_type = 'MemberEvent' AND action = 'added' AND member_login != '')
+        ])).1 AS maintainer_login
+    FROM github_events
+    WHERE author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')
+       OR event_type = 'MemberEvent'
+       OR startsWith(repo_name, concat(actor_login, '/'))
+)
+GROUP BY repo_name, actor_login;
+
+-- One-off backfill of events inserted before the view existed.
+INSERT INTO repo_actors
+SELECT
+    repo_canonical AS repo_name,
+    maintainer_login AS actor_login,
+    max(created_at) AS last_seen_at
+FROM
+(
+    SELECT
+        repo_canonical,
+        created_at,
+        arrayJoin(arrayFilter(login -> login.2, [
+            (toString(actor_login), author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')
+                OR startsWith(repo_name, concat(actor_login, '/'))),
+            (toString(member_login), event_type = 'MemberEvent' AND action = 'added' AND member_login != '')
+        ])).1 AS maintainer_login
+    FROM github_events
+    WHERE author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')
+       OR event_type = 'MemberEvent'
+       OR startsWith(repo_name, concat(actor_login, '/'))
+)
+GROUP BY repo_name, actor_login;
+
+CREATE VIEW repo_actor_roles_source AS
+SELECT
+    toString(repo_name) AS repo_name,
+    toString(actor_login) AS actor_login,
+    if(endsWith(actor_login, '[bot]'), 'bot', 'maintainer') AS role,
+    max(last_seen_at) AS last_seen_at
+FROM repo_actors
+GROUP BY repo_name, actor_login;
+
+-- Reloads only rows seen since the previous load (UPDATE_FIELD), every 5-10 minutes.
+CREATE DICTIONARY repo_actor_roles
+(
+    repo_name String,
+    actor_login String,
+    role String DEFAULT 'contributor',
+    last_seen_at DateTime
+)
+PRIMARY KEY repo_name, actor_login
+SOURCE(CLICKHOUSE(TABLE 'repo_actor_roles_source' UPDATE_FIELD 'last_seen_at' UPDATE_LAG 60))
+LIFETIME(MIN 300 MAX 600)
+LAYOUT(COMPLEX_KEY_HASHED());
@@ -0,0 +1,46 @@
+-- One-off migration of a github_events table created before repo_canonical existed
+-- (see app/core/aliases.py). A sorting key can't be changed to lead with a new column,
+-- so the events are copied into a table sorted by the canonical name, which is then
+-- swapped in. Create repo_aliases and repo_aliases_dict from github_events.sql and
+-- record the known renames (python -m app.core.aliases add ...) first.
+--
+-- On a cluster, create github_events_canonical ON CLUSTER gitlytix with the engine of
+-- github_events_cluster.sql and a Distributed table over it sharded by
+-- CRC32(repo_canonical), and copy from github_events_all into that Distributed table,
+-- so renamed repositories end up on the shard of their current name.
+
+ALTER TABLE github_events
+    ADD COLUMN IF NOT EXISTS repo_canonical LowCardinality(String)
+    DEFAULT dictGetOrDefault('repo_aliases_dict', 'canonical', tuple(toString(repo_name)), toString(repo_name))
+    AFTER repo_name;
+
+CREATE TABLE github_events_canonical AS github_events
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(created_at)
+ORDER BY (event_type, repo_canonical, toStartOfMonth(created_at), intHash32(number), created_at)
+SAMPLE BY intHash32(number);
+
+INSERT INTO github_events_canonical SELECT * FROM github_events;
+
+-- The materialized views stay attached to the table they were created on, so they are
+-- dropped with their tables here and recreated over the new one, grouping by canonical
+-- name, by running repo_catalog.sql, repo_actors.sql, repo_contributor_months.sql and
+-- backlog_snapshots.sql again (then rebuild the snapshots: python -m app.core.backlog).
+DROP VIEW IF EXISTS repo_catalog_mv;
+DROP VIEW IF EXISTS repo_actors_mv;
+DROP DICTIONARY IF EXISTS repo_actor_roles;
+DROP VIEW IF EXISTS repo_actor_roles_source;
+DROP VIEW IF EXISTS repo_contributor_months_mv;
+DROP VIEW IF EXISTS backlog_events_mv;
+DROP TABLE IF EXISTS repo_catalog;
+DROP TABLE IF EXISTS repo_actors;
+DROP TABLE IF EXISTS repo_contributor_months;
+DROP TABLE IF EXISTS backlog_events;
+DROP TABLE IF EXISTS backlog_items;
+DROP TABLE IF EXISTS backlog_snapshots;
+DROP TABLE IF EXISTS backlog_builds;
+
+EXCHANGE TABLES github_events AND github_events_canonical;
+
+-- The previous table, once the copy has been checked
+DROP TABLE github_events_canonical;
@@ -0,0 +1,37 @@
+-- Catalog of repositories with their activity, backing /repos/search, the
+-- known-repository check that lets unknown repos fail fast with a 404, and the
+-- per-repository ingestion watermarks read by /stats/data-quality and /stats/freshness.
+--
+-- One row per repository after merges, so the API loads it into an in-memory prefix
+-- index at startup. The n-gram bloom filter serves searches until that index is loaded,
+-- and lookups by name use the primary key.
+
+CREATE TABLE repo_catalog
+(
+    repo_name String,
+    event_count SimpleAggregateFunction(sum, UInt64),
+    last_event_at SimpleAggregateFunction(max, DateTime),
+    last_ingested_at SimpleAggregateFunction(max, DateTime),
+    INDEX repo_name_ngrams lower(repo_name) TYPE ngrambf_v1(3, 65536, 2, 0) GRANULARITY 1
+) ENGINE = AggregatingMergeTree
+ORDER BY repo_name;
+
+CREATE MATERIALIZED VIEW repo_catalog_mv TO repo_catalog AS
+SELECT
+    toString(repo_canonical) AS repo_name,
+    count() AS event_count,
+    max(created_at) AS last_event_at,
+    now() AS last_ingested_at
+FROM github_events
+GROUP BY repo_name;
+
+-- One-off backfill of events inserted before the view existed.
+INSERT INTO repo_catalog
+SELECT
+    toString(repo_canonical) AS repo_name,
+    count() AS event_count,
+    max(created_at) AS last_event_at,
+    max(file_time) AS last_ingested_at
+FROM github_events
+GROUP BY repo_name;
+
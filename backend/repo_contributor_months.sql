@@ -0,0 +1,37 @@
+-- Monthly contributor bitmaps per repository, backing /stats/contributors/retention.
+--
+-- One bitmap of cityHash64(actor_login) per repository, month and bot flag, holding
+-- everyone who pushed or acted on a pull request that month (the contributions
+-- /stats/contributors/new counts). A repository has a few hundred rows at most, and
+-- cohort sizes and retention come from bitmap unions and intersections of those rows
+-- instead of joining the events of every month against every later one.
+
+CREATE TABLE repo_contributor_months
+(
+    repo_name LowCardinality(String),
+    month Date,
+    bot UInt8,
+    contributors AggregateFunction(groupBitmap, UInt64)
+) ENGINE = AggregatingMergeTree
+ORDER BY (repo_name, month, bot);
+
+CREATE MATERIALIZED VIEW repo_contributor_months_mv TO repo_contributor_months AS
+SELECT
+    repo_canonical AS repo_name,
+    toStartOfMonth(created_at) AS month,
+    endsWith(actor_login, '[bot]') AS bot,
+    groupBitmapState(cityHash64(actor_login)) AS contributors
+FROM github_events
+WHERE event_type IN ('PushEvent', 'PullRequestEvent')
+GROUP BY repo_name, month, bot;
+
+-- One-off backfill of events inserted before the view existed.
+INSERT INTO repo_contributor_months
+SELECT
+    repo_canonical AS repo_name,
+    toStartOfMonth(created_at) AS month,
+    endsWith(actor_login, '[bot]') AS bot,
+    groupBitmapState(cityHash64(actor_login)) AS contributors
+FROM github_events
+WHERE event_type IN ('PushEvent', 'PullRequestEvent')
+GROUP BY repo_name, month, bot;
@@ -0,0 +1,101 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+# github_events columns the metric queries read, as exported to Parquet. repo_canonical is
+# left out, so the embedded backend takes each event's repo_name as current.
+EVENT_STRUCTURE = (
+    "event_type String, actor_login String, repo_name String, created_at DateTime, "
+    "action String, number UInt32, labels Array(String), merged UInt8, "
+    "creator_user_login String"
+)
+
+FIXTURE_REPOS = ("acme/widgets", "acme/gadgets")
+
+
+def fixture_events(repo_name, seed, issues=120, prs=80):
+    """Issues, comments, PRs, reviews and releases of one repository over 2023-2024."""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    people = [f"user{index}" for index in range(12)] + ["dependabot[bot]"]
+    events = []
+
+    def event(event_type, actor, created_at, action="none", number=0, labels=(), merged=0,
+              creator=""):
+        events.append({
+            "event_type": event_type,
+            "actor_login": actor,
+            "repo_name": repo_name,
+            "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "action": action,
+            "number": number,
+            "labels": list(labels),
+            "merged": merged,
+            "creator_user_login": creator,
+        })
+
+    for number in range(1, issues + 1):
+        opener = rng.choice(people)
+        opened_at = start + timedelta(minutes=rng.randrange(0, 600 * 24 * 60))
+        labels = rng.choice([[], ["bug"], ["bug", "docs"], ["enhancement"]])
+        event("IssuesEvent", opener, opened_at, "opened", number, labels)
+        for _ in range(rng.randrange(0, 4)):
+            # Openers answer their own issues too, which the response time leaves out
+            commenter = rng.choice(people + [opener])
+            commented_at = opened_at + timedelta(minutes=rng.randrange(1, 20 * 24 * 60))
+            event("IssueCommentEvent", commenter, commented_at, "created", number)
+        if rng.random() < 0.7:
+            closed_at = opened_at + timedelta(minutes=rng.randrange(1, 400 * 24 * 60))
+            event("IssuesEvent", rng.choice(people), closed_at, "closed", number, labels)
+
+    for number in range(issues + 1, issues + prs + 1):
+        author = rng.choice(people)
+        opened_at = start + timedelta(minutes=rng.randrange(0, 600 * 24 * 60))
+        event("PullRequestEvent", author, opened_at, "opened", number, creator=author)
+        reviewed_at = opened_at
+        for _ in range(rng.randrange(0, 3)):
+            reviewed_at += timedelta(minutes=rng.randrange(1, 3 * 24 * 60))
+            event_type = rng.choice(["PullRequestReviewEvent", "PullRequestReviewCommentEvent"])
+            event(event_type, rng.choice(people), reviewed_at, "created", number, creator=author)
+        if rng.random() < 0.8:
+            closed_at = reviewed_at + timedelta(minutes=rng.randrange(1, 10 * 24 * 60))
+            merged = int(rng.random() < 0.7)
+            event("PullRequestEvent", rng.choice(people), closed_at, "closed", number,
+                  merged=merged, creator=author)
+
+    for _ in range(15):
+        event("ReleaseEvent", people[0], start + timedelta(days=rng.randrange(0, 600)),
+              "published")
+    return events
+
+
+@pytest.fixture(scope="session")
+def embedded_backend(tmp_path_factory):
+    """EmbeddedBackend over a Parquet export of fixture_events for FIXTURE_REPOS."""
+    chdb_session = pytest.importorskip("chdb.session")
+    from app.core.embedded import EmbeddedBackend
+
+    events = []
+    for seed, repo_name in enumerate(FIXTURE_REPOS):
+        events.extend(fixture_events(repo_name, seed))
+    source = tmp_path_factory.mktemp("source") / "events.jsonl"
+    source.write_text("\n".join(json.dumps(event) for event in events))
+
+    data_dir = tmp_path_factory.mktemp("data")
+    (data_dir / "github_events").mkdir()
+    writer = chdb_session.Session()
+    try:
+        parquet = writer.query(
+            f"SELECT * FROM file('{source}', JSONEachRow, '{EVENT_STRUCTURE}') "
+            "ORDER BY event_type, repo_name, created_at",
+            "Parquet",
+        ).bytes()
+    finally:
+        writer.close()
+    (data_dir / "github_events" / "part-0.parquet").write_bytes(parquet)
+
+    backend = EmbeddedBackend(str(data_dir))
+    yield backend
+    backend.close()
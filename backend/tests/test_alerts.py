@@ -0,0 +1,45 @@
+import pytest
+
+from app.core.alerts import AlertRule, RuleSet, parse_rule
+
+RULE = {
+    "repo_name": "acme/widgets", "metric": "pr_review_time", "operator": ">",
+    "threshold": 172800, "window": "30D",
+}
+
+
+def test_parse_rule_normalizes_the_window_and_names_the_rule():
+    assert parse_rule(RULE) == AlertRule(
+        "acme/widgets:pr_review_time:30d:>172800", "acme/widgets", "pr_review_time", ">",
+        172800.0, "30d", 1,
+    )
+
+
+def test_parse_rule_keeps_the_label_of_a_single_window():
+    assert parse_rule({**RULE, "window": " 30D, "}).window == "30d"
+
+
+@pytest.mark.parametrize("changes", [
+    {"window": ""},
+    {"window": "30d,90d"},
+    {"window": None},
+    {"window": "30"},
+    {"metric": "releases"},
+    {"metric": "no_such_metric"},
+    {"operator": "=="},
+    {"repo_name": ""},
+])
+def test_parse_rule_rejects_invalid_rules(changes):
+    with pytest.raises(ValueError):
+        parse_rule({**RULE, **changes})
+
+
+def test_rule_set_matches_rules_by_the_event_types_their_metric_reads():
+    review = parse_rule(RULE)
+    resolution = parse_rule({**RULE, "metric": "issue_resolution_time"})
+    rules = RuleSet([review, resolution])
+
+    assert "acme/widgets" in rules and "acme/gadgets" not in rules
+    assert rules.matching("acme/widgets", ["PullRequestReviewEvent"]) == [review]
+    assert rules.matching("acme/widgets", ["IssuesEvent", "PushEvent"]) == [resolution]
+    assert rules.matching("acme/widgets", ["PushEvent"]) == []
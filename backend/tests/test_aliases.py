@@ -0,0 +1,128 @@
+from app.core import aliases, db
+from app.core.aliases import move_history, record_rename, rename_from_webhook, resolve_aliases
+from app.core.config import settings
+
+
+def test_resolve_aliases_follows_chains_of_renames():
+    assert resolve_aliases([("a/one", "a/two"), ("a/two", "b/three")]) == {
+        "a/one": "b/three", "a/two": "b/three"
+    }
+
+
+def test_resolve_aliases_drops_names_renamed_back_to():
+    # a/one -> a/two -> a/one, as record_rename stores it: a/one is current again
+    assert resolve_aliases([("a/one", "a/one"), ("a/two", "a/one")]) == {"a/two": "a/one"}
+
+
+def test_rename_from_webhook_reads_renames_and_transfers():
+    repository = {"full_name": "new-owner/new-name"}
+    renamed = {
+        "action": "renamed", "repository": repository,
+        "changes": {"repository": {"name": {"from": "old-name"}}},
+    }
+    transferred = {
+        "action": "transferred", "repository": repository,
+        "changes": {"owner": {"from": {"organization": {"login": "old-owner"}}}},
+    }
+    assert rename_from_webhook("repository", renamed) == (
+        "new-owner/old-name", "new-owner/new-name"
+    )
+    assert rename_from_webhook("repository", transferred) == (
+        "old-owner/new-name", "new-owner/new-name"
+    )
+    assert rename_from_webhook("push", renamed) is None
+    assert rename_from_webhook("repository", {**renamed, "action": "archived"}) is None
+
+
+class RecordingSession:
+    """Answers move_history's lookups and records the statements that change data."""
+
+    def __init__(self, alias_rows, stale, existing):
+        self.alias_rows = alias_rows
+        self.stale = stale
+        self.existing = existing
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        if "FROM repo_aliases" in sql:
+            rows = self.alias_rows
+        elif "SELECT DISTINCT" in sql:
+            rows = [(name,) for name in self.stale if name in params["aliases"]]
+        elif "system.tables" in sql:
+            rows = [(name,) for name in self.existing if name in params["tables"]]
+        else:
+            self.statements.append((sql, params))
+            rows = []
+        return type("Result", (), {"fetchall": lambda _: rows})()
+
+
+class RecordingBackend(db.QueryBackend):
+    def __init__(self, shards):
+        self.shards = shards
+        self.inserts = []
+
+    def each_shard(self):
+        yield from self.shards
+
+    def insert(self, table, columns, rows):
+        self.inserts.append((table, rows))
+
+
+def _head(sql):
+    """A statement up to its SELECT or WHERE clause, e.g. 'INSERT INTO github_events'."""
+    return sql.split(" SELECT")[0].split(" WHERE")[0]
+
+
+ALIAS_ROWS = [("acme/old", "acme/new"), ("acme/older", "acme/new")]
+
+
+def test_move_history_moves_stale_names_and_deletes_them_everywhere(monkeypatch):
+    session = RecordingSession(
+        ALIAS_ROWS, stale=["acme/old"],
+        existing=["github_events_recent", "repo_catalog", "backlog_items"],
+    )
+    monkeypatch.setattr(db, "_backend", RecordingBackend([session]))
+
+    assert move_history() == 1
+    params = {"alias": "acme/old", "canonical": "acme/new"}
+    assert [(_head(sql), p) for sql, p in session.statements] == [
+        ("INSERT INTO github_events", params),
+        ("ALTER TABLE github_events DELETE", params),
+        ("ALTER TABLE github_events_recent DELETE", params),
+        ("ALTER TABLE repo_catalog DELETE", params),
+        ("ALTER TABLE backlog_items DELETE", params),
+    ]
+    assert "WHERE repo_name = :alias" in session.statements[-1][0]
+
+
+def test_move_history_inserts_through_the_distributed_table_when_sharded(monkeypatch):
+    monkeypatch.setattr(settings, "CLICKHOUSE_HOSTS", "ch1:9000;ch2:9000")
+    shards = [
+        RecordingSession(ALIAS_ROWS, stale=[], existing=[]),
+        RecordingSession(ALIAS_ROWS, stale=["acme/old", "acme/older"], existing=[]),
+    ]
+    monkeypatch.setattr(db, "_backend", RecordingBackend(shards))
+
+    assert move_history(["acme/older", "acme/unknown"]) == 1
+    assert shards[0].statements == []
+    assert shards[1].statements[0][0].startswith("INSERT INTO github_events_all")
+    assert shards[1].statements[0][1]["alias"] == "acme/older"
+
+
+def test_record_rename_repoints_earlier_names(monkeypatch):
+    backend = RecordingBackend([])
+    monkeypatch.setattr(db, "_backend", backend)
+    monkeypatch.setattr(aliases, "_aliases", {"acme/oldest": "acme/old"})
+
+    assert record_rename("acme/old", "acme/new") == ["acme/old", "acme/oldest"]
+    assert backend.inserts == [
+        ("repo_aliases", [["acme/old", "acme/new"], ["acme/oldest", "acme/new"]])
+    ]
+    assert aliases.canonical_repo_name("acme/oldest") == "acme/new"
+
+    # Renamed back: acme/old is current again
+    record_rename("acme/new", "acme/old")
+    assert aliases.canonical_repo_name("acme/old") == "acme/old"
+    assert aliases.canonical_repo_name("acme/oldest") == "acme/old"
+    assert backend.inserts[-1][1][-1] == ["acme/old", "acme/old"]
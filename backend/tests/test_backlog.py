@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes.backlog import AGE_BUCKETS, _in_bucket, _median_age_days, _opened_by_day
+from app.core import db
+from app.core.backlog import current_open_issues
+from app.main import app
+
+AS_OF = date(2024, 6, 30)
+
+
+def test_opened_by_day_reads_date_and_iso_string_keys():
+    assert _opened_by_day({date(2024, 6, 1): 2, "2024-06-02": "3"}) == {
+        date(2024, 6, 1): 2, date(2024, 6, 2): 3
+    }
+    assert _opened_by_day(None) == {}
+
+
+@pytest.mark.parametrize("opened_by_day, median", [
+    ({}, None),
+    ({date(2024, 6, 20): 1}, 10),
+    # Four items: the median is reached at the second newest
+    ({date(2024, 6, 29): 1, date(2024, 6, 20): 1, date(2024, 1, 1): 2}, 10),
+    ({date(2024, 6, 29): 1, date(2024, 1, 1): 3}, 181),
+])
+def test_median_age_days(opened_by_day, median):
+    assert _median_age_days(opened_by_day, AS_OF) == median
+
+
+@pytest.mark.parametrize("age", [0, 6, 7, 29, 30, 89, 90, 364, 365, 3000])
+def test_every_age_falls_in_exactly_one_bucket(age):
+    opened_on = date.fromordinal(AS_OF.toordinal() - age)
+    buckets = [
+        label for label, min_days, max_days in AGE_BUCKETS
+        if _in_bucket(AS_OF, opened_on, min_days, max_days)
+    ]
+    assert len(buckets) == 1
+
+
+def test_bucket_bounds_are_inclusive_then_exclusive():
+    assert _in_bucket(AS_OF, date(2024, 6, 23), 7, 30)
+    assert not _in_bucket(AS_OF, date(2024, 5, 31), 7, 30)
+    assert _in_bucket(AS_OF, date(2000, 1, 1), 365, None)
+
+
+class SnapshotSession:
+    """Answers the build watermark, then the snapshot of the aging query."""
+
+    def __init__(self, *rows):
+        self.rows = list(rows)
+
+    def execute(self, statement, params=None):
+        row = self.rows.pop(0)
+        return type("Result", (), {"fetchone": lambda _: row})()
+
+
+def test_aging_buckets_the_latest_snapshot(monkeypatch):
+    monkeypatch.setattr(db, "_backend", db.StubBackend(0))
+    app.dependency_overrides[db.get_db] = lambda: SnapshotSession(
+        (AS_OF,),
+        ({"2024-06-28": 2, "2024-03-01": 1}, {date(2023, 1, 1): 4}),
+    )
+    try:
+        response = TestClient(app).get(
+            "/api/v1/stats/backlog/aging", params={"repo_name": "acme/widgets"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["as_of"], body["open_issues"], body["open_prs"]) == ("2024-06-30", 3, 4)
+    assert (body["median_issue_age_days"], body["median_pr_age_days"]) == (2, 546)
+    assert {bucket["bucket"]: (bucket["issues"], bucket["prs"]) for bucket in body["buckets"]} == {
+        "0-7d": (2, 0), "7-30d": (0, 0), "30-90d": (0, 0), "90-365d": (1, 0), "365d+": (0, 4)
+    }
+
+
+def test_currently_open_comes_from_the_latest_snapshot(monkeypatch):
+    monkeypatch.setattr(db, "_backend", db.StubBackend(0))
+    assert current_open_issues(SnapshotSession((7,)), "acme/widgets") == 7
+    assert current_open_issues(SnapshotSession(None), "acme/widgets") is None
+
+    # Backends without snapshot tables are not queried
+    monkeypatch.setattr(db.StubBackend, "supports_derived_tables", False)
+    assert current_open_issues(SnapshotSession(), "acme/widgets") is None
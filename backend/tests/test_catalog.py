@@ -0,0 +1,105 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import catalog, db
+from app.core.catalog import RepoCatalog, RepoEntry, require_known_repo
+
+
+def _entry(repo_name, event_count):
+    return RepoEntry(repo_name, event_count, None)
+
+
+CATALOG = RepoCatalog([
+    _entry("facebook/react", 900),
+    _entry("acme/react-widgets", 50),
+    _entry("reactjs/reactjs.org", 300),
+    _entry("vuejs/vue", 700),
+    _entry("acme/Gadgets", 10),
+])
+
+
+def _names(entries):
+    return [entry.repo_name for entry in entries]
+
+
+def test_search_matches_full_and_short_names_by_activity():
+    assert _names(CATALOG.search("react", 10)) == [
+        "facebook/react", "reactjs/reactjs.org", "acme/react-widgets"
+    ]
+    assert _names(CATALOG.search("vuejs/", 10)) == ["vuejs/vue"]
+
+
+def test_search_is_case_insensitive_and_trims_the_query():
+    assert _names(CATALOG.search("  GADG ", 10)) == ["acme/Gadgets"]
+
+
+def test_search_limits_results_without_repeating_repositories():
+    # reactjs/reactjs.org matches under both its full and its short name
+    assert _names(CATALOG.search("reactjs", 10)) == ["reactjs/reactjs.org"]
+    assert _names(CATALOG.search("react", 2)) == ["facebook/react", "reactjs/reactjs.org"]
+
+
+def test_search_without_a_prefix_or_match_is_empty():
+    assert CATALOG.search("   ", 10) == []
+    assert CATALOG.search("zzz", 10) == []
+
+
+def test_search_walks_ranked_entries_past_the_range_scan_threshold(monkeypatch):
+    monkeypatch.setattr(catalog, "RANGE_SCAN_THRESHOLD", 1)
+    assert _names(CATALOG.search("react", 2)) == ["facebook/react", "reactjs/reactjs.org"]
+    assert _names(CATALOG.search("a", 10)) == ["acme/react-widgets", "acme/Gadgets"]
+
+
+class LookupBackend(db.QueryBackend):
+    """Answers the repo_catalog lookup with a row for `known`, or fails."""
+
+    def __init__(self, known=(), error=None):
+        self.known = known
+        self.error = error
+
+    @contextmanager
+    def session(self, repo_name=None):
+        yield self
+
+    def execute(self, statement, params=None):
+        if self.error:
+            raise self.error
+        return SimpleNamespace(fetchone=lambda: (1,) if params["repo_name"] in self.known else None)
+
+
+def _request(repo_name=None):
+    return SimpleNamespace(query_params={"repo_name": repo_name} if repo_name else {})
+
+
+@pytest.fixture
+def loaded_catalog(monkeypatch):
+    monkeypatch.setattr(catalog, "_catalog", CATALOG)
+    monkeypatch.setattr(db, "_backend", LookupBackend(known=("acme/new-repo",)))
+
+
+def test_known_repositories_pass(loaded_catalog):
+    require_known_repo(_request("vuejs/vue"))
+    require_known_repo(_request())
+    # Not loaded in memory yet, but in repo_catalog
+    require_known_repo(_request("acme/new-repo"))
+
+
+def test_unknown_repositories_are_not_found(loaded_catalog):
+    with pytest.raises(HTTPException) as raised:
+        require_known_repo(_request("acme/missing"))
+    assert raised.value.status_code == 404
+
+
+def test_requests_pass_unchecked_until_a_catalog_loads_or_when_lookups_fail(monkeypatch):
+    monkeypatch.setattr(db, "_backend", LookupBackend())
+    monkeypatch.setattr(catalog, "_catalog", None)
+    require_known_repo(_request("acme/missing"))
+    monkeypatch.setattr(catalog, "_catalog", RepoCatalog([]))
+    require_known_repo(_request("acme/missing"))
+
+    monkeypatch.setattr(catalog, "_catalog", CATALOG)
+    monkeypatch.setattr(db, "_backend", LookupBackend(error=ConnectionError("down")))
+    require_known_repo(_request("acme/missing"))
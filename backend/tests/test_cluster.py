@@ -0,0 +1,117 @@
+import pytest
+
+from app.core import cluster
+from app.core.cluster import Cluster, FailoverSession, NoHealthyReplicaError
+
+
+class FakeEngine:
+    """Engine, connection and session in one, answering queries while up."""
+
+    def __init__(self, address):
+        self.address = address
+        self.up = True
+        self.queries = 0
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, statement, params=None):
+        self.queries += 1
+        if not self.up:
+            raise ConnectionError(f"{self.address} refused the connection")
+        return self.address
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_sessions(monkeypatch):
+    monkeypatch.setattr(cluster, "Session", lambda engine: engine)
+
+
+def _cluster(*addresses, retry_interval=10.0):
+    ch = Cluster([[(address, 9000) for address in addresses]], lambda host, port: "", retry_interval)
+    for replica in ch.replicas():
+        replica._engine = FakeEngine(replica.host)
+    return ch
+
+
+def _hosts(replicas):
+    return [replica.host for replica in replicas]
+
+
+def test_healthy_replicas_are_rotated_round_robin():
+    shard, = _cluster("a", "b", "c").shards
+    assert [_hosts(shard.candidates()) for _ in range(4)] == [
+        ["a", "b", "c"], ["b", "c", "a"], ["c", "a", "b"], ["a", "b", "c"]
+    ]
+
+
+def test_down_replicas_come_last_and_are_not_pinged():
+    shard, = _cluster("a", "b", "c", retry_interval=0.0).shards
+    shard.replicas[0].mark_down()
+
+    assert _hosts(shard.candidates()) == ["b", "c", "a"]
+    assert _hosts(shard.candidates()) == ["b", "c", "a"]
+    assert shard.replicas[0].engine.queries == 0
+
+
+def test_down_replicas_are_tried_when_none_is_healthy():
+    shard, = _cluster("a").shards
+    shard.replicas[0].mark_down()
+    assert _hosts(shard.candidates()) == ["a"]
+
+    with FailoverSession(shard) as session:
+        assert session.execute("SELECT 1") == "a"
+    assert shard.replicas[0].healthy
+
+
+def test_session_fails_over_and_sticks_to_the_replica_that_answered():
+    shard, = _cluster("a", "b", "c").shards
+    first, second, _ = shard.replicas
+    first.engine.up = False
+
+    with FailoverSession(shard) as session:
+        assert session.execute("SELECT 1") == "b"
+        assert session.execute("SELECT 2") == "b"
+    assert not first.healthy
+    assert second.engine.queries == 2
+
+
+def test_session_raises_when_every_replica_is_unreachable():
+    shard, = _cluster("a", "b").shards
+    for replica in shard.replicas:
+        replica.engine.up = False
+
+    with pytest.raises(NoHealthyReplicaError):
+        FailoverSession(shard).execute("SELECT 1")
+    assert not any(replica.healthy for replica in shard.replicas)
+
+
+def test_query_errors_are_not_failed_over():
+    shard, = _cluster("a", "b").shards
+    shard.replicas[0].engine.execute = lambda statement, params=None: 1 / 0
+
+    with pytest.raises(ZeroDivisionError):
+        FailoverSession(shard).execute("SELECT 1")
+    assert all(replica.healthy for replica in shard.replicas)
+
+
+def test_check_down_replicas_pings_only_due_replicas():
+    ch = _cluster("a", "b", "c")
+    a, b, c = ch.replicas()
+    a.mark_down()
+    b.mark_down()
+    b.retry_at = 0.0
+    b.engine.up = True
+
+    assert ch.check_down_replicas() == {"b:9000": True}
+    assert b.healthy and not a.healthy
+    assert a.engine.queries == 0 and c.engine.queries == 0
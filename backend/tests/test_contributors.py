@@ -0,0 +1,110 @@
+from collections import Counter
+from datetime import date
+from itertools import accumulate
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes.contributors import _add_months, _retention_cohorts
+from app.core import db
+from app.main import app
+from conftest import fixture_events
+
+REPO = "acme/widgets"
+
+
+def _merged_pr_authors(exclude_bots=True):
+    """Merged PRs per author among fixture_events of REPO."""
+    return Counter(
+        event["creator_user_login"] for event in fixture_events(REPO, 0)
+        if event["event_type"] == "PullRequestEvent" and event["action"] == "closed"
+        and event["merged"] and not (exclude_bots and event["creator_user_login"].endswith("[bot]"))
+    )
+
+
+@pytest.fixture
+def client(embedded_backend, monkeypatch):
+    monkeypatch.setattr(db, "_backend", embedded_backend)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("exclude_bots", [True, False])
+def test_top_contributors_counts_merged_prs_per_author(client, exclude_bots):
+    expected = _merged_pr_authors(exclude_bots)
+    response = client.get("/api/v1/stats/contributors/top", params={
+        "repo_name": REPO, "kind": "prs", "top_n": 5, "months": 120,
+        "exclude_bots": exclude_bots,
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == sum(expected.values())
+    assert body["distinct_contributors"] == len(expected)
+    ranked = sorted(expected.items(), key=lambda item: (-item[1], item[0]))[:5]
+    assert [(c["login"], c["count"]) for c in body["contributors"]] == ranked
+    assert body["contributors"][0]["share_percent"] == round(
+        100.0 * ranked[0][1] / body["total"], 2
+    )
+
+
+@pytest.mark.parametrize("threshold", [0.2, 0.5, 0.9])
+def test_bus_factor_is_the_fewest_authors_covering_the_threshold(client, threshold):
+    expected = _merged_pr_authors()
+    total = sum(expected.values())
+    running = list(accumulate(sorted(expected.values(), reverse=True)))
+    bus_factor = next(index for index, count in enumerate(running, 1) if count >= total * threshold)
+
+    response = client.get("/api/v1/stats/contributors/bus-factor", params={
+        "repo_name": REPO, "threshold": threshold, "months": 120,
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["merged_prs"], body["contributors"]) == (total, len(expected))
+    assert body["bus_factor"] == bus_factor
+    assert len(body["core_contributors"]) == bus_factor
+    assert sum(c["count"] for c in body["core_contributors"]) == running[bus_factor - 1]
+
+
+def test_contributors_of_an_unknown_repository_are_empty(client):
+    response = client.get("/api/v1/stats/contributors/bus-factor", params={"repo_name": "acme/none"})
+    assert response.status_code == 200
+    assert (response.json()["bus_factor"], response.json()["core_contributors"]) == (0, [])
+
+
+@pytest.mark.parametrize("month, months, expected", [
+    (date(2024, 5, 1), 1, date(2024, 6, 1)),
+    (date(2024, 12, 1), 1, date(2025, 1, 1)),
+    (date(2024, 1, 1), -1, date(2023, 12, 1)),
+    (date(2024, 3, 1), -15, date(2022, 12, 1)),
+    (date(2024, 3, 1), 24, date(2026, 3, 1)),
+    (date(2024, 3, 1), 0, date(2024, 3, 1)),
+])
+def test_add_months_crosses_year_boundaries(month, months, expected):
+    assert _add_months(month, months) == expected
+
+
+def test_retention_cohorts_cover_every_month_before_the_current_one():
+    rows = [
+        (date(2024, 10, 1), 3, 1, 2),
+        (date(2024, 10, 1), 3, 3, 1),
+        (date(2024, 12, 1), 4, 1, 0),
+        (date(2024, 12, 1), 4, 3, 4),
+    ]
+
+    cohorts = _retention_cohorts(rows, 4, [1, 3], date(2025, 2, 1))
+
+    assert [c["cohort_month"] for c in cohorts] == ["2024-10", "2024-11", "2024-12", "2025-01"]
+    assert [c["new_contributors"] for c in cohorts] == [3, 0, 4, 0]
+    # 2024-10 + 1 is over; + 3 is January, over as well
+    assert cohorts[0]["retention"] == [
+        {"months_later": 1, "retained": 2, "retention_percent": 66.67},
+        {"months_later": 3, "retained": 1, "retention_percent": 33.33},
+    ]
+    # A month without new contributors retains no one, with no percentage
+    assert cohorts[1]["retention"][0] == {"months_later": 1, "retained": 0, "retention_percent": None}
+    # 2024-12 + 3 is March, not over yet, whatever the row says
+    assert cohorts[2]["retention"][1] == {"months_later": 3, "retained": None, "retention_percent": None}
+    assert cohorts[2]["retention"][0]["retention_percent"] == 0.0
+    # January + 1 is the current month
+    assert cohorts[3]["retention"][0]["retained"] is None
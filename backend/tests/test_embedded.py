@@ -0,0 +1,48 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import db
+from app.main import app
+
+# Routes reading tables derived from github_events, which Parquet exports don't have
+DERIVED_TABLE_REQUESTS = [
+    ("/api/v1/repos/search", {"q": "acme"}),
+    ("/api/v1/stats/data-quality", {"repo_name": "acme/widgets"}),
+    ("/api/v1/stats/freshness", {}),
+    ("/api/v1/stats/contributors/retention", {"repo_name": "acme/widgets"}),
+    ("/api/v1/stats/backlog", {"repo_name": "acme/widgets"}),
+    ("/api/v1/stats/backlog/aging", {"repo_name": "acme/widgets"}),
+    ("/api/v1/stats/issues/first-response-time",
+     {"repo_name": "acme/widgets", "responder": "maintainer"}),
+    ("/api/v1/stats/prs/review-time", {"repo_name": "acme/widgets", "responder": "maintainer"}),
+    ("/api/v1/stats/prs/lead-time", {"repo_name": "acme/widgets", "responder": "maintainer"}),
+    ("/api/v1/stats/metrics",
+     {"repo_name": "acme/widgets", "metrics": "pr_review_time", "responder": "maintainer"}),
+]
+
+
+@pytest.fixture
+def client(embedded_backend, monkeypatch):
+    monkeypatch.setattr(db, "_backend", embedded_backend)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path, params", DERIVED_TABLE_REQUESTS)
+def test_routes_over_derived_tables_are_not_implemented(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 501
+    assert response.json() == {"detail": "Not supported by the embedded backend"}
+
+
+def test_routes_over_github_events_are_served(client):
+    response = client.get(
+        "/api/v1/stats/prs/review-time", params={"repo_name": "acme/widgets", "responder": "human"}
+    )
+    assert response.status_code == 200
+    assert response.json()["reviewed_pr_count"] > 0
+
+
+def test_currently_open_is_null_without_backlog_snapshots(client):
+    response = client.get("/api/v1/stats/issues/open-closed", params={"repo_name": "acme/widgets"})
+    assert response.status_code == 200
+    assert response.json()["currently_open"] is None
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.core.ingest import BufferFullError, EventBuffer
+
+
+def _events(count, start=0):
+    return [{"number": number} for number in range(start, start + count)]
+
+
+def test_add_drops_redelivered_deliveries():
+    buffer = EventBuffer(lambda batch: None, flush_rows=100, flush_interval=1.0, max_rows=100)
+
+    assert buffer.add(_events(2), "delivery-1")
+    assert not buffer.add(_events(2), "delivery-1")
+    assert buffer.add(_events(2))
+    assert buffer.size == 4
+
+
+def test_add_refuses_events_beyond_max_rows():
+    buffer = EventBuffer(lambda batch: None, flush_rows=100, flush_interval=1.0, max_rows=5)
+    buffer.add(_events(4))
+
+    with pytest.raises(BufferFullError):
+        buffer.add(_events(2), "delivery-1")
+    # A refused delivery is not remembered, so GitHub's retry is accepted
+    assert buffer.add(_events(1), "delivery-1")
+    assert buffer.size == 5
+
+
+def test_flush_inserts_one_batch_and_notifies_listeners():
+    inserted, notified = [], []
+    buffer = EventBuffer(inserted.append, flush_rows=100, flush_interval=1.0, max_rows=100)
+
+    async def listener(batch):
+        notified.append(batch)
+
+    buffer.add_listener(listener)
+    buffer.add(_events(3))
+    buffer.add(_events(2, start=3))
+
+    assert asyncio.run(buffer.flush()) == 5
+    assert inserted == [_events(5)]
+    assert notified == [_events(5)]
+    assert buffer.size == 0
+    assert asyncio.run(buffer.flush()) == 0
+
+
+def test_failed_flush_keeps_events_in_order_for_the_retry():
+    attempts = []
+
+    def insert(batch):
+        attempts.append(batch)
+        if len(attempts) == 1:
+            raise ConnectionError("ClickHouse is down")
+
+    buffer = EventBuffer(insert, flush_rows=100, flush_interval=1.0, max_rows=100)
+    buffer.add(_events(3))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+    assert buffer.size == 3
+
+    buffer.add(_events(1, start=3))
+    assert asyncio.run(buffer.flush()) == 4
+    assert attempts[1] == _events(4)
+
+
+def test_run_flushes_once_flush_rows_are_pending():
+    inserted = []
+    buffer = EventBuffer(inserted.append, flush_rows=3, flush_interval=60.0, max_rows=100)
+
+    async def scenario():
+        worker = asyncio.create_task(buffer.run())
+        buffer.add(_events(3))
+        for _ in range(100):
+            if inserted:
+                break
+            await asyncio.sleep(0.01)
+        worker.cancel()
+
+    asyncio.run(scenario())
+    assert inserted == [_events(3)]
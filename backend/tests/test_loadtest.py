@@ -0,0 +1,40 @@
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import db
+from app.loadtest import DASHBOARD_REQUESTS, ZipfRepos, outcome_of
+from app.main import app
+
+REPOS = [f"owner/repo-{rank}" for rank in range(1, 11)]
+
+
+def test_zipf_repos_is_reproducible_with_a_seed():
+    first = ZipfRepos(REPOS, 1.0, seed=7)
+    second = ZipfRepos(REPOS, 1.0, seed=7)
+    assert [first.pick() for _ in range(50)] == [second.pick() for _ in range(50)]
+
+
+def test_zipf_repos_favours_popular_repositories():
+    repos = ZipfRepos(REPOS, 1.0, seed=1)
+    picks = Counter(repos.pick() for _ in range(20000))
+
+    assert set(picks) <= set(REPOS)
+    # 1 / rank weights: the first repository is drawn about twice as often as the second
+    # and ten times as often as the tenth
+    assert 1.8 < picks[REPOS[0]] / picks[REPOS[1]] < 2.2
+    assert 8 < picks[REPOS[0]] / picks[REPOS[9]] < 12
+
+
+def test_zipf_repos_is_uniform_with_exponent_zero():
+    repos = ZipfRepos(REPOS, 0.0, seed=3)
+    picks = Counter(repos.pick() for _ in range(20000))
+    assert all(1700 < picks[repo] < 2300 for repo in REPOS)
+
+
+@pytest.mark.parametrize("route", sorted(DASHBOARD_REQUESTS))
+def test_dashboard_routes_answer_without_errors_over_the_stub_backend(monkeypatch, route):
+    monkeypatch.setattr(db, "_backend", db.StubBackend(0))
+    response = TestClient(app).get(DASHBOARD_REQUESTS[route], params={"repo_name": REPOS[0]})
+    assert outcome_of(response.status_code) in ("ok", "not_found"), response.text
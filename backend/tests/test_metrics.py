@@ -0,0 +1,300 @@
+import pytest
+from sqlalchemy import text
+
+from app.core.metrics import METRICS, compile_metrics, compute_metrics, summarize
+
+START_DATE = "2010-01-01"
+END_DATE = "2030-01-01"
+
+# The per-endpoint queries the compiled metrics replaced, one per route, run over the
+# same range. They return the metric's aggregate columns (see metrics.AGGREGATES).
+LEGACY_QUERIES = {
+    "issue_first_response_time": """
+        WITH issue_openings AS (
+            SELECT repo_name, number, created_at AS opened_at, actor_login AS opener_login
+            FROM github_events
+            WHERE event_type = 'IssuesEvent' AND action = 'opened'
+              AND repo_name = :repo_name AND created_at >= :start_date
+        ),
+        first_comments AS (
+            SELECT io.number, io.opened_at, min(ge.created_at) AS first_comment_at
+            FROM issue_openings io
+            JOIN github_events ge ON io.repo_name = ge.repo_name AND io.number = ge.number
+            WHERE ge.event_type = 'IssueCommentEvent' AND ge.action = 'created'
+              AND ge.created_at > io.opened_at
+              AND ge.actor_login != io.opener_login
+            GROUP BY io.number, io.opened_at
+        )
+        SELECT
+            avg(dateDiff('second', opened_at, first_comment_at)),
+            count(),
+            stddevPop(dateDiff('second', opened_at, first_comment_at))
+        FROM first_comments
+    """,
+    "issue_resolution_time": """
+        WITH issue_timings AS (
+            SELECT
+                number,
+                minIf(created_at, action = 'opened') AS opened_at,
+                maxIf(created_at, action = 'closed') AS closed_at
+            FROM github_events
+            WHERE event_type = 'IssuesEvent' AND repo_name = :repo_name
+              AND action IN ('opened', 'closed')
+              AND created_at BETWEEN :start_date AND :end_date
+            GROUP BY number
+            HAVING opened_at IS NOT NULL AND closed_at IS NOT NULL
+        )
+        SELECT avg(seconds), count(), stddevPop(seconds)
+        FROM (SELECT dateDiff('second', opened_at, closed_at) AS seconds FROM issue_timings)
+        WHERE seconds > 0
+    """,
+    "bug_resolution_time": """
+        WITH bug_issues AS (
+            SELECT
+                number,
+                minIf(created_at, action = 'opened') AS opened_at,
+                maxIf(created_at, action = 'closed') AS closed_at,
+                max(hasAny(labels, ['bug'])) AS is_bug
+            FROM github_events
+            WHERE event_type = 'IssuesEvent' AND repo_name = :repo_name
+              AND action IN ('opened', 'closed')
+              AND created_at BETWEEN :start_date AND :end_date
+            GROUP BY number
+            HAVING is_bug = 1 AND closed_at IS NOT NULL AND opened_at IS NOT NULL
+        )
+        SELECT avg(seconds), count(), stddevPop(seconds)
+        FROM (SELECT dateDiff('second', opened_at, closed_at) AS seconds FROM bug_issues)
+        WHERE seconds > 0 AND seconds < 31536000
+    """,
+    "pr_success_rate": """
+        WITH pr_final_states AS (
+            SELECT
+                number,
+                argMax(action, created_at) AS final_action,
+                argMax(merged, created_at) AS final_merged
+            FROM github_events
+            WHERE event_type = 'PullRequestEvent' AND repo_name = :repo_name
+            GROUP BY number
+        )
+        SELECT countIf(final_merged = 1), count()
+        FROM pr_final_states
+        WHERE final_action = 'closed'
+    """,
+    "pr_closing_time": """
+        WITH pr_openings AS (
+            SELECT repo_name, number, created_at AS opened_at
+            FROM github_events
+            WHERE event_type = 'PullRequestEvent' AND action = 'opened'
+              AND repo_name = :repo_name AND created_at >= :start_date
+        ),
+        pr_closings AS (
+            SELECT repo_name, number, max(created_at) AS closed_at
+            FROM github_events
+            WHERE event_type = 'PullRequestEvent' AND action = 'closed'
+              AND repo_name = :repo_name AND created_at >= :start_date
+            GROUP BY repo_name, number
+        )
+        SELECT avg(seconds), count(), stddevPop(seconds)
+        FROM (
+            SELECT dateDiff('second', o.opened_at, c.closed_at) AS seconds
+            FROM pr_openings o
+            JOIN pr_closings c ON o.repo_name = c.repo_name AND o.number = c.number
+            WHERE c.closed_at > o.opened_at
+        )
+    """,
+    "pr_review_time": """
+        WITH pr_opened_times AS (
+            SELECT number, min(created_at) AS opened_at, argMin(actor_login, created_at) AS pr_author
+            FROM github_events
+            WHERE event_type = 'PullRequestEvent' AND action = 'opened'
+              AND repo_name = :repo_name AND created_at >= :start_date
+            GROUP BY number
+        ),
+        first_review_times AS (
+            SELECT rev.number AS number, min(rev.created_at) AS first_review_at
+            FROM github_events rev
+            JOIN pr_opened_times po ON rev.number = po.number
+            WHERE rev.repo_name = :repo_name AND rev.created_at >= :start_date
+              AND rev.event_type IN ('PullRequestReviewCommentEvent', 'PullRequestReviewEvent')
+              AND rev.actor_login != po.pr_author AND rev.created_at >= po.opened_at
+            GROUP BY rev.number
+        )
+        SELECT
+            avg(dateDiff('second', po.opened_at, fr.first_review_at)),
+            count(),
+            stddevPop(dateDiff('second', po.opened_at, fr.first_review_at))
+        FROM pr_opened_times po
+        JOIN first_review_times fr ON po.number = fr.number
+    """,
+}
+
+LEGACY_MONTHLY_QUERIES = {
+    "issues_opened": "event_type = 'IssuesEvent' AND action = 'opened'",
+    "issues_closed": "event_type = 'IssuesEvent' AND action = 'closed'",
+    "releases": "event_type = 'ReleaseEvent'",
+}
+
+LEGACY_MONTHLY = """
+    SELECT toStartOfMonth(created_at) AS month, count()
+    FROM github_events
+    WHERE {condition} AND repo_name = :repo_name
+      AND created_at BETWEEN :start_date AND :end_date
+    GROUP BY month
+    ORDER BY month
+"""
+
+
+def _sql(scan):
+    return " ".join(str(scan.query).split())
+
+
+def test_one_scan_per_key():
+    scans = compile_metrics(list(METRICS))
+    assert sorted(scan.key for scan in scans) == ["month", "number"]
+    assert {name for scan in scans for name in scan.columns} == set(METRICS)
+
+
+def test_scan_reads_the_union_of_its_metrics_events():
+    scan, = compile_metrics(["issue_resolution_time", "pr_review_time"])
+    sql = _sql(scan)
+    for name in ("issue_resolution_time", "pr_review_time"):
+        assert f"({METRICS[name].events})" in sql
+    assert "FROM github_events WHERE repo_canonical = :repo_name" in sql
+    assert "GROUP BY number" in sql
+
+
+def test_shared_facts_are_computed_once():
+    scan, = compile_metrics(["issue_resolution_time", "bug_resolution_time"])
+    assert _sql(scan).count("AS issue_opened_at") == 1
+    assert _sql(scan).count("AS issue_closed_at") == 1
+
+
+def test_columns_follow_the_aggregates_in_request_order():
+    scan, = compile_metrics(["pr_success_rate", "pr_closing_time"])
+    # ratio: hits and items; mean: average, items and standard deviation
+    assert scan.columns == {"pr_success_rate": slice(0, 2), "pr_closing_time": slice(2, 5)}
+    assert scan.window_columns == {}
+
+    monthly, = compile_metrics(["issues_opened", "releases"])
+    # Monthly rows start with the month
+    assert monthly.columns == {"issues_opened": slice(1, 2), "releases": slice(2, 3)}
+
+
+def test_window_columns_follow_every_metric():
+    scan, = compile_metrics(
+        ["pr_success_rate", "pr_closing_time"], windows=[("30d", 30), ("90d", 90)]
+    )
+    # Per window, the current and previous period of the aggregate's windowed columns
+    assert scan.window_columns == {
+        "pr_success_rate": slice(5, 13), "pr_closing_time": slice(13, 21)
+    }
+    # Previous periods of the 90d window, for both windowed columns of both metrics
+    assert _sql(scan).count(":window_end - INTERVAL 180 DAY") == 4
+
+
+def test_time_range_table_and_sample_options():
+    scan, = compile_metrics(["releases"])
+    assert ":start_date" not in _sql(scan) and ":end_date" not in _sql(scan)
+
+    scan, = compile_metrics(
+        ["releases"], start=True, end=True, sample_ratio=0.1, table="github_events_recent"
+    )
+    sql = _sql(scan)
+    assert "FROM github_events_recent SAMPLE 0.1 WHERE" in sql
+    assert "AND created_at >= :start_date AND created_at <= :end_date" in sql
+
+
+def test_options_are_inlined_into_facts():
+    scan, = compile_metrics(["issue_first_response_time"])
+    assert "comment.2 != issue_opener" in _sql(scan)
+    scan, = compile_metrics(["issue_first_response_time"], exclude_opener_comments=False)
+    assert "comment.2 != issue_opener" not in _sql(scan)
+
+
+def test_unknown_metric_raises_key_error():
+    with pytest.raises(KeyError):
+        compile_metrics(["issue_resolution_time", "no_such_metric"])
+
+
+class CountingSession:
+    def __init__(self, session):
+        self.session = session
+        self.queries = 0
+
+    def execute(self, statement, params=None):
+        self.queries += 1
+        return self.session.execute(statement, params)
+
+
+def _params(repo_name):
+    return {"repo_name": repo_name, "start_date": START_DATE, "end_date": END_DATE}
+
+
+@pytest.mark.parametrize("repo_name", ["acme/widgets", "acme/gadgets"])
+@pytest.mark.parametrize("name", sorted(LEGACY_QUERIES))
+def test_compiled_metric_matches_its_legacy_query(embedded_backend, repo_name, name):
+    with embedded_backend.session(repo_name) as db:
+        expected = db.execute(text(LEGACY_QUERIES[name]), _params(repo_name)).fetchone()
+        result = compute_metrics(
+            db, repo_name, [name], start_date=START_DATE, end_date=END_DATE
+        )[name]
+
+    assert summarize(name, result.values)[1] > 0
+    assert result.values == pytest.approx(tuple(expected))
+
+
+@pytest.mark.parametrize("repo_name", ["acme/widgets", "acme/gadgets"])
+@pytest.mark.parametrize("name", sorted(LEGACY_MONTHLY_QUERIES))
+def test_compiled_monthly_metric_matches_its_legacy_query(embedded_backend, repo_name, name):
+    query = text(LEGACY_MONTHLY.format(condition=LEGACY_MONTHLY_QUERIES[name]))
+    with embedded_backend.session(repo_name) as db:
+        expected = dict(db.execute(query, _params(repo_name)).fetchall())
+        result = compute_metrics(
+            db, repo_name, [name], start_date=START_DATE, end_date=END_DATE
+        )[name]
+
+    assert expected
+    assert {month: columns[0] for month, columns in result.months.items()} == expected
+
+
+def test_fused_metrics_match_metrics_computed_alone(embedded_backend):
+    with embedded_backend.session("acme/widgets") as db:
+        counting = CountingSession(db)
+        fused = compute_metrics(
+            counting, "acme/widgets", list(METRICS), start_date=START_DATE, end_date=END_DATE
+        )
+        alone = {
+            name: compute_metrics(
+                db, "acme/widgets", [name], start_date=START_DATE, end_date=END_DATE
+            )[name]
+            for name in METRICS
+        }
+
+    assert counting.queries == 2
+    for name in METRICS:
+        if fused[name].months is None:
+            assert fused[name].values == pytest.approx(alone[name].values)
+        else:
+            assert fused[name].months == alone[name].months
+
+
+class EmptySession:
+    def execute(self, statement, params=None):
+        return self
+
+    def fetchall(self):
+        return []
+
+
+def test_scans_without_rows_give_metrics_over_no_items():
+    windows = [("30d", 30), ("90d", 90)]
+    results = compute_metrics(EmptySession(), "acme/widgets", list(METRICS), windows=windows)
+
+    for name, result in results.items():
+        if METRICS[name].key == "month":
+            assert result.months == {}
+        else:
+            assert summarize(name, result.values) == (None, 0)
+        assert [(stats["value"], stats["count"]) for stats in result.windows] == [(None, 0)] * 2
+    assert results["pr_closing_time"].values == (None, 0, None)
+    assert results["pr_success_rate"].values == (0, 0)
@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+from app.core.db import StubSession, get_db
+from app.main import app
+
+
+def test_success_rate_without_closed_prs_is_not_found():
+    app.dependency_overrides[get_db] = lambda: StubSession(0)
+    try:
+        response = TestClient(app).get(
+            "/api/v1/stats/prs/success-rate", params={"repo_name": "acme/widgets"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No closed PRs found for repository: acme/widgets"}
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.core import tiering
+from app.core.config import settings
+from app.core.tiering import (
+    EVENTS_TABLE, RECENT_EVENTS_TABLE, events_table, events_table_for_months, recent_events_start
+)
+
+
+@pytest.fixture(autouse=True)
+def twelve_recent_months(monkeypatch):
+    monkeypatch.setattr(settings, "RECENT_EVENTS_MONTHS", 12)
+
+
+@pytest.mark.parametrize("today, start", [
+    (date(2024, 6, 15), date(2023, 6, 1)),
+    (date(2024, 1, 1), date(2023, 1, 1)),
+    (date(2024, 12, 31), date(2023, 12, 1)),
+])
+def test_recent_events_start_is_the_first_of_the_month(today, start):
+    assert recent_events_start(today) == start
+
+
+def test_recent_events_start_crosses_years(monkeypatch):
+    monkeypatch.setattr(settings, "RECENT_EVENTS_MONTHS", 14)
+    assert recent_events_start(date(2024, 2, 10)) == date(2022, 12, 1)
+
+
+@pytest.mark.parametrize("start_date, table", [
+    ("2023-06-01", RECENT_EVENTS_TABLE),
+    ("2023-05-31", EVENTS_TABLE),
+    (datetime(2023, 6, 1, 0, 0, 1), RECENT_EVENTS_TABLE),
+    (datetime(2023, 5, 31, 23, 59, 59), EVENTS_TABLE),
+    (date(2024, 6, 15), RECENT_EVENTS_TABLE),
+    (None, EVENTS_TABLE),
+    ("", EVENTS_TABLE),
+    ("not a date", EVENTS_TABLE),
+])
+def test_events_table_reads_the_recent_table_from_its_first_day(monkeypatch, start_date, table):
+    monkeypatch.setattr(tiering, "recent_events_start", lambda: date(2023, 6, 1))
+    assert events_table(start_date) == table
+
+
+@pytest.mark.parametrize("months, table", [
+    (1, RECENT_EVENTS_TABLE),
+    (12, RECENT_EVENTS_TABLE),
+    (13, EVENTS_TABLE),
+    (0, EVENTS_TABLE),
+])
+def test_events_table_for_months(months, table):
+    assert events_table_for_months(months) == table
+
+
+def test_recent_table_is_never_read_with_zero_recent_months(monkeypatch):
+    monkeypatch.setattr(settings, "RECENT_EVENTS_MONTHS", 0)
+    assert events_table(datetime.utcnow()) == EVENTS_TABLE
+    assert events_table_for_months(1) == EVENTS_TABLE
@@ -0,0 +1,28 @@
+import hashlib
+import hmac
+
+from app.core.webhooks import verify_signature
+
+SECRET = "webhook-secret"
+BODY = b'{"action": "opened"}'
+
+
+def _sign(body: bytes, secret: str = SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def test_verify_signature_accepts_the_body_signature():
+    assert verify_signature(SECRET, BODY, _sign(BODY))
+
+
+def test_verify_signature_rejects_another_body_or_secret():
+    assert not verify_signature(SECRET, BODY + b" ", _sign(BODY))
+    assert not verify_signature(SECRET, BODY, _sign(BODY, "another-secret"))
+
+
+def test_verify_signature_rejects_missing_or_malformed_headers():
+    digest = _sign(BODY)[len("sha256="):]
+    assert not verify_signature(SECRET, BODY, None)
+    assert not verify_signature(SECRET, BODY, "")
+    assert not verify_signature(SECRET, BODY, digest)
+    assert not verify_signature(SECRET, BODY, "sha1=" + digest)
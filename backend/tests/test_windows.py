@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.windows import parse_windows, window_comparisons, windows_scan_start
+
+
+def test_parse_windows_sorts_by_length_and_converts_units():
+    assert parse_windows("1y, 30d,12w,6M") == [("30d", 30), ("12w", 84), ("6m", 180), ("1y", 365)]
+
+
+def test_parse_windows_drops_duplicates_and_empty_parts():
+    assert parse_windows("30d,,30D,") == [("30d", 30)]
+
+
+@pytest.mark.parametrize("spec", ["", " , ", "30", "0d", "30x", "d30", "-5d", "1d,2d,3d,4d,5d,6d,7d"])
+def test_parse_windows_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_windows(spec)
+
+
+def test_windows_scan_start_covers_the_previous_period_of_the_widest_window():
+    end = datetime(2024, 6, 30)
+    assert windows_scan_start([("30d", 30), ("90d", 90)], end) == datetime(2024, 1, 2)
+
+
+def test_window_comparisons_reports_deltas_and_scales_counts():
+    # Per window: current (value, count) then previous (value, count)
+    values = [10.0, 4, 5.0, 2, 8.0, 10, None, 0]
+    comparisons = window_comparisons(
+        [("30d", 30), ("90d", 90)], values, lambda period: (period[0], period[1]), 2.0
+    )
+
+    assert comparisons[0] == {
+        "window": "30d", "days": 30, "value": 10.0, "previous_value": 5.0, "delta": 5.0,
+        "delta_percent": 100.0, "count": 8, "previous_count": 4,
+    }
+    assert comparisons[1]["previous_value"] is None
+    assert comparisons[1]["delta"] is None
+    assert comparisons[1]["count"] == 20